@@ -0,0 +1,161 @@
+"""
+LLM answer cache
+Key: normalized query (content words in order, negations kept) + the retrieved
+FAQ evidence (IDs and a hash of their text, so an edited FAQ gets a new key).
+Entries expire individually, the cache is bounded by an approximate byte budget
+(least recently used entries are evicted first) and can be persisted to a JSONL file.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_CONTRACTIONS = [(re.compile(r"\bcan[\'’]t\b"), "cannot"), (re.compile(r"\bwon[\'’]t\b"), "will not"), (re.compile(r"n[\'’]t\b"), " not")]
+# Stop words that flip the meaning of a question ("is there a fee" / "is there no fee")
+NEGATIONS = frozenset({'no', 'not', 'nor', 'cannot', 'never', 'none', 'nothing', 'nobody', 'neither', 'without'})
+_IGNORED_WORDS = ENGLISH_STOP_WORDS - NEGATIONS
+_ENTRY_OVERHEAD = 200  # rough per-entry bookkeeping cost in bytes
+
+
+def normalize_query(query: str) -> str:
+    """Lowercased content words in their original order; negations ("not", "can't", "no") are kept"""
+    text = query.lower()
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return " ".join(w for w in _WORD_PATTERN.findall(text) if w not in _IGNORED_WORDS)
+
+
+def answer_cache_key(query: str, evidence: List[Dict[str, Any]]) -> str:
+    """Key for the answer to query given the retrieved FAQs (dicts with id, question and answer)"""
+    digest = hashlib.sha1(normalize_query(query).encode('utf-8'))
+    for doc in evidence:
+        digest.update(f"|{doc['id']}\x1f{doc['question']}\x1f{doc['answer']}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """Thread-safe, byte-bounded LRU of LLM answers with per-entry TTL and optional disk persistence"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600.0, persist_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._journal_lines = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if persist_path:
+            self._load()
+
+    @staticmethod
+    def _size(key: str, answer: str) -> int:
+        return len(key) + len(answer.encode('utf-8')) + _ENTRY_OVERHEAD
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires_at'] < time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['answer']
+
+    def put(self, key: str, answer: str, ttl: Optional[float] = None):
+        entry = {'answer': answer, 'expires_at': time.time() + (self.ttl if ttl is None else ttl)}
+        size = self._size(key, answer)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            if self.persist_path:
+                self._append(key, entry)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= self._size(key, entry['answer'])
+
+    def _load(self):
+        """Replay the persisted journal; later lines win and expired entries are dropped"""
+        if not os.path.exists(self.persist_path):
+            return
+        now = time.time()
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    self._journal_lines += 1
+                    key = record['key']
+                    if key in self._entries:
+                        self._remove(key)
+                    if record['expires_at'] > now:
+                        self._entries[key] = {'answer': record['answer'], 'expires_at': record['expires_at']}
+                        self._bytes += self._size(key, record['answer'])
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        except Exception:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _append(self, key: str, entry: Dict[str, Any]):
+        try:
+            # Compact once the journal holds mostly overwritten or evicted records
+            if self._journal_lines > 2 * len(self._entries) + 100:
+                staging = f"{self.persist_path}.tmp"
+                with open(staging, 'w', encoding='utf-8') as f:
+                    for k, e in self._entries.items():
+                        f.write(json.dumps({'key': k, **e}, ensure_ascii=False) + "\n")
+                os.replace(staging, self.persist_path)
+                self._journal_lines = len(self._entries)
+            else:
+                with open(self.persist_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'key': key, **entry}, ensure_ascii=False) + "\n")
+                self._journal_lines += 1
+        except Exception:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'persistent': bool(self.persist_path),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -0,0 +1,153 @@
+"""
+Archived session catalog
+Flow: Archive written / deleted -> catalog row upserted / removed -> paged list served from the catalog
+
+The catalog keeps one SQLite row per sessions/{id}_archive.json (ID, user,
+archived_at, message count, reason, start/end time), indexed for newest-first
+keyset paging, optionally filtered by user or reason. Listing archives then
+never touches the archive files; a full transcript is read only when one
+archive is requested. The first start scans the existing archives once, and
+rebuild() rescans if archives were changed outside the API.
+"""
+
+import sys
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from service_request_store import encode_cursor, decode_cursor
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSIONS_DIR = os.path.join(BASE_DIR, "sessions")
+ARCHIVE_CATALOG_DB = os.getenv('ARCHIVE_CATALOG_DB', os.path.join(SESSIONS_DIR, "archive_catalog.db"))
+ARCHIVE_SUFFIX = "_archive.json"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+CATALOG_COLUMNS = ('session_id', 'user_id', 'archived_at', 'message_count', 'reason', 'start_time', 'end_time')
+
+
+def archive_path(session_id: str, sessions_dir: str = SESSIONS_DIR) -> str:
+    return os.path.join(sessions_dir, f"{session_id}{ARCHIVE_SUFFIX}")
+
+
+class ArchiveCatalog:
+    """Incrementally maintained index of archived sessions"""
+
+    def __init__(self, path: str = ARCHIVE_CATALOG_DB, sessions_dir: str = SESSIONS_DIR):
+        self.path = path
+        self.sessions_dir = sessions_dir
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS archives (
+                    session_id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    archived_at REAL,
+                    message_count INTEGER,
+                    reason TEXT,
+                    start_time REAL,
+                    end_time REAL
+                );
+                CREATE INDEX IF NOT EXISTS archives_archived_at ON archives (archived_at, session_id);
+                CREATE INDEX IF NOT EXISTS archives_user ON archives (user_id, archived_at, session_id);
+                CREATE INDEX IF NOT EXISTS archives_reason ON archives (reason, archived_at, session_id);
+                CREATE TABLE IF NOT EXISTS catalog_meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+            scanned = db.execute("SELECT 1 FROM catalog_meta WHERE key = 'scanned'").fetchone()
+        if not scanned:
+            self.rebuild()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _row(archive: Dict[str, Any]) -> tuple:
+        return (
+            archive['session_id'], archive.get('user_id'), archive.get('archived_at', 0),
+            archive.get('message_count', len(archive.get('messages', []))), archive.get('reason'),
+            archive.get('start_time'), archive.get('end_time')
+        )
+
+    def upsert(self, archive: Dict[str, Any]):
+        """Record (or refresh) the catalog entry of a just-written archive"""
+        with self._connection() as db:
+            db.execute(f"INSERT OR REPLACE INTO archives VALUES ({', '.join('?' * len(CATALOG_COLUMNS))})", self._row(archive))
+
+    def remove(self, session_id: str) -> bool:
+        with self._connection() as db:
+            return db.execute("DELETE FROM archives WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def rebuild(self) -> int:
+        """Rescan every archive file on disk; returns the number catalogued"""
+        rows = []
+        for filename in os.listdir(self.sessions_dir):
+            if filename.endswith(ARCHIVE_SUFFIX):
+                try:
+                    with open(os.path.join(self.sessions_dir, filename), 'r', encoding='utf-8') as f:
+                        archive = json.load(f)
+                    rows.append(self._row(dict(archive, session_id=archive.get('session_id', filename[:-len(ARCHIVE_SUFFIX)]))))
+                except Exception as e:
+                    print(f"Error reading archive {filename}: {e}", file=sys.stderr)
+        with self._connection() as db:
+            db.execute("DELETE FROM archives")
+            db.executemany(f"INSERT OR REPLACE INTO archives VALUES ({', '.join('?' * len(CATALOG_COLUMNS))})", rows)
+            db.execute("INSERT OR REPLACE INTO catalog_meta VALUES ('scanned', ?)", (str(time.time()),))
+        return len(rows)
+
+    def list(self, user_id: Optional[str] = None, reason: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of catalog entries, most recently archived first"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = [], []
+        if user_id:
+            where.append("user_id = ?")
+            params.append(user_id)
+        if reason:
+            where.append("reason = ?")
+            params.append(reason)
+        if cursor:
+            archived_at, session_id = decode_cursor(cursor)
+            where.append("(archived_at, session_id) < (?, ?)")
+            params += [archived_at, session_id]
+        query = f"SELECT {', '.join(CATALOG_COLUMNS)} FROM archives"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY archived_at DESC, session_id DESC LIMIT ?"
+        rows = self._connection().execute(query, params + [limit + 1]).fetchall()
+
+        items = [dict(zip(CATALOG_COLUMNS, row)) for row in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]['archived_at'], items[-1]['session_id']) if len(rows) > limit else None
+        return {'items': items, 'nextCursor': next_cursor}
+
+    def session_ids(self):
+        """Every catalogued session ID, most recently archived first"""
+        return [session_id for (session_id,) in self._connection().execute("SELECT session_id FROM archives ORDER BY archived_at DESC, session_id DESC")]
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM archives").fetchone()[0]
+
+
+_CATALOG = None
+_CATALOG_LOCK = threading.Lock()
+
+
+def get_archive_catalog() -> ArchiveCatalog:
+    """The shared process-wide ArchiveCatalog"""
+    global _CATALOG
+    if _CATALOG is None:
+        with _CATALOG_LOCK:
+            if _CATALOG is None:
+                _CATALOG = ArchiveCatalog()
+    return _CATALOG
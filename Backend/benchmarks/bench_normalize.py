@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+HTML Entity Normalizer Micro-benchmark
+Compares the old repeated-unescape cleaners with text_normalizer.normalize_entities on
+(1) cleaning every metadata entry at knowledge base load and
+(2) the cleaning chain each English response passes through
+(call_llm_brain -> process_query -> clean_text in the API).
+
+    python benchmarks/bench_normalize.py
+"""
+
+import sys
+import json
+import argparse
+import html
+import os
+import pickle
+import timeit
+from typing import List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from text_normalizer import normalize_entities
+from bench_retrieval import generate_corpus
+
+METADATA_PATH = os.path.join(BASE_DIR, "metadata.pkl")
+SAMPLE_RESPONSE = (
+    "To reset your password, open the mobile app and tap &quot;Forgot password&quot;. "
+    "You&#39;ll receive an OTP on your registered number &amp;amp; email. Enter it, choose a new password "
+    "(8+ characters, with a number &amp; a symbol) and confirm. If you don&#x27;t receive the OTP within 5 minutes, "
+    "call customer care. Note: passwords can&#39;t be reused &lt;12 months&gt;.\n\n"
+) * 4
+PLAIN_RESPONSE = SAMPLE_RESPONSE.replace('&', 'and')
+
+
+def legacy_aggressive_clean_html(text: str) -> str:
+    """The cleaner previously in enhanced_chatbot.py"""
+    if not text:
+        return text
+    for _ in range(5):
+        text = html.unescape(text)
+    text = text.replace('&quot;', '"')
+    text = text.replace('&#39;', "'")
+    text = text.replace('&#x27;', "'")
+    text = text.replace('&amp;', '&')
+    text = text.replace('&lt;', '<')
+    text = text.replace('&gt;', '>')
+    text = text.replace('&nbsp;', ' ')
+    return text
+
+
+def legacy_clean_text(text: str) -> str:
+    """The cleaner previously in start_fastapi.py"""
+    if not text:
+        return text
+    for _ in range(3):
+        text = html.unescape(text)
+    return text
+
+
+def load_texts(size: int) -> Tuple[str, List[str]]:
+    if os.path.exists(METADATA_PATH):
+        with open(METADATA_PATH, 'rb') as f:
+            entries = pickle.load(f)
+        source = 'metadata.pkl'
+    else:
+        entries = generate_corpus(size)
+        # Roughly one entry in five carries (sometimes double-encoded) entities
+        for i, entry in enumerate(entries):
+            if i % 5 == 0:
+                entry['answer'] = entry['answer'].replace(', then', ' &amp;amp; then').replace('ID', '&quot;ID&quot;')
+        source = f'synthetic ({size} entries)'
+    texts = []
+    for entry in entries:
+        texts.append(entry.get("question") or entry.get("query") or entry.get("text") or "")
+        texts.append(entry.get("answer") or entry.get("ans") or entry.get("response") or "")
+    return source, texts
+
+
+def best_of(func, repeat: int, number: int) -> float:
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML entity normalization')
+    parser.add_argument('--size', type=int, default=20000, help='Synthetic corpus size when metadata.pkl is absent')
+    parser.add_argument('--output', default=None, help='Optional JSON report path')
+    args = parser.parse_args()
+
+    source, texts = load_texts(args.size)
+    mismatches = sum(1 for t in texts if legacy_aggressive_clean_html(t) != normalize_entities(t))
+
+    load_legacy = best_of(lambda: [legacy_aggressive_clean_html(t) for t in texts], 3, 1)
+    load_new = best_of(lambda: [normalize_entities(t) for t in texts], 3, 1)
+
+    def legacy_chain(text):
+        return legacy_clean_text(legacy_aggressive_clean_html(legacy_aggressive_clean_html(text)))
+
+    def new_chain(text):
+        return normalize_entities(normalize_entities(normalize_entities(text)))
+
+    report = {
+        'corpus': source,
+        'texts': len(texts),
+        'mismatches_vs_legacy': mismatches,
+        'kb_load_ms': {'legacy': load_legacy * 1000, 'normalize_entities': load_new * 1000, 'speedup': load_legacy / load_new},
+        'response_with_entities_us': {
+            'legacy': best_of(lambda: legacy_chain(SAMPLE_RESPONSE), 5, 2000) * 1e6,
+            'normalize_entities': best_of(lambda: new_chain(SAMPLE_RESPONSE), 5, 2000) * 1e6
+        },
+        'response_plain_us': {
+            'legacy': best_of(lambda: legacy_chain(PLAIN_RESPONSE), 5, 2000) * 1e6,
+            'normalize_entities': best_of(lambda: new_chain(PLAIN_RESPONSE), 5, 2000) * 1e6
+        }
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
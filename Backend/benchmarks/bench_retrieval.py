@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Retrieval Benchmark Suite
+Flow: Synthetic banking FAQ corpus -> Build index -> Single-query and batched retrieval -> JSON report
+
+Each (corpus size, backend) pair runs in its own process so peak RSS is measured
+in isolation. Usage:
+
+    python benchmarks/bench_retrieval.py
+    python benchmarks/bench_retrieval.py --sizes 1000,10000,100000,1000000 --backends tfidf,bm25
+"""
+
+import sys
+import json
+import argparse
+import multiprocessing
+import os
+import pickle
+import platform
+import queue
+import random
+import resource
+import shutil
+import tempfile
+import time
+from typing import List, Dict, Any
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BASE_DIR)
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BACKENDS = ['tfidf', 'bm25']
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "retrieval_results.json")
+NUM_QUERIES = 300
+BATCH_SIZE = 32
+TOP_K = 10
+SEED = 1234
+
+PRODUCTS = ['savings account', 'checking account', 'credit card', 'debit card', 'personal loan', 'home loan',
+            'mortgage', 'fixed deposit', 'recurring deposit', 'mobile app', 'online banking', 'wire transfer',
+            'standing order', 'direct debit', 'overdraft', 'cheque book', 'atm', 'upi', 'netbanking password',
+            'travel card', 'business account', 'joint account', 'student loan', 'car loan', 'safe deposit locker']
+ACTIONS = ['open', 'close', 'activate', 'block', 'reset', 'change the limit on', 'apply for', 'cancel',
+           'update the address on', 'check the balance of', 'dispute a charge on', 'report fraud on',
+           'link', 'unlink', 'renew', 'download a statement for', 'increase', 'pay the bill for']
+QUALIFIERS = ['online', 'from abroad', 'without visiting a branch', 'for a minor', 'after hours', 'using the app',
+              'if I forgot my PIN', 'as a non-resident', 'with a joint holder', 'in another currency', '', '', '']
+STEPS = ['log in to online banking', 'open the mobile app', 'visit your nearest branch', 'call customer care',
+         'verify your identity with the OTP', 'select the relevant account', 'confirm the request',
+         'upload a copy of your ID', 'sign the consent form', 'wait for the confirmation SMS']
+
+
+def generate_corpus(size: int, seed: int = SEED) -> List[Dict[str, str]]:
+    """Templated banking Q&A pairs; a serial number keeps every entry distinct"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        product, action, qualifier = rng.choice(PRODUCTS), rng.choice(ACTIONS), rng.choice(QUALIFIERS)
+        question = f"How do I {action} my {product} {qualifier}".strip() + f"? (ref {i})"
+        steps = rng.sample(STEPS, 4)
+        answer = f"To {action} your {product}{' ' + qualifier if qualifier else ''}, " + ", then ".join(steps) + f". Processing usually takes {rng.randint(1, 7)} working days."
+        corpus.append({"question": question, "answer": answer})
+    return corpus
+
+
+def generate_queries(count: int, seed: int = SEED + 1) -> List[str]:
+    rng = random.Random(seed)
+    templates = ['how to {a} {p}', '{a} my {p} {q}', 'i want to {a} {p}', 'can i {a} a {p} {q}', '{p} {a}']
+    return [rng.choice(templates).format(a=rng.choice(ACTIONS), p=rng.choice(PRODUCTS), q=rng.choice(QUALIFIERS)).strip() for _ in range(count)]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.array(samples) * 1000.0
+    return {'p50_ms': float(np.percentile(values, 50)), 'p95_ms': float(np.percentile(values, 95)), 'p99_ms': float(np.percentile(values, 99)), 'mean_ms': float(values.mean())}
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run_case(size: int, backend: str, result_queue):
+    """Child process: build, load and query one backend over one corpus size"""
+    try:
+        workdir = tempfile.mkdtemp(prefix=f"bench-{backend}-{size}-")
+        try:
+            import retrieval_index
+            import retrieval_service
+            from enhanced_chatbot import EnhancedChatbot
+
+            retrieval_index.INDEX_DIR = os.path.join(workdir, "index_cache")
+            metadata_path = os.path.join(workdir, "metadata.pkl")
+            with open(metadata_path, 'wb') as f:
+                pickle.dump(generate_corpus(size), f)
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            # Cold start: fit and persist, then a warm start that only memory-maps
+            start = time.perf_counter()
+            cold = retrieval_service.RetrievalService(metadata_path, backend, os.path.join(workdir, "journal.jsonl"))
+            if not cold.load():
+                raise RuntimeError("index failed to load")
+            build_time = time.perf_counter() - start
+            start = time.perf_counter()
+            service = retrieval_service.RetrievalService(metadata_path, backend, os.path.join(workdir, "journal.jsonl"))
+            service.load()
+            load_time = time.perf_counter() - start
+
+            # Queries go through the same expansion as get_top_10_from_rag, bypassing its result cache
+            chatbot = EnhancedChatbot()
+            queries = [chatbot.expand_query(q) for q in generate_queries(NUM_QUERIES)]
+            service.search(queries[:5], TOP_K)
+
+            single = []
+            for query in queries:
+                start = time.perf_counter()
+                service.search([query], TOP_K)
+                single.append(time.perf_counter() - start)
+
+            batched = []
+            for i in range(0, len(queries), BATCH_SIZE):
+                batch = queries[i:i + BATCH_SIZE]
+                start = time.perf_counter()
+                service.search(batch, TOP_K)
+                batched.append((time.perf_counter() - start) / len(batch))
+
+            result_queue.put({
+                'size': size,
+                'backend': backend,
+                'status': 'ok',
+                'index_build_s': build_time,
+                'index_load_s': load_time,
+                'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+                'build_rss_delta_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024.0,
+                'on_disk_mb': directory_size(retrieval_index.INDEX_DIR) / (1024.0 * 1024.0),
+                'single_query': percentiles(single),
+                'batched_per_query': dict(percentiles(batched), batch_size=BATCH_SIZE)
+            })
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    except Exception as e:
+        result_queue.put({'size': size, 'backend': backend, 'status': 'skipped', 'error': str(e)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark retrieval backends over synthetic FAQ corpora')
+    parser.add_argument('--sizes', default=",".join(str(s) for s in DEFAULT_SIZES), help='Comma-separated corpus sizes')
+    parser.add_argument('--backends', default=",".join(DEFAULT_BACKENDS), help='Comma-separated backends (tfidf, bm25, dense, hybrid)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write the JSON report')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    backends = [b for b in args.backends.split(",") if b]
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for size in sizes:
+        for backend in backends:
+            result_queue = context.Queue()
+            process = context.Process(target=run_case, args=(size, backend, result_queue))
+            process.start()
+            try:
+                result = result_queue.get(timeout=24 * 3600)
+            except queue.Empty:
+                result = {'size': size, 'backend': backend, 'status': 'crashed'}
+            process.join()
+            if process.exitcode:
+                result = dict(result, exit_code=process.exitcode)
+            results.append(result)
+            if result['status'] == 'ok':
+                print(f"{backend:>7} {size:>8}: build {result['index_build_s']:.2f}s, load {result['index_load_s'] * 1000:.1f}ms, "
+                      f"rss {result['peak_rss_mb']:.0f}MB, disk {result['on_disk_mb']:.1f}MB, "
+                      f"p50 {result['single_query']['p50_ms']:.2f}ms, p99 {result['single_query']['p99_ms']:.2f}ms, "
+                      f"batched p50 {result['batched_per_query']['p50_ms']:.2f}ms/query", file=sys.stderr)
+            else:
+                print(f"{backend:>7} {size:>8}: {result['status']} {result.get('error', '')}", file=sys.stderr)
+
+    report = {
+        'generated_at': time.time(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'num_queries': NUM_QUERIES,
+        'top_k': TOP_K,
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({'output': args.output, 'cases': len(results)}, indent=2))
+
+if __name__ == "__main__":
+    main()
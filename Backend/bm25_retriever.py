@@ -0,0 +1,158 @@
+"""
+Inverted-index BM25 retriever
+Flow: Query terms -> Posting lists (highest impact first) -> MaxScore pruning -> Top k
+
+Each posting stores a precomputed BM25 impact, so scoring a query is a sum over
+the postings of its terms. Once the k-th best partial score exceeds what the
+remaining terms could add, documents that have not been seen yet are skipped and
+the remaining posting lists are only probed for the surviving candidates.
+Query cost therefore scales with matched postings rather than corpus size.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Dict, Tuple
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+import numpy as np
+
+from retrieval_kernel import top_k_rows
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in ENGLISH_STOP_WORDS]
+
+
+class BM25Retriever:
+    """BM25 over term posting lists with MaxScore early termination"""
+
+    def __init__(self, vocabulary: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray, impacts: np.ndarray, upper_bounds: np.ndarray, num_documents: int):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.impacts = impacts
+        self.upper_bounds = upper_bounds
+        self.num_documents = num_documents
+
+    @classmethod
+    def from_texts(cls, texts: List[str], k1: float = BM25_K1, b: float = BM25_B) -> 'BM25Retriever':
+        doc_terms = [Counter(tokenize(text)) for text in texts]
+        doc_lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float64)
+        avg_length = float(doc_lengths.mean()) if len(texts) and doc_lengths.mean() > 0 else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, terms in enumerate(doc_terms):
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        vocabulary = {}
+        offsets = [0]
+        doc_ids, impacts, upper_bounds = [], [], []
+        num_documents = len(texts)
+        for term_id, (term, plist) in enumerate(sorted(postings.items())):
+            vocabulary[term] = term_id
+            df = len(plist)
+            idf = math.log(1.0 + (num_documents - df + 0.5) / (df + 0.5))
+            ids = np.array([d for d, _ in plist], dtype=np.int32)
+            tfs = np.array([tf for _, tf in plist], dtype=np.float64)
+            norm = k1 * (1.0 - b + b * doc_lengths[ids] / avg_length)
+            term_impacts = idf * tfs * (k1 + 1.0) / (tfs + norm)
+            doc_ids.append(ids)
+            impacts.append(term_impacts.astype(np.float32))
+            upper_bounds.append(float(term_impacts.max()))
+            offsets.append(offsets[-1] + df)
+
+        return cls(
+            vocabulary,
+            np.array(offsets, dtype=np.int64),
+            np.concatenate(doc_ids) if doc_ids else np.empty(0, dtype=np.int32),
+            np.concatenate(impacts) if impacts else np.empty(0, dtype=np.float32),
+            np.array(upper_bounds, dtype=np.float32),
+            num_documents
+        )
+
+    def segment(self, texts: List[str]) -> 'BM25Retriever':
+        """A delta segment over extra documents (its own statistics; scores stay in [0, 1])"""
+        return BM25Retriever.from_texts(texts)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'offsets.npy'), self.offsets)
+        np.save(os.path.join(path, 'doc_ids.npy'), self.doc_ids)
+        np.save(os.path.join(path, 'impacts.npy'), self.impacts)
+        np.save(os.path.join(path, 'upper_bounds.npy'), self.upper_bounds)
+        with open(os.path.join(path, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+            json.dump({'num_documents': self.num_documents, 'terms': self.vocabulary}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'BM25Retriever':
+        with open(os.path.join(path, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        return cls(
+            vocab['terms'],
+            np.load(os.path.join(path, 'offsets.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'doc_ids.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'impacts.npy'), mmap_mode='r'),
+            np.load(os.path.join(path, 'upper_bounds.npy'), mmap_mode='r'),
+            vocab['num_documents']
+        )
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.impacts[start:end]
+
+    def search_one(self, query: str, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top k (scores, doc indices) for one query; scores are scaled into [0, 1]"""
+        query_terms = Counter(t for t in tokenize(query) if t in self.vocabulary)
+        if not query_terms or k <= 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+
+        terms = [(self.vocabulary[t], qtf, float(self.upper_bounds[self.vocabulary[t]]) * qtf) for t, qtf in query_terms.items()]
+        terms.sort(key=lambda item: item[2], reverse=True)
+        # remaining[i] = best score any document can still gain from terms[i:]
+        remaining = np.concatenate([np.cumsum([ub for _, _, ub in terms][::-1])[::-1], [0.0]])
+        max_score = float(remaining[0])
+
+        cand_docs = np.empty(0, dtype=np.int64)
+        cand_scores = np.empty(0, dtype=np.float64)
+        threshold = 0.0
+        for pos, (term_id, qtf, _) in enumerate(terms):
+            if cand_docs.shape[0] >= k and remaining[pos] < threshold:
+                # Non-essential terms: no unseen document can reach the top k,
+                # so only probe the remaining posting lists for live candidates
+                for j in range(pos, len(terms)):
+                    keep = cand_scores + remaining[j] >= threshold
+                    cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+                    docs, impacts = self._postings(terms[j][0])
+                    loc = np.minimum(np.searchsorted(docs, cand_docs), docs.shape[0] - 1)
+                    hit = docs[loc] == cand_docs
+                    cand_scores[hit] += impacts[loc[hit]] * terms[j][1]
+                    threshold = np.partition(cand_scores, -k)[-k] if cand_scores.shape[0] >= k else threshold
+                break
+
+            docs, impacts = self._postings(term_id)
+            merged_docs = np.concatenate([cand_docs, docs.astype(np.int64)])
+            merged_scores = np.concatenate([cand_scores, impacts.astype(np.float64) * qtf])
+            cand_docs, inverse = np.unique(merged_docs, return_inverse=True)
+            cand_scores = np.bincount(inverse, weights=merged_scores, minlength=cand_docs.shape[0])
+            if cand_docs.shape[0] >= k:
+                threshold = np.partition(cand_scores, -k)[-k]
+
+        scores, indices = top_k_rows(cand_scores, cand_docs, k)
+        return scores / max_score, indices
+
+    def search(self, queries: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Same contract as retrieval_kernel.sparse_top_k: padded (n_queries, k) arrays"""
+        scores = np.zeros((len(queries), k), dtype=np.float64)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, query in enumerate(queries):
+            row_scores, row_indices = self.search_one(query, k)
+            scores[row, :row_scores.shape[0]] = row_scores
+            indices[row, :row_indices.shape[0]] = row_indices
+        return scores, indices
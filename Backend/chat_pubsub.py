@@ -0,0 +1,287 @@
+"""
+Pub/sub for the live chat relay
+Flow: WebSocket message -> publish(channel) -> every subscribed worker -> local WebSocket
+
+Two backends share one interface:
+- InProcessPubSub: a dict of callbacks, for a single uvicorn worker.
+- BrokerPubSub: newline-delimited JSON over a Unix (or TCP) socket to a small
+  broker, so customers and admins connected to different workers or hosts
+  still reach each other. With a unix:// URL the first worker that finds no
+  broker starts one in-process; the others connect to it and take over if it
+  goes away. The broker can also run on its own: python chat_pubsub.py --broker
+"""
+
+import sys
+import argparse
+import asyncio
+import json
+import os
+from typing import Awaitable, Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHAT_PUBSUB_BACKEND = os.getenv('CHAT_PUBSUB_BACKEND', 'memory')  # 'memory' or 'broker'
+CHAT_PUBSUB_URL = os.getenv('CHAT_PUBSUB_URL', f"unix://{os.path.join(BASE_DIR, 'chat_pubsub.sock')}")
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 5.0
+
+Callback = Callable[[dict], Awaitable[None]]
+
+
+class InProcessPubSub:
+    """Channels and subscribers inside this process only"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Callback]] = {}
+
+    async def start(self):
+        pass
+
+    async def subscribe(self, channel: str, callback: Callback):
+        self._subscribers.setdefault(channel, set()).add(callback)
+
+    async def unsubscribe(self, channel: str, callback: Callback):
+        callbacks = self._subscribers.get(channel)
+        if callbacks is not None:
+            callbacks.discard(callback)
+            if not callbacks:
+                del self._subscribers[channel]
+
+    async def publish(self, channel: str, message: dict):
+        for callback in list(self._subscribers.get(channel, ())):
+            await callback(message)
+
+    async def close(self):
+        self._subscribers.clear()
+
+    def stats(self) -> dict:
+        return {'backend': 'memory', 'channels': len(self._subscribers)}
+
+
+# Broker
+
+async def _open(url: str):
+    parsed = urlparse(url)
+    if parsed.scheme == 'unix':
+        return await asyncio.open_unix_connection(parsed.path)
+    return await asyncio.open_connection(parsed.hostname, parsed.port)
+
+
+class PubSubBroker:
+    """Fans published messages out to every connection subscribed to the channel"""
+
+    def __init__(self, url: str = CHAT_PUBSUB_URL):
+        self.url = url
+        self._channels: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._server = None
+
+    async def start(self):
+        parsed = urlparse(self.url)
+        if parsed.scheme == 'unix':
+            self._server = await asyncio.start_unix_server(self._handle, parsed.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, parsed.hostname, parsed.port)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscribed: Set[str] = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                channel = frame.get('channel', '')
+                if frame['op'] == 'sub':
+                    self._channels.setdefault(channel, set()).add(writer)
+                    subscribed.add(channel)
+                elif frame['op'] == 'unsub':
+                    self._drop(channel, writer)
+                    subscribed.discard(channel)
+                elif frame['op'] == 'pub':
+                    payload = (json.dumps({'channel': channel, 'message': frame['message']}, ensure_ascii=False) + "\n").encode('utf-8')
+                    for target in list(self._channels.get(channel, ())):
+                        target.write(payload)
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass  # a cancelled handler means the broker is shutting down
+        finally:
+            for channel in subscribed:
+                self._drop(channel, writer)
+            writer.close()
+
+    def _drop(self, channel: str, writer: asyncio.StreamWriter):
+        writers = self._channels.get(channel)
+        if writers is not None:
+            writers.discard(writer)
+            if not writers:
+                del self._channels[channel]
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            parsed = urlparse(self.url)
+            if parsed.scheme == 'unix' and os.path.exists(parsed.path):
+                os.unlink(parsed.path)
+
+
+class BrokerPubSub:
+    """Client of a PubSubBroker; reconnects and resubscribes if the broker restarts"""
+
+    def __init__(self, url: str = CHAT_PUBSUB_URL, embedded_broker: bool = True):
+        self.url = url
+        self.embedded_broker = embedded_broker and url.startswith('unix://')
+        self._subscribers: Dict[str, Set[Callback]] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._broker: Optional[PubSubBroker] = None
+        self._connected = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+        self._closing = False
+        self.dropped = 0
+
+    async def start(self):
+        async with self._start_lock:
+            if self._reader_task is None:
+                await self._connect()
+                self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _connect(self):
+        try:
+            reader, writer = await _open(self.url)
+        except (ConnectionRefusedError, FileNotFoundError):
+            if not self.embedded_broker:
+                raise
+            reader, writer = await self._take_over_broker()
+        self._reader, self._writer = reader, writer
+        for channel in self._subscribers:
+            await self._send({'op': 'sub', 'channel': channel})
+        self._connected.set()
+
+    async def _take_over_broker(self):
+        """No live broker: host one here, unless another worker wins the race for the lock"""
+        import fcntl  # unix:// only, so the module still imports on Windows
+        path = urlparse(self.url).path
+        with open(f"{path}.lock", 'w') as lock:
+            # Another worker may hold the lock while it starts the broker
+            await asyncio.to_thread(fcntl.flock, lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    return await _open(self.url)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    pass
+                if os.path.exists(path):
+                    os.unlink(path)  # left behind by a broker that died
+                self._broker = PubSubBroker(self.url)
+                await self._broker.start()
+                print(f"INFO: Chat pub/sub broker started on {self.url} (pid {os.getpid()})", file=sys.stderr)
+                return await _open(self.url)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    async def _send(self, frame: dict):
+        self._writer.write((json.dumps(frame, ensure_ascii=False) + "\n").encode('utf-8'))
+        await self._writer.drain()
+
+    async def _try_send(self, frame: dict) -> bool:
+        """_send that marks the connection down instead of raising; the read loop reconnects"""
+        try:
+            await self._send(frame)
+            return True
+        except (ConnectionError, OSError):
+            self._connected.clear()
+            return False
+
+    async def _read_loop(self):
+        delay = RECONNECT_DELAY
+        while not self._closing:
+            try:
+                line = await self._reader.readline()
+                if not line:
+                    raise ConnectionError("broker closed the connection")
+                frame = json.loads(line)
+                for callback in list(self._subscribers.get(frame['channel'], ())):
+                    try:
+                        await callback(frame['message'])
+                    except Exception as e:
+                        print(f"Pub/sub delivery error: {e}", file=sys.stderr)
+                delay = RECONNECT_DELAY
+            except (ConnectionError, OSError, ValueError):
+                if self._closing:
+                    break
+                self._connected.clear()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                try:
+                    await self._connect()
+                except OSError:
+                    pass
+
+    async def subscribe(self, channel: str, callback: Callback):
+        await self.start()
+        first = channel not in self._subscribers
+        self._subscribers.setdefault(channel, set()).add(callback)
+        if first and self._connected.is_set():
+            # If this fails, the reconnect resubscribes every channel
+            await self._try_send({'op': 'sub', 'channel': channel})
+
+    async def unsubscribe(self, channel: str, callback: Callback):
+        callbacks = self._subscribers.get(channel)
+        if callbacks is None:
+            return
+        callbacks.discard(callback)
+        if not callbacks:
+            del self._subscribers[channel]
+            if self._connected.is_set():
+                await self._try_send({'op': 'unsub', 'channel': channel})
+
+    async def publish(self, channel: str, message: dict):
+        await self.start()
+        # Live chat is best effort, like a WebSocket send to a closed peer
+        if not self._connected.is_set() or not await self._try_send({'op': 'pub', 'channel': channel, 'message': message}):
+            self.dropped += 1
+
+    async def close(self):
+        self._closing = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        if self._broker is not None:
+            self._broker.close()
+
+    def stats(self) -> dict:
+        return {'backend': 'broker', 'url': self.url, 'connected': self._connected.is_set(), 'hosting_broker': self._broker is not None, 'channels': len(self._subscribers), 'dropped': self.dropped}
+
+
+def create_pubsub(backend: str = CHAT_PUBSUB_BACKEND, url: str = CHAT_PUBSUB_URL):
+    """The pub/sub backend selected by CHAT_PUBSUB_BACKEND"""
+    if backend == 'broker':
+        return BrokerPubSub(url)
+    return InProcessPubSub()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chat relay pub/sub broker')
+    parser.add_argument('--broker', action='store_true', help='Run a standalone broker')
+    parser.add_argument('--url', default=CHAT_PUBSUB_URL, help='unix:///path/to.sock or tcp://host:port')
+    args = parser.parse_args()
+    if not args.broker:
+        parser.print_help()
+        return
+
+    async def serve():
+        broker = PubSubBroker(args.url)
+        await broker.start()
+        print(f"Chat pub/sub broker listening on {args.url}", file=sys.stderr)
+        try:
+            await broker.serve_forever()
+        finally:
+            broker.close()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
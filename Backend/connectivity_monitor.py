@@ -0,0 +1,118 @@
+"""
+Background connectivity monitor
+Flow: Probe thread (internet + LLM endpoint) -> Cached state -> O(1) reads on the request path
+
+Probes run every CONNECTIVITY_CHECK_INTERVAL seconds, every
+CONNECTIVITY_RETRY_INTERVAL seconds while something is down, and immediately
+when a caller reports a failure (e.g. a failed LLM call). Requests never wait
+on a probe; they read the last published state.
+"""
+
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from llm_client import get_llm_client
+
+# Configuration
+CONNECTIVITY_CHECK_INTERVAL = float(os.getenv('CONNECTIVITY_CHECK_INTERVAL', '30'))
+CONNECTIVITY_RETRY_INTERVAL = float(os.getenv('CONNECTIVITY_RETRY_INTERVAL', '5'))
+PROBE_TIMEOUT = 3
+INTERNET_PROBES = [(("8.8.8.8", 53), 'Connected'), (("1.1.1.1", 53), 'Connected (fallback)')]
+
+
+def _tcp_probe(address, timeout: float = PROBE_TIMEOUT) -> bool:
+    try:
+        socket.create_connection(address, timeout=timeout).close()
+        return True
+    except OSError:
+        return False
+
+
+class ConnectivityMonitor:
+    """Daemon thread that keeps internet and LLM endpoint health up to date"""
+
+    def __init__(self, interval: float = CONNECTIVITY_CHECK_INTERVAL, retry_interval: float = CONNECTIVITY_RETRY_INTERVAL):
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.llm = get_llm_client()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.probes = 0
+        # Optimistic until the first probe finishes so startup never blocks requests
+        self._internet = {'available': True, 'status': 'Checking', 'check_time': time.time()}
+        self._llm_endpoint = {'available': self.llm.configured, 'status': 'Checking' if self.llm.configured else 'Not configured', 'check_time': time.time()}
+        self.llm.add_failure_listener(self.request_refresh)
+
+    def start(self) -> 'ConnectivityMonitor':
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="connectivity-monitor", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def request_refresh(self):
+        """Probe again now instead of waiting for the next interval"""
+        self._wake.set()
+
+    def internet_status(self) -> Dict[str, Any]:
+        return self._internet
+
+    def llm_status(self) -> Dict[str, Any]:
+        return self._llm_endpoint
+
+    def state(self) -> Dict[str, Any]:
+        return {'internet': self._internet, 'llm_endpoint': self._llm_endpoint, 'probes': self.probes, 'interval': self.interval}
+
+    def probe(self):
+        """Run one round of probes and publish the results"""
+        internet = {'available': False, 'status': 'No internet connection', 'check_time': time.time()}
+        for address, status in INTERNET_PROBES:
+            if _tcp_probe(address):
+                internet = {'available': True, 'status': status, 'check_time': time.time()}
+                break
+        self._internet = internet
+
+        if self.llm.configured:
+            parsed = urlparse(self.llm.endpoint)
+            port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+            reachable = bool(parsed.hostname) and _tcp_probe((parsed.hostname, port))
+            self._llm_endpoint = {'available': reachable, 'status': 'Reachable' if reachable else 'Unreachable', 'check_time': time.time()}
+        self.probes += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception:
+                pass
+            healthy = self._internet['available'] and (self._llm_endpoint['available'] or not self.llm.configured)
+            probed_at = time.time()
+            self._wake.wait(self.interval if healthy else self.retry_interval)
+            self._wake.clear()
+            # A burst of reported failures triggers at most one probe per retry interval
+            self._stop.wait(max(0.0, self.retry_interval - (time.time() - probed_at)))
+
+
+_MONITOR = None
+_MONITOR_LOCK = threading.Lock()
+
+
+def get_connectivity_monitor() -> ConnectivityMonitor:
+    """The shared, running process-wide ConnectivityMonitor"""
+    global _MONITOR
+    if _MONITOR is None:
+        with _MONITOR_LOCK:
+            if _MONITOR is None:
+                _MONITOR = ConnectivityMonitor().start()
+    return _MONITOR
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Dense Semantic Retriever
+Flow: FAQ questions -> Sentence embeddings (offline) -> Persisted FAISS index -> Hybrid fusion with lexical scores
+
+Build the index offline with:
+
+    python dense_retriever.py --build
+
+The embedding model is always loaded from a local directory (DENSE_MODEL_PATH);
+the Hugging Face hub is never contacted.
+"""
+
+import sys
+import json
+import argparse
+import queue
+import shutil
+import threading
+import time
+import os
+from concurrent.futures import Future
+from typing import List, Dict, Tuple
+import numpy as np
+
+from retrieval_kernel import top_k_rows
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DENSE_MODEL_PATH = os.getenv('DENSE_MODEL_PATH', os.path.join(BASE_DIR, "models", "all-MiniLM-L6-v2"))
+DENSE_INDEX_TYPE = os.getenv('DENSE_INDEX_TYPE', 'flat')  # 'flat', 'ivf' or 'hnsw'
+ENCODER_MAX_BATCH = 32
+ENCODER_MAX_WAIT = 0.005  # seconds a query waits for others to join its batch
+RRF_K = 60
+FUSION_DEPTH = 50  # candidates taken from each retriever before fusion
+
+_MODEL_CACHE = {}
+
+
+def load_local_model(model_path: str = DENSE_MODEL_PATH):
+    """Load a sentence-transformers model from disk with all network access disabled"""
+    if model_path in _MODEL_CACHE:
+        return _MODEL_CACHE[model_path]
+    if not os.path.isdir(model_path):
+        raise FileNotFoundError(f"Dense model not found at {model_path}")
+
+    os.environ['HF_HUB_OFFLINE'] = '1'
+    os.environ['TRANSFORMERS_OFFLINE'] = '1'
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_path, device='cpu')
+    _MODEL_CACHE[model_path] = model
+    return model
+
+
+def encode(model, texts: List[str], batch_size: int = ENCODER_MAX_BATCH) -> np.ndarray:
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+class BatchingEncoder:
+    """
+    Micro-batches concurrent single-query encodes on CPU.
+    A background thread collects queries for up to ENCODER_MAX_WAIT seconds
+    (or ENCODER_MAX_BATCH queries) and encodes them in one forward pass.
+    """
+
+    def __init__(self, model, max_batch: int = ENCODER_MAX_BATCH, max_wait: float = ENCODER_MAX_WAIT):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="dense-encoder", daemon=True)
+        self._worker.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts, sharing a forward pass with any queries submitted concurrently"""
+        if len(texts) >= self.max_batch:
+            return encode(self.model, texts, self.max_batch)
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        return np.vstack([future.result() for future in futures])
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                embeddings = encode(self.model, [text for text, _ in batch], self.max_batch)
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding[None, :])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+def build_faiss_index(embeddings: np.ndarray, index_type: str = DENSE_INDEX_TYPE):
+    """Inner-product FAISS index over L2-normalised embeddings (inner product == cosine)"""
+    import faiss
+
+    dim = embeddings.shape[1]
+    if index_type == 'hnsw':
+        index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = 64
+    elif index_type == 'ivf' and embeddings.shape[0] >= 1000:
+        nlist = int(np.sqrt(embeddings.shape[0]))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+        index.nprobe = max(1, nlist // 8)
+    else:
+        # IVF needs enough points to train its centroids; small corpora stay flat
+        index = faiss.IndexFlatIP(dim)
+    index.add(embeddings)
+    return index
+
+
+class DenseRetriever:
+    """FAISS-backed semantic retriever with the search(queries, k) contract of the other backends"""
+
+    def __init__(self, index, encoder: BatchingEncoder):
+        self.index = index
+        self.encoder = encoder
+
+    def search(self, queries: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = np.zeros((len(queries), k), dtype=np.float64)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        if not queries or self.index.ntotal == 0:
+            return scores, indices
+        found_scores, found_indices = self.index.search(self.encoder.encode(queries), min(k, self.index.ntotal))
+        width = found_scores.shape[1]
+        scores[:, :width] = np.clip(found_scores, 0.0, 1.0)
+        indices[:, :width] = found_indices
+        return scores, indices
+
+    def segment(self, texts: List[str]) -> 'DenseRetriever':
+        """A delta segment: a small flat index over extra documents, sharing the encoder"""
+        return DenseRetriever(build_faiss_index(self.encoder.encode(texts), 'flat'), self.encoder)
+
+
+class HybridRetriever:
+    """
+    Reciprocal rank fusion of a lexical and a dense retriever.
+    Documents are ordered by RRF; the reported score is the best similarity either
+    retriever gave the document, so RELEVANCE_THRESHOLD keeps its meaning.
+    """
+
+    def __init__(self, lexical, dense, rrf_k: int = RRF_K, depth: int = FUSION_DEPTH):
+        self.lexical = lexical
+        self.dense = dense
+        self.rrf_k = rrf_k
+        self.depth = depth
+
+    def search(self, queries: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        depth = max(k, self.depth)
+        lexical_scores, lexical_indices = self.lexical.search(queries, depth)
+        dense_scores, dense_indices = self.dense.search(queries, depth)
+
+        scores = np.zeros((len(queries), k), dtype=np.float64)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        for row in range(len(queries)):
+            fused: Dict[int, float] = {}
+            similarity: Dict[int, float] = {}
+            for row_scores, row_indices in ((lexical_scores[row], lexical_indices[row]), (dense_scores[row], dense_indices[row])):
+                for rank, (score, idx) in enumerate(zip(row_scores, row_indices)):
+                    if idx < 0:
+                        break
+                    idx = int(idx)
+                    fused[idx] = fused.get(idx, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                    similarity[idx] = max(similarity.get(idx, 0.0), float(score))
+            if not fused:
+                continue
+            docs = np.fromiter(fused.keys(), dtype=np.int64, count=len(fused))
+            _, order = top_k_rows(np.fromiter(fused.values(), dtype=np.float64, count=len(fused)), np.arange(len(fused)), k)
+            top_docs = docs[order]
+            scores[row, :len(top_docs)] = [similarity[int(d)] for d in top_docs]
+            indices[row, :len(top_docs)] = top_docs
+        return scores, indices
+
+    def segment(self, texts: List[str]) -> 'HybridRetriever':
+        return HybridRetriever(self.lexical.segment(texts), self.dense.segment(texts), self.rrf_k, self.depth)
+
+
+def dense_artifact_path(index_dir: str, version: str) -> str:
+    return os.path.join(index_dir, f"dense-{version}")
+
+
+def build_dense_index(index_dir: str, version: str, questions: List[str], model_path: str = DENSE_MODEL_PATH, index_type: str = DENSE_INDEX_TYPE, force: bool = False) -> str:
+    """Encode the corpus and persist the FAISS index next to the lexical artifacts"""
+    import faiss
+
+    target = dense_artifact_path(index_dir, version)
+    manifest_file = os.path.join(target, 'manifest.json')
+    if os.path.exists(manifest_file) and not force:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('model_path') == model_path and manifest.get('index_type') == index_type:
+            return target
+
+    embeddings = encode(load_local_model(model_path), questions)
+    index = build_faiss_index(embeddings, index_type)
+
+    os.makedirs(index_dir, exist_ok=True)
+    staging = os.path.join(index_dir, f".dense-{version}-{os.getpid()}-{int(time.time() * 1000)}")
+    os.makedirs(staging)
+    try:
+        faiss.write_index(index, os.path.join(staging, 'index.faiss'))
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': version,
+                'model_path': model_path,
+                'index_type': index_type,
+                'dimension': int(embeddings.shape[1]),
+                'num_documents': int(embeddings.shape[0]),
+                'built_at': time.time()
+            }, f, indent=2)
+        if os.path.exists(target):
+            shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another worker published the same version first
+            pass
+    finally:
+        if os.path.exists(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def load_dense_retriever(index_dir: str, version: str, questions: List[str], model_path: str = DENSE_MODEL_PATH) -> DenseRetriever:
+    """Memory-map the persisted FAISS index (building it first if missing) and attach a batching encoder"""
+    import faiss
+
+    path = build_dense_index(index_dir, version, questions, model_path)
+    try:
+        index = faiss.read_index(os.path.join(path, 'index.faiss'), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Not every index type supports memory-mapping
+        index = faiss.read_index(os.path.join(path, 'index.faiss'))
+    if hasattr(index, 'nprobe'):
+        index.nprobe = max(1, index.nlist // 8)
+    return DenseRetriever(index, BatchingEncoder(load_local_model(model_path)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the dense FAISS index')
+    parser.add_argument('--build', action='store_true', help='Encode the knowledge base and write the FAISS index')
+    parser.add_argument('--model', default=DENSE_MODEL_PATH, help='Local sentence-transformers model directory')
+    parser.add_argument('--index-type', choices=['flat', 'ivf', 'hnsw'], default=DENSE_INDEX_TYPE, help='FAISS index type')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the index already exists')
+    args = parser.parse_args()
+
+    try:
+        from retrieval_index import INDEX_DIR, build_index, load_index
+
+        start_time = time.time()
+        index = load_index(build_index())
+        questions = [entry["question"] for entry in index.metadata]
+        path = dense_artifact_path(INDEX_DIR, index.version)
+        if args.build:
+            path = build_dense_index(INDEX_DIR, index.version, questions, args.model, args.index_type, force=args.force)
+        print(json.dumps({'version': index.version, 'path': path, 'documents': len(questions), 'elapsed': time.time() - start_time}, indent=2))
+    except Exception as e:
+        print(json.dumps({'error': str(e)}, indent=2))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
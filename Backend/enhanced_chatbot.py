@@ -7,194 +7,172 @@ Flow: User Input -> Internet Check -> RAG (Top 10) -> LLM Brain -> Response
 import sys
 import json
 import argparse
-import pickle
+import asyncio
 import time
 import os
-import requests
-import socket
-import html
 import re
-from typing import List, Dict, Any, Tuple
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from typing import List, Dict, Any, Tuple, AsyncIterator
+from retrieval_service import get_retrieval_service
+from query_cache import TTLCache
+from answer_cache import AnswerCache, answer_cache_key
+from text_normalizer import normalize_entities, IncrementalNormalizer
+from llm_client import get_llm_client, LLMStreamError
+from connectivity_monitor import get_connectivity_monitor
+from single_flight import SingleFlight
+from metrics import get_metrics, stage_timer
+from session_store import get_session_store
+from prompt_builder import BuiltPrompt, build_prompt
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-METADATA_PATH = os.path.join(BASE_DIR, "metadata.pkl")
 SESSIONS_DIR = os.path.join(BASE_DIR, "sessions")
 TOP_K = 10  # Exactly 10 elements from RAG
 RELEVANCE_THRESHOLD = 0.15
-INTERNET_TIMEOUT = 3
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '2048'))
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '600'))
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv('ANSWER_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+ANSWER_CACHE_PATH = os.getenv('ANSWER_CACHE_PATH', '')  # JSONL file to persist answers across restarts
+ANSWER_CACHE_MIN_SCORE = 0.3  # only reuse answers when the top evidence is at least 'medium' relevance
+PDF_TOUCH_INTERVAL = 60  # seconds between last-use updates of a PDF state file
 
-# Global caches
-_METADATA_CACHE = None
-_VECTORIZER_CACHE = None
-_CORPUS_EMBEDDINGS_CACHE = None
+# Retrieval results keyed on the normalized, expanded query
+_QUERY_CACHE = TTLCache(max_entries=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+# LLM answers keyed on the normalized query plus the retrieved FAQ ids
+_ANSWER_CACHE = AnswerCache(max_bytes=ANSWER_CACHE_MAX_BYTES, ttl=ANSWER_CACHE_TTL, persist_path=ANSWER_CACHE_PATH or None)
+# Concurrent requests with the exact same prompt on the same KB version share one LLM call
+_SINGLE_FLIGHT = SingleFlight()
 
 os.makedirs(SESSIONS_DIR, exist_ok=True)
 
+def query_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of the retrieval result cache"""
+    return _QUERY_CACHE.stats()
+
+def answer_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters of the LLM answer cache"""
+    return _ANSWER_CACHE.stats()
+
+def coalescing_stats() -> Dict[str, Any]:
+    """How many LLM calls were shared by concurrent identical requests"""
+    return _SINGLE_FLIGHT.stats()
+
 def aggressive_clean_html(text: str) -> str:
     """Aggressively clean all HTML entities"""
-    if not text:
-        return text
-    
-    # Multiple passes to ensure all entities are decoded
-    for _ in range(5):
-        text = html.unescape(text)
-    
-    # Manual cleanup for stubborn entities that html.unescape might miss
-    text = text.replace('&quot;', '"')
-    text = text.replace('&#39;', "'")
-    text = text.replace('&#x27;', "'")
-    text = text.replace('&amp;', '&')
-    text = text.replace('&lt;', '<')
-    text = text.replace('&gt;', '>')
-    text = text.replace('&nbsp;', ' ')
-    
-    return text
+    return normalize_entities(text)
 
 class EnhancedChatbot:
     """Enhanced chatbot with the requested flow"""
     
     def __init__(self):
         self.session_data = {}
+        self.retrieval = get_retrieval_service()
+        self.llm = get_llm_client()
+        self.connectivity = get_connectivity_monitor()
+        self.sessions = get_session_store()
         
     def check_internet(self) -> Dict[str, Any]:
-        """Step 1: Check internet connectivity"""
-        try:
-            socket.create_connection(("8.8.8.8", 53), timeout=INTERNET_TIMEOUT)
-            return {'available': True, 'status': 'Connected', 'check_time': time.time()}
-        except OSError:
-            try:
-                socket.create_connection(("1.1.1.1", 53), timeout=INTERNET_TIMEOUT)
-                return {'available': True, 'status': 'Connected (fallback)', 'check_time': time.time()}
-            except OSError:
-                return {'available': False, 'status': 'No internet connection', 'check_time': time.time()}
+        """Step 1: Internet connectivity as last seen by the background monitor"""
+        with stage_timer('connectivity'):
+            return self.connectivity.internet_status()
     
-    def load_knowledge_base(self):
-        """Load the RAG knowledge base"""
-        global _METADATA_CACHE, _VECTORIZER_CACHE, _CORPUS_EMBEDDINGS_CACHE
-        
-        if _METADATA_CACHE is not None:
-            return _METADATA_CACHE, _VECTORIZER_CACHE, _CORPUS_EMBEDDINGS_CACHE
+    async def acheck_internet(self) -> Dict[str, Any]:
+        """check_internet for async callers; never waits on the network"""
+        return self.check_internet()
+    
+    def load_knowledge_base(self) -> List[Dict]:
+        """Load the RAG knowledge base (shared across the process by the retrieval service)"""
+        return self.retrieval.metadata
+    
+    def expand_query(self, query: str) -> str:
+        """Lowercase the query and append banking synonyms"""
+        query_processed = query.lower()
+        banking_expansions = {
+            'password': 'password reset change login security',
+            'account': 'account balance banking services',
+            'transfer': 'transfer money send wire payment',
+            'card': 'card credit debit activate payment',
+            'loan': 'loan mortgage credit application',
+            'atm': 'atm cash withdraw deposit machine'
+        }
         
-        try:
-            with open(METADATA_PATH, "rb") as f:
-                raw_metadata = pickle.load(f)
-            
-            metadata = []
-            for entry in raw_metadata:
-                q = entry.get("question") or entry.get("query") or entry.get("text") or ""
-                a = entry.get("answer") or entry.get("ans") or entry.get("response") or ""
-                if q and a and len(q) > 10 and len(a) > 20:
-                    # Clean HTML entities from metadata
-                    metadata.append({"question": aggressive_clean_html(q), "answer": aggressive_clean_html(a)})
-            
-            corpus = [entry["question"] for entry in metadata]
-            vectorizer = TfidfVectorizer(max_features=3000, stop_words='english', ngram_range=(1, 3))
-            corpus_embeddings = vectorizer.fit_transform(corpus)
-            
-            _METADATA_CACHE = metadata
-            _VECTORIZER_CACHE = vectorizer
-            _CORPUS_EMBEDDINGS_CACHE = corpus_embeddings
-            
-            return metadata, vectorizer, corpus_embeddings
-            
-        except Exception:
-            return [], None, None
+        for term, expansion in banking_expansions.items():
+            if term in query_processed:
+                query_processed += f' {expansion}'
+        return query_processed
     
     def get_top_10_from_rag(self, query: str) -> List[Dict]:
         """Step 2: Get exactly top 10 elements from RAG"""
-        metadata, vectorizer, corpus_embeddings = self.load_knowledge_base()
+        return self.get_top_10_from_rag_batch([query])[0]
+    
+    def get_top_10_from_rag_batch(self, queries: List[str]) -> List[List[Dict]]:
+        """Top 10 RAG elements for several queries in one vectorized call"""
+        with stage_timer('retrieval'):
+            # One snapshot per call so metadata and index stay consistent across live KB updates
+            snapshot = self.retrieval.snapshot()
         
-        if not metadata or vectorizer is None:
-            return []
+            if snapshot is None or not snapshot.metadata:
+                return [[] for _ in queries]
         
-        try:
-            query_processed = query.lower()
-            banking_expansions = {
-                'password': 'password reset change login security',
-                'account': 'account balance banking services',
-                'transfer': 'transfer money send wire payment',
-                'card': 'card credit debit activate payment',
-                'loan': 'loan mortgage credit application',
-                'atm': 'atm cash withdraw deposit machine'
-            }
-            
-            for term, expansion in banking_expansions.items():
-                if term in query_processed:
-                    query_processed += f' {expansion}'
-            
-            query_vec = vectorizer.transform([query_processed])
-            similarities = cosine_similarity(query_vec, corpus_embeddings).flatten()
-            top_indices = np.argsort(similarities)[::-1][:TOP_K]
+            try:
+                metadata = snapshot.metadata
+                # Hot queries are served from the cache and skip vectorization and scoring
+                version = snapshot.version
+                keys = [' '.join(self.expand_query(q).split()) for q in queries]
+                results = [_QUERY_CACHE.get(key, version) for key in keys]
+                misses = [i for i, cached in enumerate(results) if cached is None]
             
-            top_10_docs = []
-            for i, idx in enumerate(top_indices):
-                score = similarities[idx]
-                if score >= RELEVANCE_THRESHOLD:
-                    top_10_docs.append({
-                        'rank': i + 1,
-                        'question': metadata[idx]['question'],
-                        'answer': metadata[idx]['answer'],
-                        'score': float(score),
-                        'relevance': 'high' if score > 0.5 else 'medium' if score > 0.3 else 'low'
-                    })
+                if misses:
+                    all_scores, all_indices = snapshot.search([keys[i] for i in misses], TOP_K)
+                    for pos, scores, indices in zip(misses, all_scores, all_indices):
+                        top_10_docs = []
+                        for i, (score, idx) in enumerate(zip(scores, indices)):
+                            if idx >= 0 and score >= RELEVANCE_THRESHOLD:
+                                top_10_docs.append({
+                                    'rank': i + 1,
+                                    'id': metadata[idx]['id'],
+                                    'question': metadata[idx]['question'],
+                                    'answer': metadata[idx]['answer'],
+                                    'score': float(score),
+                                    'relevance': 'high' if score > 0.5 else 'medium' if score > 0.3 else 'low'
+                                })
+                        _QUERY_CACHE.put(keys[pos], top_10_docs, version)
+                        results[pos] = top_10_docs
             
-            return top_10_docs
+                return [[dict(doc) for doc in docs] for docs in results]
             
-        except Exception:
-            return []
+            except Exception as e:
+                get_metrics().error('retrieval', e)
+                return [[] for _ in queries]
     
-    def load_chat_history(self, session_id: str) -> List[Dict]:
-        """Load full chat history for the session"""
-        session_file = os.path.join(SESSIONS_DIR, f"{session_id}.json")
-        try:
-            if os.path.exists(session_file):
-                with open(session_file, 'r', encoding='utf-8') as f:
-                    return json.load(f).get('messages', [])
-        except Exception:
-            pass
+    def load_chat_history(self, session_id: str, last_n: int = None) -> List[Dict]:
+        """Chat history for the session (only the last last_n messages if given)"""
+        with stage_timer('session_read'):
+            try:
+                return self.sessions.load(session_id, last_n)
+            except Exception as e:
+                get_metrics().error('session_read', e)
         return []
     
     def save_chat_history(self, session_id: str, messages: List[Dict]):
-        """Save chat history"""
-        session_file = os.path.join(SESSIONS_DIR, f"{session_id}.json")
-        try:
-            with open(session_file, 'w', encoding='utf-8') as f:
-                json.dump({'session_id': session_id, 'messages': messages, 'last_updated': time.time()}, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+        """Replace the whole chat history"""
+        with stage_timer('session_write'):
+            try:
+                self.sessions.replace(session_id, messages)
+            except Exception as e:
+                get_metrics().error('session_write', e)
     
     def call_llm_brain(self, prompt: str) -> str:
         """Step 3: Use LLM as the brain to process information"""
-        from dotenv import load_dotenv
-        load_dotenv()
-        
-        api_key = os.getenv('AZURE_OPENAI_API_KEY')
-        endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
-        deployment = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
-        
-        if not api_key or not endpoint or not deployment:
-            return None
-        
-        try:
-            url = f"{endpoint}openai/deployments/{deployment}/chat/completions?api-version=2024-02-15-preview"
-            headers = {'Content-Type': 'application/json', 'api-key': api_key}
-            payload = {"messages": [{"role": "user", "content": prompt}], "max_tokens": 500, "temperature": 0.7}
-            
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                content = response.json()['choices'][0]['message']['content']
-                cleaned = aggressive_clean_html(content)
-                return cleaned
-            else:
-                return None
-                
-        except Exception:
-            return None
+        with stage_timer('llm'):
+            content = self.llm.complete(prompt, 'brain')
+        return aggressive_clean_html(content) if content is not None else None
+    
+    async def acall_llm_brain(self, prompt: str) -> str:
+        """Non-blocking call_llm_brain"""
+        with stage_timer('llm'):
+            content = await self.llm.acomplete(prompt, 'brain')
+        return aggressive_clean_html(content) if content is not None else None
     
     def check_pdf_mode(self, session_id: str) -> Tuple[bool, Dict[str, str]]:
         """Check if session is in PDF Q&A mode"""
@@ -203,7 +181,11 @@ class EnhancedChatbot:
             if os.path.exists(pdf_state_file):
                 with open(pdf_state_file, 'r', encoding='utf-8') as f:
                     pdf_data = json.load(f)
-                    return True, {'filename': pdf_data.get('filename', ''), 'content': pdf_data.get('extracted_text', '')}
+                # The lifecycle sweep expires PDF states by last use; reads alone do not
+                # move mtime, and atime is not updated on noatime mounts
+                if time.time() - os.path.getmtime(pdf_state_file) > PDF_TOUCH_INTERVAL:
+                    os.utime(pdf_state_file)
+                return True, {'filename': pdf_data.get('filename', ''), 'content': pdf_data.get('extracted_text', '')}
         except Exception:
             pass
         return False, {}
@@ -231,58 +213,180 @@ class EnhancedChatbot:
         
         return f"I couldn't find specific information about '{query}' in your uploaded document ({filename}).", 0.3
     
+    def build_llm_prompt(self, user_input: str, top_10_rag: List[Dict]) -> BuiltPrompt:
+        """Prompt for the LLM brain over the retrieved knowledge sources, within PROMPT_TOKEN_BUDGET"""
+        with stage_timer('prompt_build'):
+            prompt = build_prompt(user_input, top_10_rag)
+        metrics = get_metrics()
+        metrics.observe('prompt_tokens', prompt.tokens)
+        if prompt.dropped_duplicates:
+            metrics.inc('prompt_evidence_dropped_total', prompt.dropped_duplicates, reason='duplicate')
+        if prompt.dropped_budget:
+            metrics.inc('prompt_evidence_dropped_total', prompt.dropped_budget, reason='budget')
+        if prompt.truncated:
+            metrics.inc('prompt_answers_truncated_total', prompt.truncated)
+        if prompt.question_truncated:
+            metrics.inc('prompt_questions_truncated_total')
+        return prompt
+    
+    def lookup_answer(self, user_input: str, top_10_rag: List[Dict]) -> Tuple[str, bool, str]:
+        """Answer cache key, whether the evidence is confident enough to cache, and any cached answer"""
+        # Repeated intents with the same evidence reuse the stored LLM answer
+        answer_key = answer_cache_key(user_input, top_10_rag)
+        confident = top_10_rag[0]['score'] >= ANSWER_CACHE_MIN_SCORE
+        cached_answer = _ANSWER_CACHE.get(answer_key) if confident else None
+        return answer_key, confident, cached_answer
+    
+    def finalize_answer(self, llm_response: str, top_10_rag: List[Dict], answer_key: str, confident: bool, cached: bool) -> str:
+        """Clean the LLM answer (caching it) or fall back to the best knowledge base answer"""
+        if llm_response and len(llm_response.strip()) > 10:
+            final_response = aggressive_clean_html(llm_response.strip())
+            if not cached and confident:
+                _ANSWER_CACHE.put(answer_key, final_response)
+            return final_response
+        return aggressive_clean_html(f"Based on our knowledge base: {top_10_rag[0]['answer']}")
+    
+    def record_turn(self, session_id: str, user_input: str, final_response: str):
+        """Append the user question and assistant answer to the session's history"""
+        turn = [
+            {'role': 'user', 'content': user_input, 'timestamp': time.time()},
+            {'role': 'assistant', 'content': final_response, 'timestamp': time.time()}
+        ]
+        with stage_timer('session_write'):
+            try:
+                self.sessions.append(session_id, turn)
+            except Exception as e:
+                get_metrics().error('session_write', e)
+    
     def process_query(self, user_input: str, session_id: str = "default") -> Dict[str, Any]:
-        """Main processing flow"""
+        """Main processing flow: aprocess_query run to completion, for scripts and the CLI
+
+        Not for use inside a running event loop; async callers await aprocess_query.
+        """
+        async def run():
+            try:
+                return await self.aprocess_query(user_input, session_id)
+            finally:
+                # The loop ends with this call; drop the connections it opened
+                await self.llm.aclose_loop_client()
+        return asyncio.run(run())
+    
+    async def aprocess_query(self, user_input: str, session_id: str = "default") -> Dict[str, Any]:
+        """Main processing flow: async LLM and connectivity calls, file I/O and retrieval off-loop"""
         start_time = time.time()
         
-        is_pdf_mode, pdf_data = self.check_pdf_mode(session_id)
+        is_pdf_mode, pdf_data = await asyncio.to_thread(self.check_pdf_mode, session_id)
         if is_pdf_mode and pdf_data.get('content'):
             response, confidence = self.query_pdf_content(user_input, pdf_data['content'], pdf_data['filename'])
             return {'response': aggressive_clean_html(response), 'internet_status': {'available': True}, 'rag_results': 1, 'llm_used': False, 'processing_time': time.time() - start_time, 'pdf_mode': True}
         
-        internet_status = self.check_internet()
+        internet_status = await self.acheck_internet()
         if not user_input or not user_input.strip():
             return {'response': "Hello! How can I help you with your banking needs today?", 'internet_status': internet_status, 'processing_time': time.time() - start_time}
         
-        top_10_rag = self.get_top_10_from_rag(user_input)
+        top_10_rag = await asyncio.to_thread(self.get_top_10_from_rag, user_input)
         if not top_10_rag:
             return {'response': "I'm sorry, I couldn't find relevant information for your query.", 'internet_status': internet_status, 'rag_results': 0, 'llm_used': False, 'processing_time': time.time() - start_time}
         
-        chat_history = self.load_chat_history(session_id)
+        answer_key, confident, cached_answer = self.lookup_answer(user_input, top_10_rag)
         
-        llm_prompt = f"""You are a helpful banking assistant. Answer the user's question using the provided knowledge sources.
-
-USER QUESTION: {user_input}
-
-TOP 10 RELEVANT KNOWLEDGE SOURCES:
-"""
-        for doc in top_10_rag:
-            llm_prompt += f"{doc['rank']}. Q: {doc['question']}\\nA: {doc['answer']}\\n\\n"
+        coalesced = False
+        prompt = None
+        if cached_answer is not None:
+            llm_response = cached_answer
+        else:
+            prompt = self.build_llm_prompt(user_input, top_10_rag)
+            # Keyed on the full prompt: only callers that would send the LLM the same text share its answer
+            flight_key = f"{self.retrieval.version}\x00{prompt.text}"
+            llm_response, coalesced = await _SINGLE_FLIGHT.do(flight_key, lambda: self.acall_llm_brain(prompt.text))
+        # Only the caller that ran the LLM call stores its answer
+        final_response = self.finalize_answer(llm_response, top_10_rag, answer_key, confident, cached_answer is not None or coalesced)
+        
+        await asyncio.to_thread(self.record_turn, session_id, user_input, final_response)
         
-        llm_prompt += """
-INSTRUCTIONS:
-- Use the knowledge sources to provide accurate information
-- Provide complete, step-by-step instructions when appropriate
-- Be conversational and helpful
+        return {
+            'response': final_response,
+            'internet_status': internet_status,
+            'rag_results': len(top_10_rag),
+            'llm_used': cached_answer is None and llm_response is not None,
+            'answer_cache_hit': cached_answer is not None,
+            'prompt_tokens': prompt.tokens if prompt else None,
+            'coalesced': coalesced,
+            'processing_time': time.time() - start_time
+        }
+    
+    async def astream_query(self, user_input: str, session_id: str = "default") -> AsyncIterator[Tuple[str, Any]]:
+        """aprocess_query that yields ('token', text) pieces as the LLM streams them, then ('done', result)
 
-Response:"""
+        If the LLM stream breaks off after tokens were sent, ('error', detail) replaces 'done'.
+        """
+        start_time = time.time()
         
-        llm_response = self.call_llm_brain(llm_prompt)
+        is_pdf_mode, pdf_data = await asyncio.to_thread(self.check_pdf_mode, session_id)
+        internet_status = await self.acheck_internet()
+        if (is_pdf_mode and pdf_data.get('content')) or not user_input or not user_input.strip():
+            result = await self.aprocess_query(user_input, session_id)
+            yield 'token', result['response']
+            yield 'done', result
+            return
         
-        if llm_response and len(llm_response.strip()) > 10:
-            final_response = aggressive_clean_html(llm_response.strip())
+        top_10_rag = await asyncio.to_thread(self.get_top_10_from_rag, user_input)
+        if not top_10_rag:
+            response = "I'm sorry, I couldn't find relevant information for your query."
+            yield 'token', response
+            yield 'done', {'response': response, 'internet_status': internet_status, 'rag_results': 0, 'llm_used': False, 'processing_time': time.time() - start_time}
+            return
+        
+        answer_key, confident, cached_answer = self.lookup_answer(user_input, top_10_rag)
+        
+        first_token_time = None
+        prompt = None
+        if cached_answer is not None:
+            llm_response = cached_answer
+            yield 'token', cached_answer
         else:
-            final_response = aggressive_clean_html(f"Based on our knowledge base: {top_10_rag[0]['answer']}")
+            # Entities can be split across upstream chunks, so clean incrementally
+            normalizer = IncrementalNormalizer()
+            pieces = []
+            prompt = self.build_llm_prompt(user_input, top_10_rag)
+            # The llm stage excludes the time this generator waits on its consumer
+            llm_started = time.perf_counter()
+            consumer_time = 0.0
+            try:
+                async for chunk in self.llm.astream(prompt.text, 'brain'):
+                    text = normalizer.feed(chunk)
+                    if text:
+                        first_token_time = first_token_time or time.time() - start_time
+                        pieces.append(text)
+                        yielded = time.perf_counter()
+                        yield 'token', text
+                        consumer_time += time.perf_counter() - yielded
+            except LLMStreamError:
+                # The client already has part of an answer: it is neither cached,
+                # saved to history nor completed with the fallback answer
+                yield 'error', {'detail': "The answer was interrupted, please retry", 'status': 502}
+                return
+            get_metrics().observe('chat_stage_seconds', time.perf_counter() - llm_started - consumer_time, stage='llm')
+            pieces.append(normalizer.flush())
+            if pieces[-1]:
+                yield 'token', pieces[-1]
+            llm_response = "".join(pieces) or None
         
-        chat_history.append({'role': 'user', 'content': user_input, 'timestamp': time.time()})
-        chat_history.append({'role': 'assistant', 'content': final_response, 'timestamp': time.time()})
-        self.save_chat_history(session_id, chat_history)
+        final_response = self.finalize_answer(llm_response, top_10_rag, answer_key, confident, cached_answer is not None)
+        if not llm_response or len(llm_response.strip()) <= 10:
+            # The LLM failed or said too little; the fallback answer is sent whole
+            yield 'token', final_response
         
-        return {
+        await asyncio.to_thread(self.record_turn, session_id, user_input, final_response)
+        
+        yield 'done', {
             'response': final_response,
             'internet_status': internet_status,
             'rag_results': len(top_10_rag),
-            'llm_used': llm_response is not None,
+            'llm_used': cached_answer is None and llm_response is not None,
+            'answer_cache_hit': cached_answer is not None,
+            'prompt_tokens': prompt.tokens if prompt else None,
+            'time_to_first_token': first_token_time,
             'processing_time': time.time() - start_time
         }
 
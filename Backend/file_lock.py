@@ -0,0 +1,53 @@
+"""
+Cross-process file lock
+Flow: with FileLock(path) -> exclusive OS lock on a dedicated lock file -> released on exit
+
+Uses fcntl.flock on POSIX and msvcrt.locking on Windows. Every acquisition
+opens its own handle, so threads of one process exclude each other as well as
+other processes (uvicorn workers) sharing the file. Not reentrant.
+"""
+
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive lock shared by every process and thread that uses the same path"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def __enter__(self) -> 'FileLock':
+        f = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue  # LK_LOCK gives up after about 10 seconds; keep waiting
+        except BaseException:
+            f.close()
+            raise
+        self._local.handle = f
+        return self
+
+    def __exit__(self, *exc):
+        f = self._local.handle
+        self._local.handle = None
+        try:
+            if fcntl is None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()  # closing also drops a flock
@@ -0,0 +1,291 @@
+"""
+Shared Azure OpenAI client
+Flow: Call site (brain / translate / assistant) -> Pooled keep-alive connection -> Chat completion
+
+Configuration is read from the environment once, at import; .env is loaded
+first so its LLM_* settings apply. Sync callers share one requests.Session and
+async callers one httpx.AsyncClient per event loop, so repeated calls reuse
+open TCP/TLS connections instead of handshaking each time.
+Every call site has its own timeout, max_tokens and temperature, and all calls
+pass through one LLMScheduler that bounds concurrency and sheds excess load.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import httpx
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# Before any module-level configuration (here and in llm_scheduler) is read
+load_dotenv()
+
+from llm_scheduler import LLMScheduler, LLMOverloaded
+from metrics import get_metrics
+
+# Configuration
+LLM_API_VERSION = os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview')
+LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '32'))  # keep-alive connections per client
+LLM_KEEPALIVE_EXPIRY = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '60'))
+# What a shed call does: 'fallback' returns None so callers use their degraded answer, 'reject' raises LLMOverloaded (HTTP 429)
+LLM_SHED_MODE = os.getenv('LLM_SHED_MODE', 'fallback')
+
+# Per-call-site request settings
+CALL_SITES = {
+    'brain': {
+        'timeout': float(os.getenv('LLM_BRAIN_TIMEOUT', '30')),
+        'queue_timeout': float(os.getenv('LLM_BRAIN_QUEUE_TIMEOUT', '5')),
+        'max_tokens': int(os.getenv('LLM_BRAIN_MAX_TOKENS', '500')),
+        'temperature': 0.7
+    },
+    'translate': {
+        'timeout': float(os.getenv('LLM_TRANSLATE_TIMEOUT', '10')),
+        'queue_timeout': float(os.getenv('LLM_TRANSLATE_QUEUE_TIMEOUT', '2')),
+        'max_tokens': int(os.getenv('LLM_TRANSLATE_MAX_TOKENS', '150')),
+        'temperature': 0.3
+    },
+    'assistant': {
+        'timeout': float(os.getenv('LLM_ASSISTANT_TIMEOUT', '8')),
+        'queue_timeout': float(os.getenv('LLM_ASSISTANT_QUEUE_TIMEOUT', '2')),
+        'max_tokens': int(os.getenv('LLM_ASSISTANT_MAX_TOKENS', '200')),
+        'temperature': 0.3
+    }
+}
+
+
+class LLMStreamError(Exception):
+    """The upstream failed after part of a streamed completion was delivered"""
+
+    def __init__(self, error: str, chunks: int):
+        super().__init__(f"stream interrupted after {chunks} chunks ({error})")
+        self.error = error
+        self.chunks = chunks
+
+
+class LLMClient:
+    """Chat completions against one Azure OpenAI deployment over pooled connections"""
+
+    def __init__(self, api_key: str, endpoint: str, deployment: str, pool_size: int = LLM_POOL_SIZE, scheduler: Optional[LLMScheduler] = None):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.deployment = deployment
+        self.pool_size = pool_size
+        self.url = f"{endpoint}openai/deployments/{deployment}/chat/completions?api-version={LLM_API_VERSION}"
+        self.headers = {'Content-Type': 'application/json', 'api-key': api_key}
+        self._session: Optional[requests.Session] = None
+        self._async_clients: Dict[int, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self.scheduler = scheduler or LLMScheduler()
+        self._stats = {site: {'calls': 0, 'errors': 0, 'shed': 0, 'total_time': 0.0} for site in CALL_SITES}
+        self._failure_listeners: List[Callable[[], None]] = []
+
+    @classmethod
+    def from_env(cls) -> 'LLMClient':
+        return cls(
+            os.getenv('AZURE_OPENAI_API_KEY', ''),
+            os.getenv('AZURE_OPENAI_ENDPOINT', ''),
+            os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt4o')
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key and self.endpoint and self.deployment)
+
+    def _payload(self, prompt: str, site: str, max_tokens: Optional[int]) -> Dict[str, Any]:
+        settings = CALL_SITES[site]
+        return {
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens or settings['max_tokens'],
+            "temperature": settings['temperature']
+        }
+
+    def _sync_session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _async_client(self) -> httpx.AsyncClient:
+        # httpx connections belong to the loop that opened them
+        loop_id = id(asyncio.get_running_loop())
+        client = self._async_clients.get(loop_id)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size, keepalive_expiry=LLM_KEEPALIVE_EXPIRY)
+            client = httpx.AsyncClient(headers=self.headers, limits=limits)
+            self._async_clients[loop_id] = client
+        return client
+
+    def add_failure_listener(self, listener: Callable[[], None]):
+        """Called (without arguments) after every failed completion"""
+        self._failure_listeners.append(listener)
+
+    def _record(self, site: str, started: float, ok: bool, error: Optional[str] = None, usage: Optional[Dict[str, int]] = None):
+        elapsed = time.time() - started
+        with self._lock:
+            stats = self._stats[site]
+            stats['calls'] += 1
+            stats['errors'] += 0 if ok else 1
+            stats['total_time'] += elapsed
+        metrics = get_metrics()
+        metrics.observe('llm_request_seconds', elapsed, site=site, outcome='ok' if ok else 'error')
+        for kind in ('prompt', 'completion'):
+            if usage and usage.get(f'{kind}_tokens'):
+                metrics.inc('llm_tokens_total', usage[f'{kind}_tokens'], site=site, kind=kind)
+        if not ok:
+            metrics.error('llm', error or 'unknown')
+            for listener in self._failure_listeners:
+                listener()
+
+    def _shed(self, site: str, error: LLMOverloaded):
+        with self._lock:
+            self._stats[site]['shed'] += 1
+        get_metrics().error('llm', 'shed')
+        if LLM_SHED_MODE == 'reject':
+            raise error
+
+    def complete(self, prompt: str, site: str = 'assistant', max_tokens: Optional[int] = None) -> Optional[str]:
+        """Message content of the completion; None when unconfigured, shed or the call fails"""
+        if not self.configured:
+            return None
+        try:
+            self.scheduler.acquire(CALL_SITES[site]['queue_timeout'])
+        except LLMOverloaded as e:
+            self._shed(site, e)
+            return None
+        started = time.time()
+        try:
+            response = self._sync_session().post(self.url, headers=self.headers, json=self._payload(prompt, site, max_tokens), timeout=CALL_SITES[site]['timeout'])
+            if response.status_code == 200:
+                body = response.json()
+                content = body['choices'][0]['message']['content']
+                self._record(site, started, True, usage=body.get('usage'))
+                return content
+            error = f"http_{response.status_code}"
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            self.scheduler.release()
+        self._record(site, started, False, error)
+        return None
+
+    async def acomplete(self, prompt: str, site: str = 'assistant', max_tokens: Optional[int] = None) -> Optional[str]:
+        """Non-blocking complete"""
+        if not self.configured:
+            return None
+        try:
+            await self.scheduler.aacquire(CALL_SITES[site]['queue_timeout'])
+        except LLMOverloaded as e:
+            self._shed(site, e)
+            return None
+        started = time.time()
+        try:
+            response = await self._async_client().post(self.url, json=self._payload(prompt, site, max_tokens), timeout=CALL_SITES[site]['timeout'])
+            if response.status_code == 200:
+                body = response.json()
+                content = body['choices'][0]['message']['content']
+                self._record(site, started, True, usage=body.get('usage'))
+                return content
+            error = f"http_{response.status_code}"
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            self.scheduler.release()
+        self._record(site, started, False, error)
+        return None
+
+    async def astream(self, prompt: str, site: str = 'assistant', max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Completion content pieces as the upstream streams them
+
+        Ends without output when unconfigured, shed or the call fails before
+        the first piece; raises LLMStreamError if it fails after pieces were yielded.
+        """
+        if not self.configured:
+            return
+        try:
+            await self.scheduler.aacquire(CALL_SITES[site]['queue_timeout'])
+        except LLMOverloaded as e:
+            self._shed(site, e)
+            return
+        started = time.time()
+        ok = False
+        error = None
+        chunks = 0
+        try:
+            payload = dict(self._payload(prompt, site, max_tokens), stream=True)
+            async with self._async_client().stream('POST', self.url, json=payload, timeout=CALL_SITES[site]['timeout']) as response:
+                if response.status_code != 200:
+                    error = f"http_{response.status_code}"
+                    return
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    choices = json.loads(data).get('choices') or []
+                    content = (choices[0].get('delta') or {}).get('content') if choices else None
+                    if content:
+                        chunks += 1
+                        yield content
+                ok = True
+        except (GeneratorExit, asyncio.CancelledError):
+            # The consumer went away; not an upstream failure
+            ok = True
+            raise
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            self.scheduler.release()
+            # Streamed responses carry no usage block; each content delta is one token
+            self._record(site, started, ok, error, {'completion_tokens': chunks})
+        if error and chunks:
+            raise LLMStreamError(error, chunks)
+
+    async def aclose_loop_client(self):
+        """Close the async client of the running loop (before that loop is closed)"""
+        client = self._async_clients.pop(id(asyncio.get_running_loop()), None)
+        if client is not None:
+            await client.aclose()
+
+    async def aclose(self):
+        """Close the async client of the running loop and the sync session"""
+        await self.aclose_loop_client()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'configured': self.configured,
+                'pool_size': self.pool_size,
+                'shed_mode': LLM_SHED_MODE,
+                'call_sites': {
+                    site: dict(stats, mean_time=stats['total_time'] / stats['calls'] if stats['calls'] else 0.0, timeout=CALL_SITES[site]['timeout'], queue_timeout=CALL_SITES[site]['queue_timeout'], max_tokens=CALL_SITES[site]['max_tokens'])
+                    for site, stats in self._stats.items()
+                },
+                'scheduler': self.scheduler.stats()
+            }
+
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """The shared process-wide LLMClient"""
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = LLMClient.from_env()
+    return _CLIENT
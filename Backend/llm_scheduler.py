@@ -0,0 +1,154 @@
+"""
+LLM call scheduler
+Flow: LLM call -> Free slot? run : bounded FIFO wait queue (per-call deadline) -> run or shed
+
+At most max_concurrency calls to Azure OpenAI run at once. Further calls wait
+in a FIFO queue of at most max_queue entries; each waits only until its own
+deadline. A call that finds the queue full or outlives its deadline is shed
+with LLMOverloaded so the caller can degrade immediately instead of piling up
+upstream 429s and timeouts. Sync (thread) and async callers share the slots.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from metrics import Histogram
+
+load_dotenv()
+
+# Configuration
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '16'))
+LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '64'))
+
+WAIT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+DEPTH_BUCKETS = [0, 1, 2, 5, 10, 25, 50, 100, 250]
+
+
+class LLMOverloaded(Exception):
+    """The call could not get a slot in time (queue full or deadline passed)"""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('deadline', 'enqueued', 'granted', 'event', 'future', 'loop')
+
+    def __init__(self, deadline: float, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.deadline = deadline
+        self.enqueued = time.time()
+        self.granted = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(True))
+
+
+class LLMScheduler:
+    """Concurrency limit plus a bounded, deadline-aware FIFO of waiting calls"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queue: "deque[_Waiter]" = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.wait_seconds = Histogram(WAIT_BUCKETS)
+        self.queue_depth = Histogram(DEPTH_BUCKETS)
+
+    def _enter(self, deadline: float, loop=None) -> Optional[_Waiter]:
+        """Take a free slot (returns None) or enqueue a waiter; raises when the queue is full"""
+        with self._lock:
+            self.queue_depth.observe(len(self._queue))
+            if self._active < self.max_concurrency and not self._queue:
+                self._active += 1
+                self.admitted += 1
+                self.wait_seconds.observe(0.0)
+                return None
+            if len(self._queue) >= self.max_queue:
+                self.shed_queue_full += 1
+                raise LLMOverloaded('queue full')
+            waiter = _Waiter(deadline, loop)
+            self._queue.append(waiter)
+            return waiter
+
+    def _granted_or_abandon(self, waiter: _Waiter) -> bool:
+        """After waking or timing out: True if the slot was handed over, else leave the queue"""
+        with self._lock:
+            if waiter.granted:
+                self.admitted += 1
+                self.wait_seconds.observe(time.time() - waiter.enqueued)
+                return True
+            try:
+                self._queue.remove(waiter)
+            except ValueError:
+                pass
+            self.shed_deadline += 1
+            return False
+
+    def acquire(self, timeout: float):
+        """Block the calling thread until a slot is free or the timeout passes"""
+        waiter = self._enter(time.time() + timeout)
+        if waiter is None:
+            return
+        waiter.event.wait(max(0.0, waiter.deadline - time.time()))
+        if not self._granted_or_abandon(waiter):
+            raise LLMOverloaded('deadline exceeded')
+
+    async def aacquire(self, timeout: float):
+        """acquire for coroutines; never blocks the event loop"""
+        waiter = self._enter(time.time() + timeout, asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), max(0.0, waiter.deadline - time.time()))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if self._granted_or_abandon(waiter):
+                self.release()
+            raise
+        if not self._granted_or_abandon(waiter):
+            raise LLMOverloaded('deadline exceeded')
+
+    def release(self):
+        """Free a slot, handing it straight to the oldest waiter that can still make its deadline"""
+        with self._lock:
+            now = time.time()
+            while self._queue:
+                waiter = self._queue.popleft()
+                if waiter.deadline > now:
+                    waiter.granted = True
+                    waiter.wake()
+                    return
+            self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queued': len(self._queue),
+                'admitted': self.admitted,
+                'shed_queue_full': self.shed_queue_full,
+                'shed_deadline': self.shed_deadline,
+                'wait_seconds': self.wait_seconds.snapshot(),
+                'queue_depth': self.queue_depth.snapshot()
+            }
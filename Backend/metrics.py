@@ -0,0 +1,176 @@
+"""
+Pipeline metrics
+Flow: Stage timers / counters -> Process-wide registry -> Prometheus text on /metrics
+
+Every chat pipeline stage (connectivity check, KB load, retrieval, prompt
+build, LLM call, translation, escalation detection, session read/write) is
+timed into the chat_stage_seconds histogram. Counters track LLM tokens and
+error classes. Components that already keep their own stats (caches, LLM
+scheduler, worker pool, coalescing) are read by collectors at scrape time.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+STAGE_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+TOKEN_BUCKETS = [64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192]
+
+# (name, type, labels, value); value is a Histogram.snapshot() dict for 'histogram'
+Sample = Tuple[str, str, Dict[str, str], Any]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count (Prometheus style)"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, total = {}, 0
+        for bound, count in zip(self.buckets + [float('inf')], self.counts):
+            total += count
+            cumulative['+Inf' if bound == float('inf') else str(bound)] = total
+        return {'buckets': cumulative, 'sum': self.sum, 'count': self.count}
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms plus scrape-time collectors"""
+
+    def __init__(self, prefix: str = 'bankfaq'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self._buckets: Dict[str, List[float]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, help_text: str, buckets: Optional[List[float]] = None):
+        self._help[name] = help_text
+        if buckets is not None:
+            self._buckets[name] = list(buckets)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self._buckets.get(name, STAGE_BUCKETS))
+            histogram.observe(value)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Time the block into chat_stage_seconds; exceptions are counted by class and re-raised"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.error(stage, e)
+            raise
+        finally:
+            self.observe('chat_stage_seconds', time.perf_counter() - started, stage=stage)
+
+    def error(self, stage: str, error):
+        """Count an error under its class name (or a given class string)"""
+        self.inc('chat_errors_total', stage=stage, error=error if isinstance(error, str) else type(error).__name__)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """collector() is called on every scrape and yields (name, type, labels, value)"""
+        self._collectors.append(collector)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            samples = [(name, 'counter', dict(key), value) for name, series in self._counters.items() for key, value in series.items()]
+            samples += [(name, 'histogram', dict(key), histogram.snapshot()) for name, series in self._histograms.items() for key, histogram in series.items()]
+        for collector in list(self._collectors):
+            try:
+                samples.extend(collector())
+            except Exception:
+                pass  # a broken collector must not break the scrape
+        return samples
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        families: Dict[str, Tuple[str, List[Tuple[Dict[str, str], Any]]]] = {}
+        for name, kind, labels, value in self.samples():
+            families.setdefault(name, (kind, []))[1].append((labels, value))
+
+        lines = []
+        for name, (kind, series) in families.items():
+            full_name = f"{self.prefix}_{name}"
+            if name in self._help:
+                lines.append(f"# HELP {full_name} {self._help[name]}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in series:
+                if kind != 'histogram':
+                    lines.append(f"{full_name}{_labels(labels)} {_number(value)}")
+                    continue
+                for bound, count in value['buckets'].items():
+                    lines.append(f"{full_name}_bucket{_labels(dict(labels, le=bound))} {count}")
+                lines.append(f"{full_name}_sum{_labels(labels)} {_number(value['sum'])}")
+                lines.append(f"{full_name}_count{_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+_METRICS = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """The shared process-wide MetricsRegistry"""
+    global _METRICS
+    if _METRICS is None:
+        with _METRICS_LOCK:
+            if _METRICS is None:
+                registry = MetricsRegistry()
+                registry.describe('chat_stage_seconds', 'Time spent in each chat pipeline stage')
+                registry.describe('http_request_seconds', 'API request time by method, route and status')
+                registry.describe('chat_errors_total', 'Errors by pipeline stage and error class')
+                registry.describe('llm_request_seconds', 'Azure OpenAI call time by call site and outcome')
+                registry.describe('llm_tokens_total', 'LLM tokens by call site and kind (prompt/completion)')
+                registry.describe('prompt_tokens', 'Tokens in each chat prompt built for the LLM brain', buckets=TOKEN_BUCKETS)
+                registry.describe('prompt_evidence_dropped_total', 'Retrieved FAQs left out of the prompt by reason (duplicate/budget)')
+                registry.describe('prompt_answers_truncated_total', 'FAQ answers shortened to fit the prompt budget')
+                registry.describe('prompt_questions_truncated_total', 'User questions cut to leave room for evidence in the prompt budget')
+                _METRICS = registry
+    return _METRICS
+
+
+def stage_timer(stage: str):
+    """Shorthand for get_metrics().stage(stage)"""
+    return get_metrics().stage(stage)
@@ -1,19 +1,18 @@
-import pickle
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
 import json
 import os
+import time
 from datetime import datetime
 from offline_translator import OfflineTranslator
+from retrieval_service import get_retrieval_service
+from text_normalizer import normalize_entities
+from llm_client import get_llm_client
+from metrics import stage_timer
 import re
 
 class MultilingualBankingBot:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-        self.documents = []
-        self.document_vectors = None
+    def __init__(self, chatbot=None):
+        self.retrieval = get_retrieval_service()
+        self.chatbot = chatbot
         self.translator = OfflineTranslator()
         self.supported_languages = {
             'en': 'English',
@@ -46,22 +45,20 @@ class MultilingualBankingBot:
         self.load_knowledge_base()
         self.load_api_key()
     
+    def enhanced_chatbot(self):
+        # One EnhancedChatbot per bot, created on first use unless one was injected
+        if self.chatbot is None:
+            from enhanced_chatbot import EnhancedChatbot
+            self.chatbot = EnhancedChatbot()
+        return self.chatbot
+    
     def load_knowledge_base(self):
-        try:
-            with open('metadata.pkl', 'rb') as f:
-                data = pickle.load(f)
-                self.documents = [item['answer'] for item in data]
-                self.questions = [item['question'] for item in data]
-                self.document_vectors = self.vectorizer.fit_transform(self.documents)
-        except FileNotFoundError:
-            self.documents = []
-            self.questions = []
+        # The index is owned by the process-wide retrieval service; nothing is fitted here
+        self.retrieval.load()
     
     def load_api_key(self):
-        # Load Azure OpenAI credentials
-        self.azure_api_key = os.getenv('AZURE_OPENAI_API_KEY', '')
-        self.azure_endpoint = os.getenv('AZURE_OPENAI_ENDPOINT', '')
-        self.azure_deployment = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME', 'gpt4o')
+        # Azure OpenAI credentials and connections live in the shared LLM client
+        self.llm = get_llm_client()
     
     def detect_language(self, text):
         """Detect the language of input text"""
@@ -70,60 +67,53 @@ class MultilingualBankingBot:
         except:
             return 'en'
     
-    def translate_text(self, text, target_lang='en', source_lang='auto'):
-        """Translate text using Azure OpenAI"""
-        if source_lang == target_lang:
-            return text
-            
-        # Use Azure OpenAI for accurate translations
-        if self.azure_api_key:
-            try:
-                language_names = {
-                    'es': 'Spanish', 'fr': 'French', 'de': 'German', 'zh': 'Chinese',
-                    'it': 'Italian', 'pt': 'Portuguese', 'ja': 'Japanese', 'ko': 'Korean', 'ar': 'Arabic', 'en': 'English'
-                }
-                target_name = language_names.get(target_lang, target_lang)
-                source_name = language_names.get(source_lang, source_lang) if source_lang != 'auto' else 'the source language'
-                
-                prompt = f"""Translate this text from {source_name} to {target_name}. 
+    def translation_prompt(self, text, target_lang, source_lang):
+        language_names = {
+            'es': 'Spanish', 'fr': 'French', 'de': 'German', 'zh': 'Chinese',
+            'it': 'Italian', 'pt': 'Portuguese', 'ja': 'Japanese', 'ko': 'Korean', 'ar': 'Arabic', 'en': 'English'
+        }
+        target_name = language_names.get(target_lang, target_lang)
+        source_name = language_names.get(source_lang, source_lang) if source_lang != 'auto' else 'the source language'
+        
+        prompt = f"""Translate this text from {source_name} to {target_name}. 
 Provide ONLY the natural, fluent translation without any explanations, quotes, or additional text.
 Maintain the original meaning and tone.
 
 Text to translate: {text}
 
 Translation:"""
-                
-                headers = {
-                    'api-key': self.azure_api_key,
-                    'Content-Type': 'application/json'
-                }
-                
-                payload = {
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 150,
-                    "temperature": 0.3
-                }
-                
-                url = f"{self.azure_endpoint}openai/deployments/{self.azure_deployment}/chat/completions?api-version=2024-02-15-preview"
-                response = requests.post(url, headers=headers, json=payload, timeout=10)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    translated = result['choices'][0]['message']['content'].strip()
-                    translated = translated.strip('"\'')
-                    
-                    import html
-                    for _ in range(3):
-                        translated = html.unescape(translated)
-                    
-                    return translated
-            except Exception:
-                pass
+        return prompt
+    
+    def parse_translation(self, content):
+        translated = content.strip()
+        translated = translated.strip('"\'')
+        return normalize_entities(translated)
+    
+    def translate_text(self, text, target_lang='en', source_lang='auto'):
+        """Translate text using Azure OpenAI"""
+        if source_lang == target_lang:
+            return text
+            
+        # Use Azure OpenAI for accurate translations
+        with stage_timer('translation'):
+            content = self.llm.complete(self.translation_prompt(text, target_lang, source_lang), 'translate')
+        return self.parse_translation(content) if content is not None else text
+    
+    async def atranslate_text(self, text, target_lang='en', source_lang='auto'):
+        """Non-blocking translate_text"""
+        if source_lang == target_lang:
+            return text
         
-        return text
+        with stage_timer('translation'):
+            content = await self.llm.acomplete(self.translation_prompt(text, target_lang, source_lang), 'translate')
+        return self.parse_translation(content) if content is not None else text
     
     def detect_escalation(self, query, user_lang='en'):
         """Detect if query needs human escalation"""
+        with stage_timer('escalation'):
+            return self._escalation_level(query, user_lang)
+    
+    def _escalation_level(self, query, user_lang):
         query_lower = query.lower()
         
         # Translate escalation keywords to user's language for better detection
@@ -164,24 +154,22 @@ Translation:"""
             return "low", "Can be handled by AI"
     
     def get_rag_response(self, query, top_k=10):
-        if not self.documents:
+        snapshot = self.retrieval.snapshot()
+        if snapshot is None or not snapshot.metadata:
             return "I don't have access to banking information right now."
         
-        query_vector = self.vectorizer.transform([query])
-        similarities = cosine_similarity(query_vector, self.document_vectors).flatten()
-        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        metadata = snapshot.metadata
+        scores, indices = snapshot.search([query], top_k)
+        scores, indices = scores[0], indices[0]
         
         # Lower threshold for multilingual queries
-        if similarities[top_indices[0]] < 0.03:
+        if scores[0] < 0.03:
             return "I don't have specific information about that banking topic."
         
-        relevant_docs = [self.documents[i] for i in top_indices if similarities[i] > 0.03]
+        relevant_docs = [metadata[i]['answer'] for score, i in zip(scores, indices) if i >= 0 and score > 0.03]
         return " ".join(relevant_docs[:5])
     
-    def call_llm_api(self, prompt, user_language='en'):
-        if not self.azure_api_key:
-            return None
-        
+    def language_prompt(self, prompt, user_language='en'):
         # Add language context to prompt
         if user_language != 'en':
             language_names = {
@@ -190,36 +178,24 @@ Translation:"""
             }
             lang_name = language_names.get(user_language, 'the user\'s language')
             prompt = f"Please respond in {lang_name}. {prompt}"
-        
-        headers = {
-            'api-key': self.azure_api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 200,
-            "temperature": 0.3
-        }
-        
-        try:
-            url = f"{self.azure_endpoint}openai/deployments/{self.azure_deployment}/chat/completions?api-version=2024-02-15-preview"
-            response = requests.post(url, headers=headers, json=payload, timeout=8)
-            
-            if response.status_code == 200:
-                result = response.json()
-                llm_response = result['choices'][0]['message']['content'].strip()
-                # CRITICAL: Clean HTML entities from LLM response immediately
-                import html
-                for _ in range(5):
-                    llm_response = html.unescape(llm_response)
-                return llm_response
-        except Exception:
-            pass
-        return None
+        return prompt
+    
+    def call_llm_api(self, prompt, user_language='en'):
+        content = self.llm.complete(self.language_prompt(prompt, user_language), 'assistant')
+        # CRITICAL: Clean HTML entities from LLM response immediately
+        return normalize_entities(content.strip()) if content is not None else None
+    
+    async def acall_llm_api(self, prompt, user_language='en'):
+        """Non-blocking call_llm_api"""
+        content = await self.llm.acomplete(self.language_prompt(prompt, user_language), 'assistant')
+        return normalize_entities(content.strip()) if content is not None else None
+    
+    def response_translation_prompt(self, clean_response, user_lang):
+        return f"Translate this banking response to {user_lang}. Keep all banking terms accurate. Return plain text with proper quotes and apostrophes, NOT HTML entities like &quot; or &#39;:\n\n{clean_response}"
     
     def process_query(self, query, user_lang='en', session_id='default'):
         """Process multilingual query using EnhancedChatbot + translation"""
+        start_time = time.time()
         if not user_lang:
             user_lang = 'en'
         
@@ -227,32 +203,51 @@ Translation:"""
         english_query = query if user_lang == 'en' else self.translate_text(query, target_lang='en', source_lang=user_lang)
         
         # Use EnhancedChatbot for processing
-        from enhanced_chatbot import EnhancedChatbot
-        chatbot = EnhancedChatbot()
-        result = chatbot.process_query(english_query, session_id)
+        result = self.enhanced_chatbot().process_query(english_query, session_id)
         
         # Clean HTML entities from English response first
-        import html
-        clean_response = result['response']
-        for _ in range(3):
-            clean_response = html.unescape(clean_response)
+        clean_response = normalize_entities(result['response'])
         
         # Translate cleaned response back to user's language
         if user_lang != 'en':
-            translated_response = self.call_llm_api(
-                f"Translate this banking response to {user_lang}. Keep all banking terms accurate. Return plain text with proper quotes and apostrophes, NOT HTML entities like &quot; or &#39;:\n\n{clean_response}",
-                user_lang
-            )
+            with stage_timer('translation'):
+                translated_response = self.call_llm_api(self.response_translation_prompt(clean_response, user_lang), user_lang)
             if not translated_response:
                 translated_response = self.translate_text(clean_response, target_lang=user_lang, source_lang='en')
             
             # CRITICAL: Clean HTML entities from translated response (LLM sometimes returns them)
             if translated_response:
-                for _ in range(5):  # Multiple passes to handle nested encoding
-                    translated_response = html.unescape(translated_response)
+                translated_response = normalize_entities(translated_response)
+        else:
+            translated_response = clean_response
+        
+        return self.build_result(query, english_query, translated_response, user_lang, time.time() - start_time, result.get('prompt_tokens'))
+    
+    async def aprocess_query(self, query, user_lang='en', session_id='default'):
+        """Non-blocking process_query built on EnhancedChatbot.aprocess_query"""
+        start_time = time.time()
+        if not user_lang:
+            user_lang = 'en'
+        
+        english_query = query if user_lang == 'en' else await self.atranslate_text(query, target_lang='en', source_lang=user_lang)
+        
+        result = await self.enhanced_chatbot().aprocess_query(english_query, session_id)
+        
+        clean_response = normalize_entities(result['response'])
+        
+        if user_lang != 'en':
+            with stage_timer('translation'):
+                translated_response = await self.acall_llm_api(self.response_translation_prompt(clean_response, user_lang), user_lang)
+            if not translated_response:
+                translated_response = await self.atranslate_text(clean_response, target_lang=user_lang, source_lang='en')
+            if translated_response:
+                translated_response = normalize_entities(translated_response)
         else:
             translated_response = clean_response
         
+        return self.build_result(query, english_query, translated_response, user_lang, time.time() - start_time, result.get('prompt_tokens'))
+    
+    def build_result(self, query, english_query, translated_response, user_lang, processing_time=0.0, prompt_tokens=None):
         return {
             'response': translated_response,
             'escalation': False,
@@ -260,7 +255,9 @@ Translation:"""
             'escalation_reason': 'Handled by AI',
             'language': user_lang,
             'original_query': query,
-            'english_query': english_query
+            'english_query': english_query,
+            'processing_time': processing_time,
+            'prompt_tokens': prompt_tokens
         }
 
 # FastAPI Integration
@@ -295,7 +292,7 @@ class QueryResponse(BaseModel):
 @app.post("/chat", response_model=QueryResponse)
 async def chat_endpoint(request: QueryRequest):
     try:
-        result = bot.process_query(request.query, request.language)
+        result = await bot.aprocess_query(request.query, request.language)
         
         return QueryResponse(
             response=result['response'],
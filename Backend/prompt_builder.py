@@ -0,0 +1,194 @@
+"""
+Token-budgeted prompt builder
+Flow: Retrieved FAQs -> near-duplicate removal -> relevance-ranked answer truncation -> fit to token budget -> prompt + token count
+
+Tokens are counted with tiktoken when it is installed (PROMPT_TOKENIZER
+encoding, cl100k_base by default; tiktoken downloads the encoding on first use
+unless it is already in its cache, so the server loads it during warm-up), and
+otherwise estimated with a word/punctuation regex that slightly overcounts, so
+the budget still holds. The whole prompt, template and question included, is
+kept within PROMPT_TOKEN_BUDGET tokens: a question too long to leave room for
+one FAQ answer is cut, and FAQs that do not fit are dropped. FAQs whose
+question and answer mostly repeat a better-ranked FAQ are dropped. Answers
+longer than their share of PROMPT_MAX_ANSWER_TOKENS keep the sentences that
+best match the user question.
+"""
+
+import re
+import sys
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Tuple
+
+# Configuration
+PROMPT_TOKENIZER = os.getenv('PROMPT_TOKENIZER', 'cl100k_base')
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '1800'))
+PROMPT_MAX_ANSWER_TOKENS = int(os.getenv('PROMPT_MAX_ANSWER_TOKENS', '300'))
+PROMPT_MIN_ANSWER_TOKENS = 40  # shorter than this, a truncated answer is not worth including
+PROMPT_SOURCE_RESERVE = 32  # room kept for the first FAQ's numbering and question besides its answer
+PROMPT_DUPLICATE_THRESHOLD = float(os.getenv('PROMPT_DUPLICATE_THRESHOLD', '0.8'))
+
+PROMPT_HEADER = """You are a helpful banking assistant. Answer the user's question using the provided knowledge sources.
+
+USER QUESTION: {question}
+
+RELEVANT KNOWLEDGE SOURCES:
+"""
+PROMPT_FOOTER = """
+INSTRUCTIONS:
+- Use the knowledge sources to provide accurate information
+- Provide complete, step-by-step instructions when appropriate
+- Be conversational and helpful
+
+Response:"""
+
+_WORDS = re.compile(r"\w+|[^\w\s]")
+_SENTENCES = re.compile(r'(?<=[.!?])\s+|\n+')
+_STOPWORDS = frozenset("a an and are can do does for how i in is it me my of on or the to what when where which who why with you your".split())
+
+
+def _regex_tokenize(text: str) -> List[str]:
+    return _WORDS.findall(text)
+
+
+_TOKENIZER = None
+_TOKENIZER_LOCK = threading.Lock()
+
+
+def get_tokenizer() -> Tuple[str, Callable[[str], list]]:
+    """(name, encode) of the local tokenizer: tiktoken if available, else the regex estimate"""
+    global _TOKENIZER
+    if _TOKENIZER is None:
+        with _TOKENIZER_LOCK:
+            if _TOKENIZER is None:
+                try:
+                    import tiktoken
+                    encoding = tiktoken.get_encoding(PROMPT_TOKENIZER)
+                    _TOKENIZER = (f"tiktoken:{PROMPT_TOKENIZER}", encoding.encode_ordinary)
+                except Exception as e:
+                    if not isinstance(e, ImportError):
+                        print(f"tiktoken unavailable ({e}), estimating prompt tokens", file=sys.stderr)
+                    _TOKENIZER = ("regex", _regex_tokenize)
+    return _TOKENIZER
+
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer()[1](text)) if text else 0
+
+
+@lru_cache(maxsize=8192)
+def _kb_tokens(text: str) -> int:
+    """count_tokens for knowledge base text, which repeats across requests"""
+    return count_tokens(text)
+
+
+def _terms(text: str) -> FrozenSet[str]:
+    return frozenset(word for word in re.findall(r'\w+', text.lower()) if word not in _STOPWORDS)
+
+
+@lru_cache(maxsize=4096)
+def _answer_parts(answer: str) -> Tuple[Tuple[str, int, FrozenSet[str]], ...]:
+    """Sentences of a KB answer with their token counts and terms (KB answers repeat across requests)"""
+    sentences = [s.strip() for s in _SENTENCES.split(answer) if s and s.strip()]
+    return tuple((s, _kb_tokens(s), _terms(s)) for s in sentences)
+
+
+@lru_cache(maxsize=4096)
+def _faq_terms(question: str, answer: str) -> FrozenSet[str]:
+    return _terms(question) | _terms(answer)
+
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def truncate_words(text: str, max_tokens: int) -> str:
+    """The longest leading run of words of text within max_tokens, marked with ' ...'"""
+    kept = ''
+    for word in text.split():
+        candidate = f"{kept} {word}" if kept else word
+        if count_tokens(candidate) + 1 > max_tokens:
+            break
+        kept = candidate
+    return kept + ' ...'
+
+
+def truncate_answer(answer: str, query_terms: FrozenSet[str], max_tokens: int) -> Tuple[str, bool]:
+    """answer cut down to max_tokens, keeping the sentences that share most terms with the question
+
+    The opening sentence gets a small bonus since it usually states the answer.
+    Kept sentences stay in their original order. Returns (text, truncated).
+    """
+    if _kb_tokens(answer) <= max_tokens:
+        return answer, False
+    parts = _answer_parts(answer)
+    ranked = sorted(range(len(parts)), key=lambda i: (-(len(parts[i][2] & query_terms) + (0.5 if i == 0 else 0)), i))
+    keep, used = [], 0
+    for i in ranked:
+        tokens = parts[i][1] + 1
+        if used + tokens <= max_tokens:
+            keep.append(i)
+            used += tokens
+    if not keep:
+        # A single sentence longer than the whole allowance: cut it by words
+        return truncate_words(parts[ranked[0]][0] if parts else answer, max_tokens), True
+    return ' '.join(parts[i][0] for i in sorted(keep)), True
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    tokens: int
+    tokenizer: str
+    evidence_used: List[str] = field(default_factory=list)  # FAQ ids, in prompt order
+    dropped_duplicates: int = 0
+    dropped_budget: int = 0
+    truncated: int = 0
+    question_truncated: bool = False
+
+
+def build_prompt(user_input: str, docs: List[Dict], budget: int = PROMPT_TOKEN_BUDGET,
+                 max_answer_tokens: int = PROMPT_MAX_ANSWER_TOKENS,
+                 duplicate_threshold: float = PROMPT_DUPLICATE_THRESHOLD) -> BuiltPrompt:
+    """LLM brain prompt over the retrieved FAQs (best first) within budget tokens"""
+    tokenizer = get_tokenizer()[0]
+    result = BuiltPrompt('', 0, tokenizer)
+    template = count_tokens(PROMPT_HEADER.format(question='')) + count_tokens(PROMPT_FOOTER)
+    # The question may use what is left after the template and one short FAQ
+    question_budget = budget - template - PROMPT_MIN_ANSWER_TOKENS - PROMPT_SOURCE_RESERVE
+    question = user_input
+    if count_tokens(question) > question_budget:
+        question = truncate_words(question, max(question_budget, 1))
+        result.question_truncated = True
+    header = PROMPT_HEADER.format(question=question)
+    used = count_tokens(header) + count_tokens(PROMPT_FOOTER)
+    query_terms = _terms(user_input)
+    top_score = max((doc.get('score', 0) for doc in docs), default=0) or 1.0
+
+    sources, kept_terms = [], []
+    for doc in docs:
+        terms = _faq_terms(doc['question'], doc['answer'])
+        if any(_similarity(terms, seen) >= duplicate_threshold for seen in kept_terms):
+            result.dropped_duplicates += 1
+            continue
+        remaining = budget - used
+        # Less relevant FAQs get a smaller share of the answer allowance
+        share = max(PROMPT_MIN_ANSWER_TOKENS, int(max_answer_tokens * min(1.0, doc.get('score', top_score) / top_score)))
+        prefix = f"{len(sources) + 1}. Q: {doc['question']}\nA: "
+        allowance = min(share, remaining - count_tokens(prefix) - 2)
+        if allowance < PROMPT_MIN_ANSWER_TOKENS:
+            result.dropped_budget += 1
+            continue
+        answer, truncated = truncate_answer(doc['answer'], query_terms, allowance)
+        source = f"{prefix}{answer}\n\n"
+        sources.append(source)
+        kept_terms.append(terms)
+        result.evidence_used.append(doc.get('id'))
+        result.truncated += truncated
+        used += count_tokens(source)
+
+    result.text = header + ''.join(sources) + PROMPT_FOOTER
+    result.tokens = count_tokens(result.text)
+    return result
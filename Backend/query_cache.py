@@ -0,0 +1,80 @@
+"""
+LRU + TTL cache for retrieval results
+Entries are tagged with the knowledge base version; a version change clears the cache.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss/eviction counters"""
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = None
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
+
+    def get(self, key: str, version=None) -> Optional[Any]:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Any, version=None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'version': self.version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Persisted TF-IDF Retrieval Index
+Flow: metadata.pkl -> Clean -> Fit TF-IDF -> Versioned artifact on disk -> Memory-mapped at startup
+
+The artifact is keyed by the content hash of metadata.pkl, so a server only
+refits when the knowledge base itself changes. Building never deletes
+anything: every metadata path records the versions it has served, and only
+versions it served before its last SERVED_VERSIONS_KEPT are pruned, so other
+workers and other knowledge bases sharing INDEX_DIR keep their artifacts.
+Build it offline with:
+
+    python retrieval_index.py --build
+"""
+
+import sys
+import json
+import argparse
+import pickle
+import hashlib
+import shutil
+import time
+import os
+from typing import List, Dict, Any, Optional
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
+from sklearn.preprocessing import normalize
+from scipy.sparse import csr_matrix
+import numpy as np
+
+from retrieval_kernel import TfidfRetriever
+from bm25_retriever import BM25Retriever
+from text_normalizer import normalize_entities
+from file_lock import FileLock
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METADATA_PATH = os.path.join(BASE_DIR, "metadata.pkl")
+INDEX_DIR = os.path.join(BASE_DIR, "index_cache")
+INDEX_FORMAT_VERSION = 2
+VECTORIZER_PARAMS = {'max_features': 3000, 'stop_words': 'english', 'ngram_range': (1, 3)}
+RETRIEVER_BACKENDS = ('tfidf', 'bm25', 'dense', 'hybrid')
+SERVED_VERSIONS_KEPT = 2  # the serving version and the previous one, which slower workers may still map
+
+
+class IndexVectorizer:
+    """Query-side TF-IDF transform rebuilt from a persisted vocabulary and IDF vector"""
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, params: Dict[str, Any]):
+        self.vocabulary_ = vocabulary
+        self.idf_ = idf
+        self.params = params
+        self._counter = CountVectorizer(
+            vocabulary=vocabulary,
+            stop_words=params.get('stop_words'),
+            ngram_range=tuple(params.get('ngram_range', (1, 1)))
+        )
+
+    def transform(self, texts: List[str]) -> csr_matrix:
+        """Same output as TfidfVectorizer.transform (raw tf * idf, l2-normalised rows)"""
+        counts = self._counter.transform(texts).astype(np.float64)
+        counts.data *= self.idf_[counts.indices]
+        return normalize(counts, norm='l2', copy=False)
+
+
+class RetrievalIndex:
+    """A loaded index artifact: cleaned metadata, query vectorizer and corpus matrix"""
+
+    def __init__(self, version: str, metadata: List[Dict], vectorizer: IndexVectorizer, corpus_matrix: csr_matrix, path: str):
+        self.version = version
+        self.metadata = metadata
+        self.vectorizer = vectorizer
+        self.corpus_matrix = corpus_matrix
+        self.path = path
+
+
+def metadata_hash(metadata_path: str = METADATA_PATH) -> str:
+    """Content hash of metadata.pkl combined with the index format and vectorizer settings"""
+    digest = hashlib.sha256()
+    digest.update(f"v{INDEX_FORMAT_VERSION}:{json.dumps(VECTORIZER_PARAMS, sort_keys=True)}".encode('utf-8'))
+    with open(metadata_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def artifact_path(version: str) -> str:
+    return os.path.join(INDEX_DIR, f"tfidf-{version}")
+
+
+def load_metadata_entries(metadata_path: str = METADATA_PATH) -> List[Dict]:
+    """Read metadata.pkl and keep cleaned, usable Q&A pairs"""
+    with open(metadata_path, "rb") as f:
+        raw_metadata = pickle.load(f)
+
+    metadata = []
+    seen_ids = set()
+    for entry in raw_metadata:
+        q = entry.get("question") or entry.get("query") or entry.get("text") or ""
+        a = entry.get("answer") or entry.get("ans") or entry.get("response") or ""
+        if q and a and len(q) > 10 and len(a) > 20:
+            # Clean HTML entities from metadata
+            q, a = normalize_entities(q), normalize_entities(a)
+            entry_id = entry.get("id") or entry_content_id(q, a)
+            suffix = 2
+            while entry_id in seen_ids:
+                entry_id = f"{entry_content_id(q, a)}-{suffix}"
+                suffix += 1
+            seen_ids.add(entry_id)
+            metadata.append({"id": entry_id, "question": q, "answer": a})
+    return metadata
+
+
+def entry_content_id(question: str, answer: str) -> str:
+    """Stable FAQ id derived from the entry content"""
+    return "faq-" + hashlib.sha1(f"{question}\0{answer}".encode('utf-8')).hexdigest()[:12]
+
+
+def build_index(metadata_path: str = METADATA_PATH, force: bool = False) -> str:
+    """Fit TF-IDF over the knowledge base and write the artifact; returns the artifact version"""
+    version = metadata_hash(metadata_path)
+    target = artifact_path(version)
+    if os.path.exists(os.path.join(target, 'manifest.json')) and not force:
+        return version
+
+    metadata = load_metadata_entries(metadata_path)
+    corpus = [entry["question"] for entry in metadata]
+    vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+    corpus_matrix = vectorizer.fit_transform(corpus).tocsr()
+    corpus_matrix.sort_indices()
+
+    # Write into a private directory first, then rename into place so that
+    # concurrent workers never observe a half-written artifact
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    staging = os.path.join(INDEX_DIR, f".tfidf-{version}-{os.getpid()}-{int(time.time() * 1000)}")
+    os.makedirs(staging)
+    try:
+        np.save(os.path.join(staging, 'idf.npy'), vectorizer.idf_.astype(np.float64))
+        np.save(os.path.join(staging, 'data.npy'), corpus_matrix.data.astype(np.float64))
+        # scipy unifies index dtypes, so both arrays must share one to stay memory-mapped
+        index_dtype = np.int32 if corpus_matrix.nnz < np.iinfo(np.int32).max else np.int64
+        np.save(os.path.join(staging, 'indices.npy'), corpus_matrix.indices.astype(index_dtype))
+        np.save(os.path.join(staging, 'indptr.npy'), corpus_matrix.indptr.astype(index_dtype))
+        with open(os.path.join(staging, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+            json.dump({term: int(col) for term, col in vectorizer.vocabulary_.items()}, f, ensure_ascii=False)
+        with open(os.path.join(staging, 'metadata.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+        with open(os.path.join(staging, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'format_version': INDEX_FORMAT_VERSION,
+                'version': version,
+                'vectorizer_params': VECTORIZER_PARAMS,
+                'num_documents': corpus_matrix.shape[0],
+                'num_features': corpus_matrix.shape[1],
+                'built_at': time.time()
+            }, f, indent=2)
+
+        if force and os.path.exists(target):
+            shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another worker published the same version first
+            pass
+    finally:
+        if os.path.exists(staging):
+            shutil.rmtree(staging, ignore_errors=True)
+
+    return version
+
+
+def _served_path(metadata_path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(metadata_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(INDEX_DIR, f".served-{digest}.json")
+
+
+def _served_lock() -> FileLock:
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    return FileLock(os.path.join(INDEX_DIR, '.served.lock'))
+
+
+def _read_served(path: str) -> List[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def _write_served(path: str, versions: List[str]):
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, 'w', encoding='utf-8') as f:
+        json.dump(versions, f)
+    os.replace(staging, path)
+
+
+def _kept_versions(exclude: str = '') -> set:
+    """Versions any metadata path (other than exclude) still keeps"""
+    kept = set()
+    for name in os.listdir(INDEX_DIR):
+        path = os.path.join(INDEX_DIR, name)
+        if name.startswith('.served-') and name.endswith('.json') and path != exclude:
+            kept.update(_read_served(path)[-SERVED_VERSIONS_KEPT:])
+    return kept
+
+
+def _remove_version(version: str):
+    for name in os.listdir(INDEX_DIR):
+        if not name.startswith('.') and name.endswith(f"-{version}"):
+            shutil.rmtree(os.path.join(INDEX_DIR, name), ignore_errors=True)
+
+
+def record_served(metadata_path: str, version: str):
+    """Note that version now serves metadata_path"""
+    path = _served_path(metadata_path)
+    with _served_lock():
+        versions = [v for v in _read_served(path) if v != version]
+        if versions[-1:] != [version]:
+            _write_served(path, versions + [version])
+
+
+def prune_artifacts(metadata_path: str, keep: int = SERVED_VERSIONS_KEPT):
+    """Remove artifacts of versions metadata_path served before its last keep versions
+
+    Versions never served for metadata_path, or still kept by another
+    metadata path, are left alone.
+    """
+    path = _served_path(metadata_path)
+    with _served_lock():
+        versions = _read_served(path)
+        if len(versions) <= keep:
+            return
+        protected = _kept_versions(exclude=path)
+        for version in versions[:-keep]:
+            if version not in protected:
+                _remove_version(version)
+        _write_served(path, versions[-keep:])
+
+
+def discard_unserved(version: str):
+    """Remove the artifacts of a version built but never served (an abandoned merge)"""
+    with _served_lock():
+        if version not in _kept_versions():
+            _remove_version(version)
+
+
+def load_index(version: str) -> RetrievalIndex:
+    """Memory-map a built artifact"""
+    path = artifact_path(version)
+    with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    with open(os.path.join(path, 'vocabulary.json'), 'r', encoding='utf-8') as f:
+        vocabulary = json.load(f)
+    with open(os.path.join(path, 'metadata.json'), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    idf = np.load(os.path.join(path, 'idf.npy'), mmap_mode='r')
+    data = np.load(os.path.join(path, 'data.npy'), mmap_mode='r')
+    indices = np.load(os.path.join(path, 'indices.npy'), mmap_mode='r')
+    indptr = np.load(os.path.join(path, 'indptr.npy'), mmap_mode='r')
+    shape = (manifest['num_documents'], manifest['num_features'])
+    corpus_matrix = csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+    vectorizer = IndexVectorizer(vocabulary, idf, manifest['vectorizer_params'])
+    return RetrievalIndex(version, metadata, vectorizer, corpus_matrix, path)
+
+
+def load_or_build_index(metadata_path: str = METADATA_PATH) -> Optional[RetrievalIndex]:
+    """Load the artifact for the current metadata.pkl, building it only if the hash changed"""
+    if not os.path.exists(metadata_path):
+        return None
+    version = build_index(metadata_path)
+    return load_index(version)
+
+
+def load_retriever(index: RetrievalIndex, backend: str = 'tfidf'):
+    """Retriever backend over the index questions; every backend exposes search(queries, k)"""
+    if backend not in RETRIEVER_BACKENDS:
+        raise ValueError(f"Unknown retriever backend: {backend}")
+    if backend == 'tfidf':
+        return TfidfRetriever(index.vectorizer, index.corpus_matrix)
+    if backend in ('dense', 'hybrid'):
+        # Optional dependencies (faiss, sentence-transformers) are only imported when selected
+        from dense_retriever import load_dense_retriever, HybridRetriever
+        dense = load_dense_retriever(INDEX_DIR, index.version, [entry["question"] for entry in index.metadata])
+        return dense if backend == 'dense' else HybridRetriever(load_retriever(index, 'bm25'), dense)
+
+    path = os.path.join(INDEX_DIR, f"bm25-{index.version}")
+    if not os.path.exists(os.path.join(path, 'vocabulary.json')):
+        staging = os.path.join(INDEX_DIR, f".bm25-{index.version}-{os.getpid()}-{int(time.time() * 1000)}")
+        try:
+            BM25Retriever.from_texts([entry["question"] for entry in index.metadata]).save(staging)
+            try:
+                os.rename(staging, path)
+            except OSError:
+                # Another worker published the same version first
+                pass
+        finally:
+            if os.path.exists(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+    return BM25Retriever.load(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the persisted retrieval index')
+    parser.add_argument('--build', action='store_true', help='Build the index artifact for metadata.pkl')
+    parser.add_argument('--metadata', default=METADATA_PATH, help='Path to metadata.pkl')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if the artifact already exists')
+    parser.add_argument('--backend', choices=RETRIEVER_BACKENDS, default='tfidf', help='Also build this retriever backend')
+    args = parser.parse_args()
+
+    try:
+        start_time = time.time()
+        version = build_index(args.metadata, force=args.force) if args.build else metadata_hash(args.metadata)
+        index = load_index(version)
+        load_retriever(index, args.backend)
+        if args.build:
+            record_served(args.metadata, version)
+            prune_artifacts(args.metadata)
+        print(json.dumps({
+            'version': version,
+            'path': index.path,
+            'documents': index.corpus_matrix.shape[0],
+            'features': index.corpus_matrix.shape[1],
+            'elapsed': time.time() - start_time
+        }, indent=2))
+    except Exception as e:
+        print(json.dumps({'error': str(e)}, indent=2))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Sparse top-k retrieval kernel shared by the chatbots
+Rows of both the corpus and the query matrices are expected to be L2-normalised
+(TfidfVectorizer does this by default), so a sparse dot product is the cosine similarity.
+"""
+
+from typing import Tuple
+from scipy.sparse import csr_matrix, issparse
+from sklearn.preprocessing import normalize
+from sklearn.feature_extraction.text import TfidfVectorizer
+import numpy as np
+
+
+def l2_normalize_rows(matrix) -> csr_matrix:
+    """Return a CSR matrix whose rows have unit L2 norm"""
+    if not issparse(matrix):
+        matrix = csr_matrix(matrix)
+    return normalize(matrix.tocsr(), norm='l2', copy=True)
+
+
+def top_k_rows(data: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Select the k largest scores from one sparse row, highest first"""
+    if data.shape[0] > k:
+        part = np.argpartition(-data, k - 1)[:k]
+        data, indices = data[part], indices[part]
+    order = np.argsort(-data, kind='stable')
+    return data[order], indices[order]
+
+
+def sparse_top_k(query_matrix, corpus_matrix, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score a batch of queries against the corpus and keep the top k per query.
+
+    Returns (scores, indices), both shaped (n_queries, k) and sorted best-first.
+    Queries with fewer than k matching documents are padded with score 0.0 and index -1.
+    Work per query scales with the number of documents sharing a term with it,
+    not with the corpus size.
+    """
+    n_queries = query_matrix.shape[0]
+    scores = np.zeros((n_queries, k), dtype=np.float64)
+    indices = np.full((n_queries, k), -1, dtype=np.int64)
+    if n_queries == 0 or k <= 0 or corpus_matrix.shape[0] == 0:
+        return scores, indices
+
+    # (docs x features) @ (features x queries) keeps the corpus in its native CSR
+    # layout; only the small result is transposed back to one row per query
+    similarities = (corpus_matrix @ query_matrix.T).T.tocsr()
+    similarities.eliminate_zeros()
+
+    for row in range(n_queries):
+        start, end = similarities.indptr[row], similarities.indptr[row + 1]
+        if start == end:
+            continue
+        row_scores, row_indices = top_k_rows(similarities.data[start:end], similarities.indices[start:end], k)
+        scores[row, :row_scores.shape[0]] = row_scores
+        indices[row, :row_indices.shape[0]] = row_indices
+
+    return scores, indices
+
+
+class TfidfRetriever:
+    """TF-IDF matrix backend: vectorize queries, then sparse_top_k"""
+
+    def __init__(self, vectorizer, corpus_matrix):
+        self.vectorizer = vectorizer
+        self.corpus_matrix = corpus_matrix
+
+    def search(self, queries, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return sparse_top_k(self.vectorizer.transform(queries), self.corpus_matrix, k)
+
+    def segment(self, texts) -> 'TfidfRetriever':
+        """A delta segment over extra documents with its own vocabulary, so new terms are searchable"""
+        params = dict(getattr(self.vectorizer, 'params', {}))
+        params.pop('max_features', None)
+        params['ngram_range'] = tuple(params.get('ngram_range', (1, 1)))
+        vectorizer = TfidfVectorizer(**params)
+        try:
+            return TfidfRetriever(vectorizer, vectorizer.fit_transform(texts))
+        except ValueError:
+            # Only stop words in the new documents; fall back to the base vocabulary
+            return TfidfRetriever(self.vectorizer, self.vectorizer.transform(texts))
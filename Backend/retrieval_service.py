@@ -0,0 +1,392 @@
+"""
+Process-wide Retrieval Service
+One loaded knowledge base and retriever backend shared by EnhancedChatbot,
+MultilingualBankingBot and every FastAPI endpoint in the process.
+
+Live edits (add / update / delete) go into a small delta segment plus a set of
+tombstoned base entries. Every edit publishes a new immutable snapshot with a
+single reference assignment, so in-flight requests keep the snapshot they
+started with. Edits are journaled and replayed at startup; once the delta grows
+past MERGE_THRESHOLD it is merged into metadata.pkl in the background and the
+rebuilt index is swapped in the same way.
+
+Several uvicorn workers can share one journal. Edits and merges hold a file
+lock on it, each worker applies the records other workers appended (checked
+every KB_SYNC_INTERVAL seconds), and a merge starts from metadata.pkl plus the
+whole journal, so no worker's edits are lost.
+"""
+
+import sys
+import json
+import os
+import pickle
+import threading
+import time
+from typing import List, Dict, Optional, Tuple, Any
+import numpy as np
+
+from text_normalizer import normalize_entities
+from metrics import stage_timer
+from file_lock import FileLock
+from retrieval_index import (METADATA_PATH, RetrievalIndex, load_or_build_index, load_retriever, entry_content_id,
+                             record_served, prune_artifacts, discard_unserved)
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RETRIEVER_BACKEND = os.getenv('RETRIEVER_BACKEND', 'tfidf')  # 'tfidf', 'bm25', 'dense' or 'hybrid'
+JOURNAL_PATH = os.path.join(BASE_DIR, "kb_journal.jsonl")
+MERGE_THRESHOLD = int(os.getenv('KB_MERGE_THRESHOLD', '256'))  # delta entries + tombstones
+KB_SYNC_INTERVAL = float(os.getenv('KB_SYNC_INTERVAL', '2'))  # how often to look for other workers' edits
+KB_LOAD_RETRY_SECONDS = float(os.getenv('KB_LOAD_RETRY_SECONDS', '5'))  # first retry after a failed load; doubles up to 5 minutes
+
+
+class KnowledgeBaseSnapshot:
+    """Immutable view of the knowledge base: base index, delta segment and tombstones"""
+
+    def __init__(self, index: RetrievalIndex, base_retriever, delta_entries: List[Dict], delta_retriever, tombstones: frozenset, seq: int):
+        self.index = index
+        self.base_retriever = base_retriever
+        self.delta_entries = delta_entries
+        self.delta_retriever = delta_retriever
+        self.tombstones = tombstones
+        self.seq = seq
+        self.version = index.version if seq == 0 else f"{index.version}+{seq}"
+        self.base_size = len(index.metadata)
+        # Result indices address base entries first, then delta entries
+        self.metadata = index.metadata + delta_entries if delta_entries else index.metadata
+
+    def search(self, queries: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Tombstoned entries can occupy at most len(tombstones) of the base results
+        base_scores, base_indices = self.base_retriever.search(queries, k + len(self.tombstones))
+        if not self.tombstones and self.delta_retriever is None:
+            return base_scores, base_indices
+
+        if self.tombstones:
+            dead = np.isin(base_indices, np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones)))
+            base_indices = np.where(dead, -1, base_indices)
+            base_scores = np.where(dead, 0.0, base_scores)
+        if self.delta_retriever is not None:
+            delta_scores, delta_indices = self.delta_retriever.search(queries, k)
+            delta_indices = np.where(delta_indices >= 0, delta_indices + self.base_size, -1)
+            base_scores = np.hstack([base_scores, delta_scores])
+            base_indices = np.hstack([base_indices, delta_indices])
+
+        base_scores = np.where(base_indices >= 0, base_scores, -1.0)
+        order = np.argsort(-base_scores, axis=1, kind='stable')[:, :k]
+        scores = np.take_along_axis(base_scores, order, axis=1)
+        indices = np.take_along_axis(base_indices, order, axis=1)
+        return np.maximum(scores, 0.0), indices
+
+
+class RetrievalService:
+    """Owns the knowledge base index and the configured retriever; loads lazily, once"""
+
+    def __init__(self, metadata_path: str = METADATA_PATH, backend: str = RETRIEVER_BACKEND, journal_path: str = JOURNAL_PATH):
+        self.metadata_path = metadata_path
+        self.backend = backend
+        self.journal_path = journal_path
+        self._snapshot: Optional[KnowledgeBaseSnapshot] = None
+        self._lock = threading.Lock()
+        self._update_lock = threading.RLock()
+        # Edits and merges of every worker process sharing the journal go through this lock
+        self._journal_lock = FileLock(f"{journal_path}.lock")
+        # One merge at a time across workers; merged index builds would otherwise prune each other
+        self._merge_lock = FileLock(f"{journal_path}.merge.lock")
+        self._loaded = False
+        self._load_failures = 0
+        self._load_retry_at = 0.0
+        self._merge_thread: Optional[threading.Thread] = None
+        # Mutable edit state; only touched while holding _update_lock
+        self._base_ids: Dict[str, int] = {}
+        self._delta: Dict[str, Dict] = {}
+        self._tombstones = set()
+        self._ops: List[Dict] = []
+        self._seq = 0
+        # How much of which journal file has been applied (os.replace by a merge changes the file)
+        self._journal_id: Optional[Tuple[int, int]] = None
+        self._journal_offset = 0
+        self._last_sync = 0.0
+
+    def load(self) -> bool:
+        """Load the index and retriever if needed; returns whether a knowledge base is available
+
+        A failed load is retried on a later call, after a backoff that doubles
+        with every failure.
+        """
+        if self._loaded:
+            return self._snapshot is not None
+        with self._lock:
+            if not self._loaded and time.time() >= self._load_retry_at:
+                try:
+                    with stage_timer('kb_load'):
+                        index = load_or_build_index(self.metadata_path)
+                        if index is not None:
+                            with self._update_lock:
+                                self._install_base(index, load_retriever(index, self.backend))
+                                self._sync_journal()
+                            record_served(self.metadata_path, index.version)
+                    self._loaded = True
+                    self._load_failures = 0
+                except Exception as e:
+                    self._snapshot = None
+                    self._load_failures += 1
+                    delay = min(KB_LOAD_RETRY_SECONDS * 2 ** (self._load_failures - 1), 300.0)
+                    self._load_retry_at = time.time() + delay
+                    print(f"Knowledge base load error (retrying in {delay:.0f}s): {e}", file=sys.stderr)
+        return self._snapshot is not None
+
+    def snapshot(self) -> Optional[KnowledgeBaseSnapshot]:
+        """The current snapshot; hold on to it for the whole request to get a consistent view"""
+        if not self.load():
+            return None
+        self._maybe_sync()
+        return self._snapshot
+
+    @property
+    def index(self) -> Optional[RetrievalIndex]:
+        snapshot = self.snapshot()
+        return snapshot.index if snapshot else None
+
+    @property
+    def metadata(self) -> List[Dict]:
+        snapshot = self.snapshot()
+        return snapshot.metadata if snapshot else []
+
+    @property
+    def version(self) -> Optional[str]:
+        snapshot = self.snapshot()
+        return snapshot.version if snapshot else None
+
+    def search(self, queries: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Padded (n_queries, k) scores and metadata indices; empty results without a knowledge base"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return np.zeros((len(queries), k)), np.full((len(queries), k), -1, dtype=np.int64)
+        return snapshot.search(queries, k)
+
+    # Live updates
+
+    def add_entry(self, question: str, answer: str) -> str:
+        return self._apply({'op': 'add', 'question': question, 'answer': answer})
+
+    def update_entry(self, entry_id: str, question: str, answer: str) -> str:
+        return self._apply({'op': 'update', 'id': entry_id, 'question': question, 'answer': answer})
+
+    def delete_entry(self, entry_id: str) -> str:
+        return self._apply({'op': 'delete', 'id': entry_id})
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self.snapshot()
+        return {
+            'backend': self.backend,
+            'version': snapshot.version if snapshot else None,
+            'base_entries': snapshot.base_size if snapshot else 0,
+            'delta_entries': len(snapshot.delta_entries) if snapshot else 0,
+            'deleted_entries': len(snapshot.tombstones) if snapshot else 0,
+            'merging': self._merge_thread is not None and self._merge_thread.is_alive()
+        }
+
+    def _apply(self, op: Dict) -> str:
+        if not self.load():
+            raise RuntimeError("Knowledge base is not loaded")
+        with self._journal_lock, self._update_lock:
+            # Edits made by other workers come first, so validation and seq see the shared state
+            self._sync_journal()
+            op = dict(op, seq=self._seq + 1, timestamp=time.time())
+            if op['op'] != 'delete':
+                op['question'] = normalize_entities(op['question'].strip())
+                op['answer'] = normalize_entities(op['answer'].strip())
+                # Same filter load_metadata_entries applies, so merged entries are never dropped
+                if len(op['question']) <= 10 or len(op['answer']) <= 20:
+                    raise ValueError("Question must be over 10 characters and answer over 20 characters")
+                if op['op'] == 'add':
+                    op['id'] = f"{entry_content_id(op['question'], op['answer'])}-{int(op['timestamp'] * 1000)}"
+            self._apply_op(op)
+            self._append_journal(op)
+            self._ops.append(op)
+            self._publish()
+            if len(self._delta) + len(self._tombstones) >= MERGE_THRESHOLD:
+                self.merge_in_background()
+            return op['id']
+
+    def _apply_op(self, op: Dict):
+        entry_id = op['id']
+        exists = entry_id in self._delta or (entry_id in self._base_ids and self._base_ids[entry_id] not in self._tombstones)
+        if op['op'] in ('update', 'delete') and not exists:
+            raise KeyError(entry_id)
+        if op['op'] in ('update', 'delete'):
+            self._delta.pop(entry_id, None)
+            if entry_id in self._base_ids:
+                self._tombstones.add(self._base_ids[entry_id])
+        if op['op'] in ('add', 'update'):
+            self._delta[entry_id] = {'id': entry_id, 'question': op['question'], 'answer': op['answer']}
+        self._seq = op['seq']
+
+    def _install_base(self, index: RetrievalIndex, retriever):
+        self._base_index = index
+        self._base_retriever = retriever
+        self._base_ids = {entry['id']: i for i, entry in enumerate(index.metadata)}
+        self._delta = {}
+        self._tombstones = set()
+        self._ops = []
+        self._seq = 0
+        self._publish()
+
+    def _publish(self):
+        """Build the next snapshot off to the side and swap it in with one assignment"""
+        delta_entries = list(self._delta.values())
+        delta_retriever = self._base_retriever.segment([e['question'] for e in delta_entries]) if delta_entries else None
+        self._snapshot = KnowledgeBaseSnapshot(self._base_index, self._base_retriever, delta_entries, delta_retriever, frozenset(self._tombstones), self._seq)
+
+    # Journal and background merge
+
+    def _append_journal(self, op: Dict):
+        """Append one edit; the caller holds _journal_lock and has synced, so this is the journal's end"""
+        with open(self.journal_path, 'ab') as f:
+            f.write((json.dumps(dict(op, base_version=self._base_index.version), ensure_ascii=False) + "\n").encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        self._journal_id, self._journal_offset = (st.st_ino, st.st_dev), st.st_size
+
+    def _maybe_sync(self):
+        """Pick up other workers' edits and merges, checking the journal at most every KB_SYNC_INTERVAL seconds"""
+        now = time.monotonic()
+        if now - self._last_sync < KB_SYNC_INTERVAL:
+            return
+        self._last_sync = now
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return
+        if ((st.st_ino, st.st_dev), st.st_size) != (self._journal_id, self._journal_offset):
+            with self._update_lock:
+                try:
+                    self._sync_journal()
+                except Exception as e:
+                    print(f"Knowledge base journal sync failed: {e}", file=sys.stderr)
+
+    def _sync_journal(self):
+        """Apply journal records not applied yet, whichever process wrote them
+
+        A journal rewritten by a merge is replayed from the start, on the merged
+        base loaded from disk. Records for a base that is not on disk are stale.
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if (st.st_ino, st.st_dev) != self._journal_id:
+                    self._install_base(self._base_index, self._base_retriever)
+                    self._journal_id, self._journal_offset = (st.st_ino, st.st_dev), 0
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # A line another process is still writing is picked up next time
+        complete = data[:data.rfind(b'\n') + 1]
+        self._journal_offset += len(complete)
+        checked_disk = False
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            op = json.loads(line)
+            if op.get('base_version') != self._base_index.version and not checked_disk:
+                checked_disk = True
+                self._reload_base()
+            if op.get('base_version') != self._base_index.version or op['op'] == 'base':
+                continue
+            try:
+                self._apply_op(op)
+                self._ops.append(op)
+            except KeyError:
+                pass
+        if complete:
+            self._publish()
+
+    def _reload_base(self):
+        """Switch to the base index on disk if another process merged a new one"""
+        index = load_or_build_index(self.metadata_path)
+        if index is not None and index.version != self._base_index.version:
+            self._install_base(index, load_retriever(index, self.backend))
+
+    def merge_in_background(self) -> bool:
+        """Start a background merge of the delta into the base index; False if one is running"""
+        with self._update_lock:
+            if self._merge_thread is not None and self._merge_thread.is_alive():
+                return False
+            self._merge_thread = threading.Thread(target=self._merge, name="kb-merge", daemon=True)
+            self._merge_thread.start()
+            return True
+
+    def _merge(self):
+        staging = f"{self.metadata_path}.{os.getpid()}.tmp"
+        with self._merge_lock:
+            try:
+                with self._journal_lock, self._update_lock:
+                    # Rebuild the state from metadata.pkl and the whole journal, not from this
+                    # process's view, so edits made by every worker are merged
+                    self._reload_base()
+                    self._journal_id = None
+                    self._sync_journal()
+                    snapshot = self._snapshot
+                    merged_seq = self._seq
+                    if snapshot is None or (not snapshot.delta_entries and not snapshot.tombstones):
+                        return
+                    entries = [e for i, e in enumerate(snapshot.index.metadata) if i not in snapshot.tombstones] + snapshot.delta_entries
+                    with open(staging, 'wb') as f:
+                        pickle.dump(entries, f)
+
+                # Build the merged index without blocking readers or writers in any process
+                index = load_or_build_index(staging)
+                retriever = load_retriever(index, self.backend)
+
+                with self._journal_lock, self._update_lock:
+                    self._sync_journal()
+                    if self._base_index.version != snapshot.index.version:
+                        # Another worker merged first; its base already holds these edits
+                        if index.version != self._base_index.version:
+                            discard_unserved(index.version)
+                        return
+                    os.replace(staging, self.metadata_path)
+                    # Edits that arrived while the merge was running are replayed on the new base
+                    pending = [op for op in self._ops if op['seq'] > merged_seq]
+                    self._install_base(index, retriever)
+                    for op in pending:
+                        try:
+                            self._apply_op(op)
+                            self._ops.append(op)
+                        except KeyError:
+                            pass
+                    journal_staging = f"{self.journal_path}.{os.getpid()}.tmp"
+                    with open(journal_staging, 'w', encoding='utf-8') as f:
+                        # Tells other workers which base the rewritten journal applies to
+                        f.write(json.dumps({'op': 'base', 'base_version': index.version}) + "\n")
+                        for op in self._ops:
+                            f.write(json.dumps(dict(op, base_version=index.version), ensure_ascii=False) + "\n")
+                    os.replace(journal_staging, self.journal_path)
+                    st = os.stat(self.journal_path)
+                    self._journal_id, self._journal_offset = (st.st_ino, st.st_dev), st.st_size
+                    self._publish()
+                # Only a merge that replaced the base prunes, and it keeps the previous
+                # version for workers that have not reloaded yet
+                record_served(self.metadata_path, index.version)
+                prune_artifacts(self.metadata_path)
+            except Exception as e:
+                print(f"Knowledge base merge failed: {e}", file=sys.stderr)
+            finally:
+                if os.path.exists(staging):
+                    os.remove(staging)
+
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def get_retrieval_service() -> RetrievalService:
+    """The shared process-wide RetrievalService"""
+    global _SERVICE
+    if _SERVICE is None:
+        with _SERVICE_LOCK:
+            if _SERVICE is None:
+                _SERVICE = RetrievalService()
+    return _SERVICE
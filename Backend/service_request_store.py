@@ -0,0 +1,197 @@
+"""
+Indexed service request store
+Flow: API -> SQLite (WAL) table with ID primary key + status / priority / timestamp indexes
+
+Each ticket is one row. The columns the admin dashboard filters and sorts on
+are real indexed columns, and the full ticket (chat history, PDF text) is a JSON
+body that is only parsed when a full record is asked for. A status change
+updates one row by primary key. Lists are keyset-paginated on
+(timestamp, id), so a page costs the same however deep it is.
+
+On first start, tickets from the legacy service_requests.jsonl are imported
+once.
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_REQUESTS_DB = os.getenv('SERVICE_REQUESTS_DB', os.path.join(BASE_DIR, "service_requests.db"))
+LEGACY_SERVICE_REQUESTS_FILE = os.path.join(BASE_DIR, "service_requests.jsonl")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Indexed columns; status and lastUpdated override the values in the JSON body
+SUMMARY_COLUMNS = "id, customer_id, customer_name, customer_email, escalation_reason, priority, status, timestamp, created_at, last_updated, pdf_filename, message_count"
+
+
+def encode_cursor(timestamp: float, item_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([timestamp, item_id]).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """(timestamp, id) of the last item on the previous page; ValueError if malformed"""
+    try:
+        timestamp, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(timestamp, (int, float)) or not isinstance(item_id, str):
+        raise ValueError("Invalid cursor")
+    return timestamp, item_id
+
+
+class ServiceRequestStore:
+    """Service requests in SQLite with an ID index and status, priority and timestamp indexes"""
+
+    def __init__(self, path: str = SERVICE_REQUESTS_DB, legacy_path: Optional[str] = LEGACY_SERVICE_REQUESTS_FILE):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS service_requests (
+                    id TEXT PRIMARY KEY,
+                    customer_id TEXT,
+                    customer_name TEXT,
+                    customer_email TEXT,
+                    escalation_reason TEXT,
+                    priority TEXT,
+                    status TEXT,
+                    timestamp INTEGER,
+                    created_at INTEGER,
+                    last_updated INTEGER,
+                    pdf_filename TEXT,
+                    message_count INTEGER,
+                    body TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS service_requests_timestamp ON service_requests (timestamp, id);
+                CREATE INDEX IF NOT EXISTS service_requests_status ON service_requests (status, timestamp, id);
+                CREATE INDEX IF NOT EXISTS service_requests_priority ON service_requests (priority, timestamp, id);
+                CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+        if legacy_path:
+            self._import_legacy(legacy_path)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _import_legacy(self, legacy_path: str):
+        """Copy tickets from service_requests.jsonl once; the file is left as it was"""
+        with self._connection() as db:
+            if db.execute("SELECT 1 FROM store_meta WHERE key = 'legacy_imported'").fetchone():
+                return
+            if os.path.exists(legacy_path):
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            db.execute(f"INSERT OR REPLACE INTO service_requests VALUES ({', '.join('?' * 13)})", self._row(json.loads(line)))
+            db.execute("INSERT OR REPLACE INTO store_meta VALUES ('legacy_imported', ?)", (str(time.time()),))
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> tuple:
+        return (
+            record['id'], record.get('customerId'), record.get('customerName'), record.get('customerEmail'),
+            record.get('escalationReason'), record.get('priority'), record.get('status'),
+            record.get('timestamp', 0), record.get('createdAt', record.get('timestamp', 0)),
+            record.get('lastUpdated', record.get('timestamp', 0)), record.get('pdfFilename'),
+            len(record.get('chatHistory') or []), json.dumps(record, ensure_ascii=False)
+        )
+
+    @staticmethod
+    def _summary(row: tuple) -> Dict[str, Any]:
+        (request_id, customer_id, customer_name, customer_email, escalation_reason, priority,
+         status, timestamp, created_at, last_updated, pdf_filename, message_count) = row
+        return {
+            'id': request_id,
+            'customerId': customer_id,
+            'customerName': customer_name,
+            'customerEmail': customer_email,
+            'escalationReason': escalation_reason,
+            'priority': priority,
+            'status': status,
+            'timestamp': timestamp,
+            'createdAt': created_at,
+            'lastUpdated': last_updated,
+            'pdfFilename': pdf_filename,
+            'messageCount': message_count
+        }
+
+    @staticmethod
+    def _full(body: str, status: str, last_updated: int) -> Dict[str, Any]:
+        return dict(json.loads(body), status=status, lastUpdated=last_updated)
+
+    def create(self, record: Dict[str, Any]):
+        with self._connection() as db:
+            db.execute(f"INSERT INTO service_requests VALUES ({', '.join('?' * 13)})", self._row(record))
+
+    def get(self, request_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT body, status, last_updated FROM service_requests WHERE id = ?", (request_id,)).fetchone()
+        return self._full(*row) if row else None
+
+    def update_status(self, request_id: str, status: str) -> bool:
+        """Change one ticket's status in place; False if there is no such ticket"""
+        with self._connection() as db:
+            return db.execute(
+                "UPDATE service_requests SET status = ?, last_updated = ? WHERE id = ?",
+                (status, int(time.time() * 1000), request_id)
+            ).rowcount > 0
+
+    def list_all(self) -> List[Dict[str, Any]]:
+        """Every ticket in full, newest first"""
+        rows = self._connection().execute("SELECT body, status, last_updated FROM service_requests ORDER BY timestamp DESC, id DESC").fetchall()
+        return [self._full(*row) for row in rows]
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of tickets per status (answered from the status index)"""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM service_requests GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def list_summaries(self, status: Optional[str] = None, priority: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of ticket summaries (no chat history or PDF text), newest first"""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if priority:
+            where.append("priority = ?")
+            params.append(priority)
+        if cursor:
+            timestamp, request_id = decode_cursor(cursor)
+            where.append("(timestamp, id) < (?, ?)")
+            params += [timestamp, request_id]
+        query = f"SELECT {SUMMARY_COLUMNS} FROM service_requests"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        rows = self._connection().execute(query, params + [limit + 1]).fetchall()
+
+        items = [self._summary(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]['timestamp'], items[-1]['id']) if len(rows) > limit else None
+        return {'items': items, 'nextCursor': next_cursor}
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_service_request_store() -> ServiceRequestStore:
+    """The shared process-wide ServiceRequestStore"""
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = ServiceRequestStore()
+    return _STORE
@@ -0,0 +1,181 @@
+"""
+Session lifecycle manager
+Flow: Background sweep -> TTL expiry per artifact -> per-session message cap -> disk budget (LRU) -> metrics
+
+Artifacts under sessions/ and their TTLs (seconds since last use, 0 disables):
+- chat histories in the session store   SESSION_TTL_CHAT     (7 days)
+- {id}_pdf_state.json uploads           SESSION_TTL_PDF      (1 day)
+- {id}_archive.json archives            SESSION_TTL_ARCHIVE  (90 days)
+
+Histories longer than SESSION_MAX_MESSAGES lose their oldest turns. If
+everything together still exceeds SESSIONS_DISK_BUDGET_MB, the least recently
+used chat histories and PDF states are evicted first, and archives only after
+those. Sweeps run on a daemon thread every SESSION_SWEEP_INTERVAL seconds, so
+requests never wait on cleanup.
+"""
+
+import sys
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from session_store import get_session_store
+from archive_catalog import get_archive_catalog
+from metrics import get_metrics
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSIONS_DIR = os.path.join(BASE_DIR, "sessions")
+SESSION_TTL_CHAT = float(os.getenv('SESSION_TTL_CHAT', str(7 * 24 * 3600)))
+SESSION_TTL_PDF = float(os.getenv('SESSION_TTL_PDF', str(24 * 3600)))
+SESSION_TTL_ARCHIVE = float(os.getenv('SESSION_TTL_ARCHIVE', str(90 * 24 * 3600)))
+SESSION_MAX_MESSAGES = int(os.getenv('SESSION_MAX_MESSAGES', '500'))
+SESSIONS_DISK_BUDGET_MB = float(os.getenv('SESSIONS_DISK_BUDGET_MB', '1024'))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '600'))
+STALE_TEMP_AGE = 3600  # staging files left behind by a crashed writer
+
+PDF_SUFFIX = "_pdf_state.json"
+ARCHIVE_SUFFIX = "_archive.json"
+
+
+class SessionLifecycleManager:
+    """Expires, trims and evicts session artifacts on a background thread"""
+
+    def __init__(self, sessions_dir: str = SESSIONS_DIR, interval: float = SESSION_SWEEP_INTERVAL,
+                 ttl: Optional[Dict[str, float]] = None, max_messages: int = SESSION_MAX_MESSAGES,
+                 disk_budget: int = int(SESSIONS_DISK_BUDGET_MB * 1024 * 1024), store=None, catalog=None):
+        self.sessions_dir = sessions_dir
+        self.interval = interval
+        self.ttl = ttl or {'chat': SESSION_TTL_CHAT, 'pdf': SESSION_TTL_PDF, 'archive': SESSION_TTL_ARCHIVE}
+        self.max_messages = max_messages
+        self.disk_budget = disk_budget
+        self.store = store or get_session_store()
+        self.catalog = catalog or get_archive_catalog()
+        self._stop = threading.Event()
+        self._sweep_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._last_sweep = 0.0
+        self.sweeps = 0
+        self.last_result: Dict[str, Any] = {}
+
+    def start(self) -> 'SessionLifecycleManager':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-lifecycle", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Session sweep error: {e}", file=sys.stderr)
+            self._stop.wait(self.interval)
+
+    def _artifacts(self) -> List[Dict[str, Any]]:
+        """Every chat history, PDF state and archive with its size and last use"""
+        artifacts = [dict(session, kind='chat') for session in self.store.list_sessions()]
+        for entry in os.scandir(self.sessions_dir):
+            if entry.name.endswith(PDF_SUFFIX):
+                kind, session_id = 'pdf', entry.name[:-len(PDF_SUFFIX)]
+            elif entry.name.endswith(ARCHIVE_SUFFIX):
+                kind, session_id = 'archive', entry.name[:-len(ARCHIVE_SUFFIX)]
+            elif entry.name.endswith('.tmp'):
+                kind, session_id = 'temp', entry.name
+            else:
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            artifacts.append({'kind': kind, 'session_id': session_id, 'path': entry.path, 'bytes': st.st_size, 'last_used': max(st.st_mtime, st.st_atime)})
+        return artifacts
+
+    def _remove(self, artifact: Dict[str, Any], reason: str, result: Dict[str, Any]):
+        try:
+            if artifact['kind'] == 'chat':
+                if not self.store.delete(artifact['session_id']):
+                    return
+            else:
+                os.remove(artifact['path'])
+                if artifact['kind'] == 'archive':
+                    self.catalog.remove(artifact['session_id'])
+        except FileNotFoundError:
+            return  # removed by a request meanwhile
+        metrics = get_metrics()
+        metrics.inc('session_lifecycle_removed_total', artifact=artifact['kind'], reason=reason)
+        metrics.inc('session_lifecycle_reclaimed_bytes_total', artifact['bytes'], artifact=artifact['kind'], reason=reason)
+        result['removed'][reason] += 1
+        result['reclaimed_bytes'] += artifact['bytes']
+
+    def sweep(self) -> Dict[str, Any]:
+        """One pass of TTL expiry, message caps and disk budget enforcement"""
+        with self._sweep_lock:
+            started = time.time()
+            result = {'removed': {'ttl': 0, 'budget': 0}, 'trimmed_messages': 0, 'reclaimed_bytes': 0}
+            live = []
+            for artifact in self._artifacts():
+                ttl = STALE_TEMP_AGE if artifact['kind'] == 'temp' else self.ttl.get(artifact['kind'], 0)
+                if ttl and started - artifact['last_used'] > ttl:
+                    self._remove(artifact, 'ttl', result)
+                else:
+                    live.append(artifact)
+
+            # Only histories written since the last sweep can have grown past the cap
+            if self.max_messages:
+                for artifact in live:
+                    if artifact['kind'] != 'chat' or artifact.get('messages', self.max_messages + 1) <= self.max_messages or artifact['last_used'] < self._last_sweep:
+                        continue
+                    trimmed, reclaimed = self.store.trim(artifact['session_id'], self.max_messages)
+                    if trimmed:
+                        artifact['bytes'] -= reclaimed
+                        result['trimmed_messages'] += trimmed
+                        result['reclaimed_bytes'] += reclaimed
+                        get_metrics().inc('session_lifecycle_trimmed_messages_total', trimmed)
+                        get_metrics().inc('session_lifecycle_reclaimed_bytes_total', reclaimed, artifact='chat', reason='trim')
+
+            disk_bytes = sum(artifact['bytes'] for artifact in live)
+            if self.disk_budget and disk_bytes > self.disk_budget:
+                # Least recently used first; archives are admin records, so they go last
+                candidates = sorted((a for a in live if a['kind'] != 'temp'), key=lambda a: (a['kind'] == 'archive', a['last_used']))
+                for artifact in candidates:
+                    if disk_bytes <= self.disk_budget:
+                        break
+                    self._remove(artifact, 'budget', result)
+                    disk_bytes -= artifact['bytes']
+
+            self._last_sweep = started
+            self.sweeps += 1
+            result.update(disk_bytes=disk_bytes, duration=time.time() - started, finished_at=time.time())
+            self.last_result = result
+            get_metrics().observe('session_lifecycle_sweep_seconds', result['duration'])
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'interval': self.interval,
+            'ttl': self.ttl,
+            'max_messages': self.max_messages,
+            'disk_budget_bytes': self.disk_budget,
+            'sweeps': self.sweeps,
+            'last_sweep': self.last_result
+        }
+
+
+_MANAGER = None
+_MANAGER_LOCK = threading.Lock()
+
+
+def get_session_lifecycle() -> SessionLifecycleManager:
+    """The shared, running process-wide SessionLifecycleManager"""
+    global _MANAGER
+    if _MANAGER is None:
+        with _MANAGER_LOCK:
+            if _MANAGER is None:
+                _MANAGER = SessionLifecycleManager().start()
+    return _MANAGER
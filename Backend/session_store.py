@@ -0,0 +1,367 @@
+"""
+Pluggable chat session store
+Flow: Chat turn -> append (O(1)) -> per-session log or SQLite WAL -> last N turns on read
+
+Backends (SESSION_STORE_BACKEND):
+- 'log' (default where fcntl exists): one append-only JSONL file per session, sessions/{id}.jsonl.
+  Appends take an exclusive flock and write whole lines, so concurrent requests
+  on one session never lose each other's turns. Reads scan backwards from the
+  end of the file, so loading the last N turns does not parse the whole log.
+- 'sqlite' (default on Windows): one sessions/sessions.db in WAL mode, a row per message.
+
+A background thread compacts the store every SESSION_COMPACT_INTERVAL seconds:
+the log backend rewrites logs with torn lines and migrates legacy
+sessions/{id}.json histories, and the SQLite backend checkpoints its WAL.
+"""
+
+import sys
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the log backend needs flock, so SQLite is the default there
+    fcntl = None
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSIONS_DIR = os.path.join(BASE_DIR, "sessions")
+SESSION_STORE_BACKEND = os.getenv('SESSION_STORE_BACKEND', 'log' if fcntl else 'sqlite')  # 'log' or 'sqlite'
+SESSION_COMPACT_INTERVAL = float(os.getenv('SESSION_COMPACT_INTERVAL', '300'))
+READ_BLOCK_SIZE = 64 * 1024
+
+os.makedirs(SESSIONS_DIR, exist_ok=True)
+
+
+def _encode(messages: List[Dict]) -> bytes:
+    return "".join(json.dumps(m, ensure_ascii=False) + "\n" for m in messages).encode('utf-8')
+
+
+class LogSessionStore:
+    """Append-only JSONL log per session"""
+
+    backend = 'log'
+
+    def __init__(self, sessions_dir: str = SESSIONS_DIR):
+        if fcntl is None:
+            raise RuntimeError("SESSION_STORE_BACKEND=log needs fcntl; use SESSION_STORE_BACKEND=sqlite on this platform")
+        self.sessions_dir = sessions_dir
+        self._lock = threading.Lock()
+        self._repair: Set[str] = set()  # sessions whose log has torn or corrupt lines
+        self.appends = 0
+        self.compactions = 0
+
+    def log_path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.jsonl")
+
+    def legacy_path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.json")
+
+    def _open_locked(self, session_id: str, mode: str, lock: int):
+        """Open the log and lock it, retrying if compaction swapped the file in between"""
+        path = self.log_path(session_id)
+        while True:
+            f = open(path, mode)
+            fcntl.flock(f, lock)
+            try:
+                if os.fstat(f.fileno()).st_ino == os.stat(path).st_ino:
+                    return f
+            except FileNotFoundError:
+                if 'a' not in mode:
+                    f.close()
+                    raise
+            f.close()
+
+    def _migrate_legacy(self, session_id: str):
+        """Turn a sessions/{id}.json history written by older versions into a log"""
+        legacy = self.legacy_path(session_id)
+        if not os.path.exists(legacy):
+            return
+        try:
+            with open(legacy, 'r', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                if not os.path.exists(legacy):
+                    return  # migrated by another thread or worker meanwhile
+                if not os.path.exists(self.log_path(session_id)):
+                    try:
+                        messages = json.load(f).get('messages', [])
+                    except ValueError:
+                        messages = []
+                    self.replace(session_id, messages)
+                os.remove(legacy)
+        except FileNotFoundError:
+            pass
+
+    def append(self, session_id: str, messages: List[Dict]):
+        """Add messages to the end of the session in one locked write"""
+        self._migrate_legacy(session_id)
+        with self._open_locked(session_id, 'a+b', fcntl.LOCK_EX) as f:
+            data = _encode(messages)
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data  # never glue new turns onto a line torn by a crash
+            f.write(data)
+        with self._lock:
+            self.appends += 1
+
+    def load(self, session_id: str, last_n: Optional[int] = None) -> List[Dict]:
+        """All messages of the session, or only the last last_n"""
+        self._migrate_legacy(session_id)
+        try:
+            f = self._open_locked(session_id, 'rb', fcntl.LOCK_SH)
+        except FileNotFoundError:
+            return []
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if last_n is None:
+                data = f.read()
+            else:
+                # Read blocks from the end until they hold last_n complete lines
+                data, position = b"", size
+                while position > 0 and data.count(b"\n") <= last_n:
+                    step = min(READ_BLOCK_SIZE, position)
+                    position -= step
+                    f.seek(position)
+                    data = f.read(step) + data
+                if position > 0:
+                    data = data[data.index(b"\n") + 1:]
+
+        messages = []
+        for line in data.splitlines():
+            try:
+                messages.append(json.loads(line))
+            except ValueError:
+                with self._lock:
+                    self._repair.add(session_id)
+        return messages if last_n is None else messages[max(0, len(messages) - last_n):]
+
+    def replace(self, session_id: str, messages: List[Dict]):
+        """Atomically swap the session's log for one holding exactly messages"""
+        self._swap(session_id, _encode(messages))
+
+    def _swap(self, session_id: str, data: bytes):
+        path = self.log_path(session_id)
+        staging = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(staging, 'wb') as f:
+            f.write(data)
+        os.replace(staging, path)
+
+    def trim(self, session_id: str, keep_last: int) -> Tuple[int, int]:
+        """Drop all but the last keep_last messages; (messages removed, bytes reclaimed)"""
+        try:
+            with self._open_locked(session_id, 'rb', fcntl.LOCK_EX) as f:
+                lines = f.read().splitlines(keepends=True)
+                if len(lines) <= keep_last:
+                    return 0, 0
+                removed = lines[:len(lines) - keep_last]
+                self._swap(session_id, b"".join(lines[len(lines) - keep_last:]))
+                return len(removed), sum(len(line) for line in removed)
+        except FileNotFoundError:
+            return 0, 0
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """session_id, last_used and bytes of every stored session"""
+        sessions = []
+        for entry in os.scandir(self.sessions_dir):
+            if entry.name.endswith('.jsonl'):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                sessions.append({'session_id': entry.name[:-len('.jsonl')], 'last_used': max(st.st_mtime, st.st_atime), 'bytes': st.st_size})
+        return sessions
+
+    def delete(self, session_id: str) -> bool:
+        removed = False
+        for path in (self.log_path(session_id), self.legacy_path(session_id)):
+            if os.path.exists(path):
+                os.remove(path)
+                removed = True
+        return removed
+
+    def compact(self):
+        """Rewrite logs with torn lines and migrate legacy JSON histories"""
+        with self._lock:
+            repair, self._repair = self._repair, set()
+        for session_id in repair:
+            try:
+                with self._open_locked(session_id, 'rb', fcntl.LOCK_EX) as f:
+                    messages = []
+                    for line in f.read().splitlines():
+                        try:
+                            messages.append(json.loads(line))
+                        except ValueError:
+                            pass
+                    # Swap while holding the lock; appenders notice the new inode and reopen
+                    self.replace(session_id, messages)
+            except FileNotFoundError:
+                pass
+        for filename in os.listdir(self.sessions_dir):
+            if filename.endswith('.json') and not filename.endswith(('_archive.json', '_pdf_state.json')):
+                self._migrate_legacy(filename[:-len('.json')])
+        with self._lock:
+            self.compactions += 1
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'backend': self.backend, 'appends': self.appends, 'compactions': self.compactions, 'pending_repairs': len(self._repair)}
+
+
+class SqliteSessionStore:
+    """One SQLite database in WAL mode, a row per message"""
+
+    backend = 'sqlite'
+
+    def __init__(self, path: str = os.path.join(SESSIONS_DIR, "sessions.db")):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.appends = 0
+        self.compactions = 0
+        with self._connection() as db:
+            # Lets compaction hand pages freed by trimming and expiry back to the file system
+            if db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # Once the file exists (WAL mode already writes it) the mode only changes with a rebuild
+                db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                try:
+                    db.execute("VACUUM")
+                except sqlite3.OperationalError as e:
+                    print(f"Session store VACUUM skipped, retried on next start: {e}", file=sys.stderr)
+            db.execute("CREATE TABLE IF NOT EXISTS messages (seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, body TEXT NOT NULL, created_at REAL)")
+            if 'created_at' not in [column[1] for column in db.execute("PRAGMA table_info(messages)")]:
+                db.execute("ALTER TABLE messages ADD COLUMN created_at REAL")
+            db.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _insert(self, db: sqlite3.Connection, session_id: str, messages: List[Dict]):
+        now = time.time()
+        db.executemany("INSERT INTO messages (session_id, body, created_at) VALUES (?, ?, ?)", [(session_id, json.dumps(m, ensure_ascii=False), now) for m in messages])
+
+    def append(self, session_id: str, messages: List[Dict]):
+        with self._connection() as db:
+            self._insert(db, session_id, messages)
+        with self._lock:
+            self.appends += 1
+
+    def load(self, session_id: str, last_n: Optional[int] = None) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT body FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, -1 if last_n is None else max(0, last_n))
+        ).fetchall()
+        return [json.loads(body) for (body,) in reversed(rows)]
+
+    def replace(self, session_id: str, messages: List[Dict]):
+        with self._connection() as db:
+            db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._insert(db, session_id, messages)
+
+    def delete(self, session_id: str) -> bool:
+        with self._connection() as db:
+            return db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def trim(self, session_id: str, keep_last: int) -> Tuple[int, int]:
+        """Drop all but the last keep_last messages; (messages removed, bytes reclaimed)"""
+        with self._connection() as db:
+            condition = "session_id = ? AND seq NOT IN (SELECT seq FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?)"
+            params = (session_id, session_id, keep_last)
+            count, size = db.execute(f"SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM messages WHERE {condition}", params).fetchone()
+            if count:
+                db.execute(f"DELETE FROM messages WHERE {condition}", params)
+            return count, size
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """session_id, last_used, bytes and message count of every stored session"""
+        rows = self._connection().execute("SELECT session_id, MAX(created_at), SUM(LENGTH(body)), COUNT(*) FROM messages GROUP BY session_id").fetchall()
+        return [{'session_id': session_id, 'last_used': last_used or 0.0, 'bytes': size, 'messages': count} for session_id, last_used, size, count in rows]
+
+    def compact(self):
+        """Fold the WAL back into the database file, truncate it and release free pages"""
+        db = self._connection()
+        # executescript steps the pragma to completion; execute() frees a single page
+        db.executescript("PRAGMA incremental_vacuum;")
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        with self._lock:
+            self.compactions += 1
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'backend': self.backend, 'appends': self.appends, 'compactions': self.compactions}
+
+
+class SessionCompactor:
+    """Daemon thread that compacts the store off the request path"""
+
+    def __init__(self, store, interval: float = SESSION_COMPACT_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'SessionCompactor':
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-compactor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.compact()
+            except Exception as e:
+                print(f"Session compaction error: {e}", file=sys.stderr)
+
+
+def create_session_store(backend: str = SESSION_STORE_BACKEND):
+    """The session store selected by SESSION_STORE_BACKEND"""
+    if backend == 'sqlite':
+        return SqliteSessionStore()
+    return LogSessionStore()
+
+
+_STORE = None
+_COMPACTOR = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_session_store():
+    """The shared process-wide session store, with its compactor running"""
+    global _STORE, _COMPACTOR
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                store = create_session_store()
+                _COMPACTOR = SessionCompactor(store).start()
+                _STORE = store
+    return _STORE
+
+
+def stop_session_compactor():
+    if _COMPACTOR is not None:
+        _COMPACTOR.stop()
@@ -0,0 +1,53 @@
+"""
+Single-flight request coalescing
+Concurrent callers that ask for the same key share one in-flight execution and
+all receive its result. The shared work runs as its own task, so a caller that
+disconnects does not cancel it for the others.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """At most one running execution per key; later callers wait for it"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(result, whether this call joined an execution started by another caller)"""
+        with self._lock:
+            task = self._inflight.get(key)
+            # A task can only be awaited from its own loop (process_query runs its own)
+            joined = task is not None and task.get_loop() is asyncio.get_running_loop()
+            if joined:
+                self.coalesced += 1
+            else:
+                task = asyncio.ensure_future(factory())
+                self.executions += 1
+                if key not in self._inflight:
+                    self._inflight[key] = task
+                    task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task), joined
+
+    def _finish(self, key: str, task: asyncio.Task):
+        with self._lock:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.executions + self.coalesced
+            return {
+                'in_flight': len(self._inflight),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'coalesced_rate': self.coalesced / calls if calls else 0.0
+            }
@@ -3,31 +3,36 @@
 FastAPI Server for Banking Chatbot
 """
 
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, WebSocket, WebSocketDisconnect, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-import subprocess
+import asyncio
 import json
 import sys
-import tempfile
 import os
 import time
-import html
 import re
 from typing import Optional, Dict, List
+from text_normalizer import normalize_entities
+from llm_scheduler import LLMOverloaded
+from worker_pool import WorkerPool, RagAnswerJob, PdfUploadJob, ArchiveSessionJob, JobTimeout
+from chat_pubsub import create_pubsub
+from metrics import get_metrics
+from session_store import get_session_store, stop_session_compactor
+from service_request_store import get_service_request_store, DEFAULT_PAGE_SIZE
+from archive_catalog import get_archive_catalog
+from session_lifecycle import get_session_lifecycle
+from prompt_builder import get_tokenizer
 
 def clean_text(text: str) -> str:
     """Remove all HTML entities from text"""
-    if not text:
-        return text
-    for _ in range(3):
-        text = html.unescape(text)
-    return text
+    return normalize_entities(text)
 
 # Dynamic base directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SESSIONS_DIR = os.path.join(BASE_DIR, "sessions")
-SERVICE_REQUESTS_FILE = os.path.join(BASE_DIR, "service_requests.jsonl")
 
 # Ensure directories exist
 os.makedirs(SESSIONS_DIR, exist_ok=True)
@@ -43,35 +48,137 @@ else:
 
 # WebSocket connection manager
 class ConnectionManager:
-    def __init__(self):
+    """Local WebSockets per service request; messages travel over pub/sub so peers may sit on other workers"""
+    
+    def __init__(self, pubsub=None):
         self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
+        self.pubsub = pubsub if pubsub is not None else create_pubsub()
+        self._deliverers: Dict[str, object] = {}
         
     async def connect(self, websocket: WebSocket, service_request_id: str, user_type: str):
         await websocket.accept()
         if service_request_id not in self.active_connections:
             self.active_connections[service_request_id] = {}
+            # One subscription per service request per worker
+            async def deliver(envelope: dict, service_request_id=service_request_id):
+                await self.deliver_local(service_request_id, envelope['target'], envelope['message'])
+            self._deliverers[service_request_id] = deliver
+            await self.pubsub.subscribe(f"chat:{service_request_id}", deliver)
         self.active_connections[service_request_id][user_type] = websocket
         
-    def disconnect(self, service_request_id: str, user_type: str):
+    async def disconnect(self, service_request_id: str, user_type: str):
         if service_request_id in self.active_connections:
             if user_type in self.active_connections[service_request_id]:
                 del self.active_connections[service_request_id][user_type]
             if not self.active_connections[service_request_id]:
                 del self.active_connections[service_request_id]
+                deliver = self._deliverers.pop(service_request_id, None)
+                if deliver is not None:
+                    await self.pubsub.unsubscribe(f"chat:{service_request_id}", deliver)
                 
     async def send_message(self, service_request_id: str, message: dict, sender_type: str):
+        target_type = 'admin' if sender_type == 'customer' else 'customer'
+        await self.pubsub.publish(f"chat:{service_request_id}", {'target': target_type, 'message': message})
+    
+    async def deliver_local(self, service_request_id: str, target_type: str, message: dict):
+        """Send to the target WebSocket if it is connected to this worker"""
         if service_request_id in self.active_connections:
-            target_type = 'admin' if sender_type == 'customer' else 'customer'
             if target_type in self.active_connections[service_request_id]:
                 websocket = self.active_connections[service_request_id][target_type]
                 try:
                     await websocket.send_text(json.dumps(message))
                 except:
-                    self.disconnect(service_request_id, target_type)
+                    await self.disconnect(service_request_id, target_type)
 
 manager = ConnectionManager()
 
-app = FastAPI(title="SecureBank Assistant API", version="1.0.0")
+class AppServices:
+    """Bots, index and clients shared by every request; built once at startup"""
+    
+    def __init__(self):
+        sys.path.append(BASE_DIR)
+        from enhanced_chatbot import EnhancedChatbot
+        from multilingual_banking_bot import MultilingualBankingBot
+        from retrieval_service import get_retrieval_service
+        from llm_client import get_llm_client
+        from connectivity_monitor import get_connectivity_monitor
+        
+        self.retrieval = get_retrieval_service()
+        self.llm = get_llm_client()
+        self.connectivity = get_connectivity_monitor()
+        self.chatbot = EnhancedChatbot()
+        self.multilingual_bot = MultilingualBankingBot(chatbot=self.chatbot)
+        self.service_requests = get_service_request_store()
+        self.archive_catalog = get_archive_catalog()
+        self.lifecycle = get_session_lifecycle()
+        self.workers = WorkerPool()
+        self.workers.warm_up()
+        # Touch the index once so the first user query does not pay for page faults
+        self.knowledge_base_loaded = self.retrieval.load()
+        self.retrieval.search(["warm up"], 1)
+        # tiktoken may download its encoding on first use; do that here, not under a lock on the event loop
+        get_tokenizer()
+
+WARMUP_RETRY_SECONDS = float(os.getenv('WARMUP_RETRY_SECONDS', '5'))
+WARMUP_RETRY_MAX_SECONDS = 300.0
+
+async def warm_up_services(app: FastAPI):
+    """Build AppServices; on failure log it and retry later with exponential backoff"""
+    started = time.time()
+    try:
+        app.state.services = await asyncio.to_thread(AppServices)
+        app.state.ready = True
+        app.state.warmup_error = None
+        app.state.warmup_failures = 0
+        print(f"INFO: Services warmed up in {time.time() - started:.2f}s", file=sys.stderr)
+    except Exception as e:
+        failures = getattr(app.state, 'warmup_failures', 0) + 1
+        delay = min(WARMUP_RETRY_SECONDS * 2 ** (failures - 1), WARMUP_RETRY_MAX_SECONDS)
+        print(f"Warm-up error (attempt {failures}, retrying in {delay:.0f}s): {e}", file=sys.stderr)
+        app.state.warmup_error = str(e)
+        app.state.warmup_failures = failures
+        app.state.warmup_retry = asyncio.get_running_loop().call_later(delay, retry_warm_up, app)
+    finally:
+        app.state.warmup_time = time.time() - started
+
+def start_warm_up(app: FastAPI) -> asyncio.Task:
+    if getattr(app.state, 'warmup', None) is None:
+        app.state.ready = False
+        app.state.warmup = asyncio.create_task(warm_up_services(app))
+    return app.state.warmup
+
+def retry_warm_up(app: FastAPI):
+    app.state.warmup_retry = None
+    app.state.warmup = None
+    start_warm_up(app)
+
+async def get_services(request: Request) -> AppServices:
+    """Dependency: the warm AppServices, waiting for warm-up if it is still running; 503 if it failed"""
+    warmup = start_warm_up(request.app)
+    if not warmup.done():
+        await asyncio.shield(warmup)
+    if not getattr(request.app.state, 'ready', False):
+        raise HTTPException(status_code=503, detail="Service is not ready, please retry shortly", headers={"Retry-After": str(int(WARMUP_RETRY_SECONDS))})
+    return request.app.state.services
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve immediately; /api/v1/ready reports not-ready until warm-up finishes
+    start_warm_up(app)
+    yield
+    retry = getattr(app.state, 'warmup_retry', None)
+    if retry is not None:
+        retry.cancel()
+    await manager.pubsub.close()
+    stop_session_compactor()
+    services = getattr(app.state, 'services', None)
+    if services is not None:
+        services.connectivity.stop()
+        services.lifecycle.stop()
+        services.workers.shutdown()
+        await services.llm.aclose()
+
+app = FastAPI(title="SecureBank Assistant API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -82,6 +189,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep the series count bounded
+    route = getattr(request.scope.get('route'), 'path', 'unmatched')
+    body = response.body_iterator
+    
+    # Streamed answers are produced while the body is sent, so stop the clock after the last chunk
+    async def timed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            get_metrics().observe('http_request_seconds', time.perf_counter() - started, method=request.method, route=route, status=str(response.status_code))
+    
+    response.body_iterator = timed_body()
+    return response
+
 class ChatRequest(BaseModel):
     query: str
     userId: str = "anonymous"
@@ -123,38 +249,29 @@ class ChatResponse(BaseModel):
     processing_time: float = 0.0
     llm_mode: bool = False
     out_of_scope: bool = False
+    prompt_tokens: Optional[int] = None
 
 @app.post("/api/v1/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, services: AppServices = Depends(get_services)):
     try:
         # Use multilingual bot if language is not English
         if request.language and request.language != 'en':
-            sys.path.append(BASE_DIR)
-            from multilingual_banking_bot import MultilingualBankingBot
-            
-            bot = MultilingualBankingBot()
-            result = bot.process_query(request.query, request.language, request.sessionId)
+            result = await services.multilingual_bot.aprocess_query(request.query, request.language, request.sessionId)
             
             return ChatResponse(
                 response=clean_text(result['response']),
                 escalated=result['escalation'],
                 confidenceLevel='HIGH',
                 confidenceScore=0.9,
-                processing_time=1.0,
+                processing_time=result['processing_time'],
                 llm_mode=True,
-                out_of_scope=False
+                out_of_scope=False,
+                prompt_tokens=result.get('prompt_tokens')
             )
         
-        # Set environment variable for subprocess
-        env = os.environ.copy()
-        
         # Use enhanced chatbot for better PDF Q&A handling
         try:
-            sys.path.append(BASE_DIR)
-            from enhanced_chatbot import EnhancedChatbot
-            
-            chatbot = EnhancedChatbot()
-            result = chatbot.process_query(request.query, request.sessionId)
+            result = await services.chatbot.aprocess_query(request.query, request.sessionId)
             
             return ChatResponse(
                 response=clean_text(result['response']),
@@ -163,33 +280,26 @@ async def chat_endpoint(request: ChatRequest):
                 confidenceScore=0.9 if result.get('pdf_mode') else 0.7,
                 processing_time=result['processing_time'],
                 llm_mode=result['llm_used'],
-                out_of_scope=False
+                out_of_scope=False,
+                prompt_tokens=result.get('prompt_tokens')
             )
+        except LLMOverloaded:
+            raise
         except Exception as e:
             print(f"Enhanced Chatbot Error: {e}", file=sys.stderr)
-            # Fallback to production RAG system
-            cmd = [
-                "python", "rag_with_llm_production.py",
-                "--query", request.query,
-                "--user-id", request.userId,
-                "--session-id", request.sessionId
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=BASE_DIR,
-                env=env
-            )
-            
-            if result.returncode == 0:
-                response_data = json.loads(result.stdout)
-                if 'response' in response_data:
-                    response_data['response'] = clean_text(response_data['response'])
-                return ChatResponse(**response_data)
-            else:
-                print(f"RAG Error: {result.stderr}", file=sys.stderr)
+            get_metrics().error('chat', e)
+            # Fallback to an extractive knowledge base answer on the worker pool
+            try:
+                fallback = await services.workers.run(RagAnswerJob(query=request.query))
+                return ChatResponse(
+                    response=clean_text(fallback.response),
+                    escalated=fallback.escalated,
+                    confidenceLevel=fallback.confidence_level,
+                    confidenceScore=fallback.confidence_score
+                )
+            except Exception as e:
+                print(f"RAG Error: {e}", file=sys.stderr)
+                get_metrics().error('rag_fallback', e)
                 return ChatResponse(
                     response="I'm experiencing technical difficulties. Please try again or contact support.",
                     escalated=True,
@@ -197,75 +307,95 @@ async def chat_endpoint(request: ChatRequest):
                     confidenceScore=0.0
                 )
             
+    except LLMOverloaded as e:
+        raise overloaded_error(e)
     except Exception as e:
         print(f"API Error: {e}", file=sys.stderr)
+        get_metrics().error('chat', e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def overloaded_error(error: LLMOverloaded) -> HTTPException:
+    """429 for calls shed by the LLM scheduler (LLM_SHED_MODE=reject)"""
+    return HTTPException(status_code=429, detail=f"Assistant is busy ({error.reason}), please retry shortly", headers={"Retry-After": str(int(error.retry_after))})
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/v1/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, services: AppServices = Depends(get_services)):
+    """Server-sent events: 'token' events while the answer streams, then a 'done' event shaped like ChatResponse (or an 'error' event)"""
+    async def events():
+        try:
+            if request.language and request.language != 'en':
+                # The answer is translated as a whole, so it arrives as a single token
+                result = await services.multilingual_bot.aprocess_query(request.query, request.language, request.sessionId)
+                response = clean_text(result['response'])
+                yield sse_event('token', {'text': response})
+                yield sse_event('done', ChatResponse(response=response, escalated=result['escalation'], confidenceLevel='HIGH', confidenceScore=0.9, processing_time=result['processing_time'], llm_mode=True, prompt_tokens=result.get('prompt_tokens')).dict())
+                return
+            
+            async for kind, payload in services.chatbot.astream_query(request.query, request.sessionId):
+                if kind == 'token':
+                    yield sse_event('token', {'text': payload})
+                    continue
+                if kind == 'error':
+                    yield sse_event('error', payload)
+                    return
+                done = ChatResponse(
+                    response=clean_text(payload['response']),
+                    confidenceLevel='HIGH' if payload.get('pdf_mode') else 'MEDIUM',
+                    confidenceScore=0.9 if payload.get('pdf_mode') else 0.7,
+                    processing_time=payload['processing_time'],
+                    llm_mode=bool(payload.get('llm_used')),
+                    prompt_tokens=payload.get('prompt_tokens')
+                ).dict()
+                done['time_to_first_token'] = payload.get('time_to_first_token')
+                yield sse_event('done', done)
+        except LLMOverloaded as e:
+            yield sse_event('error', {'detail': f"Assistant is busy ({e.reason}), please retry shortly", 'status': 429})
+        except Exception as e:
+            print(f"Streaming API Error: {e}", file=sys.stderr)
+            get_metrics().error('chat_stream', e)
+            yield sse_event('error', {'detail': 'Internal server error'})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/api/v1/upload-pdf")
-async def upload_pdf(file: UploadFile = File(...), sessionId: str = Form(...)):
+async def upload_pdf(file: UploadFile = File(...), sessionId: str = Form(...), services: AppServices = Depends(get_services)):
     try:
         # Validate file type
         if not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
         
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
+        content = await file.read()
         try:
-            # Call PDF processor
-            cmd = [
-                "python", "pdf_processor_simple.py",
-                "--action", "upload",
-                "--session-id", sessionId,
-                "--filename", file.filename,
-                "--pdf-path", temp_file_path
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=BASE_DIR
-            )
-            
-            if result.returncode == 0:
-                response_data = json.loads(result.stdout)
-                return {
-                    "success": True,
-                    "filename": file.filename,
-                    "chunksCreated": response_data.get("chunks_created", 0),
-                    "extractedPreview": response_data.get("extracted_preview", ""),
-                    "fullText": response_data.get("full_text", "")
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": f"PDF processing failed: {result.stderr}"
-                }
-                
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            result = await services.workers.run(PdfUploadJob(session_id=sessionId, filename=file.filename, content=content))
+            return {
+                "success": True,
+                "filename": result.filename,
+                "chunksCreated": result.chunks_created,
+                "extractedPreview": result.extracted_preview,
+                "fullText": result.full_text
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"PDF processing failed: {e}"
+            }
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @app.post("/api/v1/clear-session")
 async def clear_session(request: ClearSessionRequest):
     try:
-        # Clear session files
-        sessions_dir = SESSIONS_DIR
-        session_file = os.path.join(sessions_dir, f"{request.sessionId}.json")
-        pdf_state_file = os.path.join(sessions_dir, f"{request.sessionId}_pdf_state.json")
-        
-        # Remove session files if they exist
-        for file_path in [session_file, pdf_state_file]:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+        # Clear chat history from the session store and the PDF state file
+        get_session_store().delete(request.sessionId)
+        pdf_state_file = os.path.join(SESSIONS_DIR, f"{request.sessionId}_pdf_state.json")
+        if os.path.exists(pdf_state_file):
+            os.remove(pdf_state_file)
         
         print(f"INFO: Session {request.sessionId} cleared - fresh start guaranteed", file=sys.stderr)
         return {"success": True, "message": "Session cleared - fresh start"}
@@ -274,60 +404,43 @@ async def clear_session(request: ClearSessionRequest):
         return {"success": False, "error": str(e)}
 
 @app.post("/api/v1/archive-session")
-async def archive_session(request: ArchiveSessionRequest):
+async def archive_session(request: ArchiveSessionRequest, services: AppServices = Depends(get_services)):
     """Archive current session for admin review before clearing"""
     try:
-        # Call RAG system to archive session
-        cmd = [
-            "python", "-c", 
-            f"""
-import sys
-import os
-BASE_DIR = r'{BASE_DIR}'
-sys.path.append(BASE_DIR)
-from rag_with_llm_ready import ChatMemory
-memory = ChatMemory('{request.sessionId}')
-memory.archive_session('{request.userId}')
-print('Session archived successfully')
-"""
-        ]
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=BASE_DIR
-        )
-        
-        if result.returncode == 0:
-            return {"success": True, "message": "Session archived for admin review"}
-        else:
-            return {"success": False, "error": f"Archive failed: {result.stderr}"}
-            
+        await services.workers.run(ArchiveSessionJob(session_id=request.sessionId, user_id=request.userId, reason=request.reason))
+        return {"success": True, "message": "Session archived for admin review"}
+    except JobTimeout as e:
+        return {"success": False, "error": f"Archive timed out: {e}"}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return {"success": False, "error": f"Archive failed: {e}"}
+
+def read_archives(session_ids: List[str]) -> List[dict]:
+    """Full archives in the given order, skipping (and uncataloguing) files that are gone"""
+    archived_sessions = []
+    for session_id in session_ids:
+        try:
+            with open(os.path.join(SESSIONS_DIR, f"{session_id}_archive.json"), 'r', encoding='utf-8') as f:
+                archived_sessions.append(json.load(f))
+        except FileNotFoundError:
+            get_archive_catalog().remove(session_id)
+        except Exception as e:
+            print(f"Error reading archive {session_id}: {e}", file=sys.stderr)
+    return archived_sessions
 
 @app.get("/api/v1/archived-sessions")
-async def get_archived_sessions():
-    """Get all archived sessions for admin dashboard"""
+async def get_archived_sessions(userId: Optional[str] = None, reason: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, full: bool = False):
+    """A filtered page of catalog entries without transcripts (first page: with the total); full=true for every archive in full"""
     try:
-        sessions_dir = SESSIONS_DIR
-        archived_sessions = []
-        
-        if os.path.exists(sessions_dir):
-            for filename in os.listdir(sessions_dir):
-                if filename.endswith('_archive.json'):
-                    file_path = os.path.join(sessions_dir, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            session_data = json.load(f)
-                            archived_sessions.append(session_data)
-                    except Exception as e:
-                        print(f"Error reading archive {filename}: {e}", file=sys.stderr)
-        
-        archived_sessions.sort(key=lambda x: x.get('archived_at', 0), reverse=True)
-        return archived_sessions
-        
+        catalog = get_archive_catalog()
+        if full:
+            return await asyncio.to_thread(lambda: read_archives(catalog.session_ids()))
+        page = await asyncio.to_thread(catalog.list, userId, reason, limit, cursor)
+        if cursor is None:
+            page['total'] = await asyncio.to_thread(catalog.count)
+        return page
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve archived sessions: {str(e)}")
 
@@ -362,6 +475,7 @@ async def delete_archived_session(session_id: str):
             raise HTTPException(status_code=404, detail="Archived session not found")
         
         os.remove(archive_file)
+        get_archive_catalog().remove(session_id)
         return {"success": True, "message": "Archived session deleted"}
         
     except HTTPException:
@@ -397,9 +511,7 @@ async def create_service_request(request: ServiceRequestCreate):
         }
         
         # Save to persistent storage
-        requests_file = SERVICE_REQUESTS_FILE
-        with open(requests_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(service_request) + "\n")
+        await asyncio.to_thread(get_service_request_store().create, service_request)
         
         return {"success": True, "serviceRequestId": service_request["id"]}
         
@@ -407,50 +519,37 @@ async def create_service_request(request: ServiceRequestCreate):
         raise HTTPException(status_code=500, detail=f"Failed to create service request: {str(e)}")
 
 @app.get("/api/service-requests")
-async def get_service_requests():
+async def get_service_requests(status: Optional[str] = None, priority: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, full: bool = False):
+    """A filtered page of lightweight ticket summaries (first page: with counts per status); full=true for every ticket in full"""
     try:
-        requests_file = SERVICE_REQUESTS_FILE
-        service_requests = []
-        
-        if os.path.exists(requests_file):
-            with open(requests_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        service_requests.append(json.loads(line.strip()))
-        
-        service_requests.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-        return service_requests
-        
+        store = get_service_request_store()
+        if full:
+            return await asyncio.to_thread(store.list_all)
+        page = await asyncio.to_thread(store.list_summaries, status, priority, limit, cursor)
+        if cursor is None:
+            page['counts'] = await asyncio.to_thread(store.count_by_status)
+        return page
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve service requests: {str(e)}")
 
+@app.get("/api/service-requests/{request_id}")
+async def get_service_request(request_id: str):
+    """One ticket with its chat history and PDF text"""
+    service_request = await asyncio.to_thread(get_service_request_store().get, request_id)
+    if service_request is None:
+        raise HTTPException(status_code=404, detail="Service request not found")
+    return service_request
+
 class StatusUpdate(BaseModel):
     status: str
 
 @app.patch("/api/service-requests/{request_id}")
 async def update_service_request(request_id: str, update: StatusUpdate):
     try:
-        requests_file = SERVICE_REQUESTS_FILE
-        service_requests = []
-        
-        if os.path.exists(requests_file):
-            with open(requests_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if line.strip():
-                        service_requests.append(json.loads(line.strip()))
-        
-        updated = False
-        for req in service_requests:
-            if req["id"] == request_id:
-                req["status"] = update.status
-                req["lastUpdated"] = int(time.time() * 1000)
-                updated = True
-                break
-        
-        if updated:
-            with open(requests_file, "w", encoding="utf-8") as f:
-                for req in service_requests:
-                    f.write(json.dumps(req) + "\n")
+        if await asyncio.to_thread(get_service_request_store().update_status, request_id, update.status):
             return {"success": True}
         else:
             raise HTTPException(status_code=404, detail="Service request not found")
@@ -467,13 +566,10 @@ class TranslateMessageRequest(BaseModel):
     serviceRequestId: str
 
 @app.post("/api/v1/translate-message")
-async def translate_message(request: TranslateMessageRequest):
+async def translate_message(request: TranslateMessageRequest, services: AppServices = Depends(get_services)):
     try:
-        sys.path.append(BASE_DIR)
-        from multilingual_banking_bot import MultilingualBankingBot
-        
-        bot = MultilingualBankingBot()
-        translated = bot.translate_text(request.message, request.targetLang, request.sourceLang)
+        bot = services.multilingual_bot
+        translated = await bot.atranslate_text(request.message, request.targetLang, request.sourceLang)
         
         return {
             "success": True,
@@ -491,14 +587,11 @@ async def translate_message(request: TranslateMessageRequest):
         }
 
 @app.post("/api/v1/generate-summary")
-async def generate_summary(request: SummaryRequest):
+async def generate_summary(request: SummaryRequest, services: AppServices = Depends(get_services)):
     """Generate comprehensive summary including chat translation and PDF content"""
     try:
-        # Import multilingual bot for translation
-        sys.path.append(BASE_DIR)
-        from multilingual_banking_bot import MultilingualBankingBot
-        
-        bot = MultilingualBankingBot()
+        # Shared multilingual bot for translation
+        bot = services.multilingual_bot
         
         # Analyze chat messages and translate to English if needed
         english_messages = []
@@ -514,7 +607,7 @@ async def generate_summary(request: SummaryRequest):
             detected_languages.add(detected_lang)
             
             if detected_lang != 'en':
-                english_content = bot.translate_text(content, target_lang='en', source_lang=detected_lang)
+                english_content = await bot.atranslate_text(content, target_lang='en', source_lang=detected_lang)
             else:
                 english_content = content
                 
@@ -583,7 +676,7 @@ Provide a structured summary with these sections:
 Keep each section concise but comprehensive."""
         
         # Call LLM for summary generation
-        llm_summary = bot.call_llm_api(summary_prompt, 'en')
+        llm_summary = await bot.acall_llm_api(summary_prompt, 'en')
         
         if llm_summary:
             final_summary = llm_summary
@@ -630,6 +723,80 @@ Recommended action: Human review required."""
             "error": str(e)
         }
 
+class KnowledgeBaseEntry(BaseModel):
+    question: str
+    answer: str
+
+@app.get("/api/v1/admin/knowledge-base")
+def get_knowledge_base_status():
+    """Knowledge base version and live-update state"""
+    sys.path.append(BASE_DIR)
+    from retrieval_service import get_retrieval_service
+    return get_retrieval_service().stats()
+
+@app.post("/api/v1/admin/knowledge-base/entries")
+def add_knowledge_base_entry(entry: KnowledgeBaseEntry):
+    """Add an FAQ to the live index without a restart"""
+    sys.path.append(BASE_DIR)
+    from retrieval_service import get_retrieval_service
+    try:
+        service = get_retrieval_service()
+        entry_id = service.add_entry(entry.question, entry.answer)
+        return {"success": True, "id": entry_id, "version": service.version}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to add entry: {str(e)}")
+
+@app.put("/api/v1/admin/knowledge-base/entries/{entry_id}")
+def update_knowledge_base_entry(entry_id: str, entry: KnowledgeBaseEntry):
+    """Replace an FAQ in the live index"""
+    sys.path.append(BASE_DIR)
+    from retrieval_service import get_retrieval_service
+    try:
+        service = get_retrieval_service()
+        service.update_entry(entry_id, entry.question, entry.answer)
+        return {"success": True, "id": entry_id, "version": service.version}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Knowledge base entry not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update entry: {str(e)}")
+
+@app.delete("/api/v1/admin/knowledge-base/entries/{entry_id}")
+def delete_knowledge_base_entry(entry_id: str):
+    """Remove an FAQ from the live index"""
+    sys.path.append(BASE_DIR)
+    from retrieval_service import get_retrieval_service
+    try:
+        service = get_retrieval_service()
+        service.delete_entry(entry_id)
+        return {"success": True, "version": service.version}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Knowledge base entry not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to delete entry: {str(e)}")
+
+@app.post("/api/v1/admin/knowledge-base/merge")
+def merge_knowledge_base():
+    """Fold pending edits into metadata.pkl and rebuild the index in the background"""
+    sys.path.append(BASE_DIR)
+    from retrieval_service import get_retrieval_service
+    started = get_retrieval_service().merge_in_background()
+    return {"success": True, "started": started}
+
+@app.post("/api/v1/admin/archive-catalog/rebuild")
+async def rebuild_archive_catalog():
+    """Rescan the archive files, e.g. after they were copied or removed by hand"""
+    count = await asyncio.to_thread(get_archive_catalog().rebuild)
+    return {"success": True, "archives": count}
+
+@app.post("/api/v1/admin/sessions/sweep")
+async def sweep_sessions(services: AppServices = Depends(get_services)):
+    """Run a session lifecycle sweep now (TTL expiry, message caps, disk budget)"""
+    return await asyncio.to_thread(services.lifecycle.sweep)
+
 @app.websocket("/ws/chat/{service_request_id}")
 async def websocket_endpoint(websocket: WebSocket, service_request_id: str, type: str = None):
     # Get type from query parameter
@@ -653,14 +820,79 @@ async def websocket_endpoint(websocket: WebSocket, service_request_id: str, type
             await manager.send_message(service_request_id, message, type)
             
     except WebSocketDisconnect:
-        manager.disconnect(service_request_id, type)
+        await manager.disconnect(service_request_id, type)
     except Exception as e:
         print(f"WebSocket error: {e}", file=sys.stderr)
-        manager.disconnect(service_request_id, type)
+        await manager.disconnect(service_request_id, type)
 
 @app.get("/api/v1/health")
 async def health_check():
-    return {"status": "healthy", "service": "SecureBank Assistant API"}
+    sys.path.append(BASE_DIR)
+    from enhanced_chatbot import query_cache_stats, answer_cache_stats, coalescing_stats
+    from llm_client import get_llm_client
+    from connectivity_monitor import get_connectivity_monitor
+    return {"status": "healthy", "service": "SecureBank Assistant API", "connectivity": get_connectivity_monitor().state(), "queryCache": query_cache_stats(), "answerCache": answer_cache_stats(), "coalescing": coalescing_stats(), "llmClient": get_llm_client().stats(), "workers": app.state.services.workers.stats() if getattr(app.state, 'ready', False) else None, "chatRelay": manager.pubsub.stats(), "sessionStore": get_session_store().stats(), "sessionLifecycle": app.state.services.lifecycle.stats() if getattr(app.state, 'ready', False) else None}
+
+def runtime_metrics():
+    """Scrape-time samples from caches, LLM client and scheduler, coalescing, workers and the chat relay"""
+    from enhanced_chatbot import query_cache_stats, answer_cache_stats, coalescing_stats
+    from llm_client import get_llm_client
+    for cache, stats in (('query', query_cache_stats()), ('answer', answer_cache_stats())):
+        yield 'cache_hits_total', 'counter', {'cache': cache}, stats['hits']
+        yield 'cache_misses_total', 'counter', {'cache': cache}, stats['misses']
+        yield 'cache_evictions_total', 'counter', {'cache': cache}, stats['evictions']
+        yield 'cache_hit_ratio', 'gauge', {'cache': cache}, stats['hit_rate']
+        yield 'cache_entries', 'gauge', {'cache': cache}, stats['entries']
+    
+    llm = get_llm_client().stats()
+    for site, stats in llm['call_sites'].items():
+        yield 'llm_calls_total', 'counter', {'site': site}, stats['calls']
+        yield 'llm_shed_total', 'counter', {'site': site}, stats['shed']
+    scheduler = llm['scheduler']
+    yield 'llm_scheduler_active', 'gauge', {}, scheduler['active']
+    yield 'llm_scheduler_queued', 'gauge', {}, scheduler['queued']
+    yield 'llm_scheduler_admitted_total', 'counter', {}, scheduler['admitted']
+    yield 'llm_scheduler_rejected_total', 'counter', {'reason': 'queue_full'}, scheduler['shed_queue_full']
+    yield 'llm_scheduler_rejected_total', 'counter', {'reason': 'deadline'}, scheduler['shed_deadline']
+    yield 'llm_scheduler_wait_seconds', 'histogram', {}, scheduler['wait_seconds']
+    yield 'llm_scheduler_queue_depth', 'histogram', {}, scheduler['queue_depth']
+    
+    coalescing = coalescing_stats()
+    yield 'llm_coalesced_total', 'counter', {}, coalescing['coalesced']
+    yield 'llm_coalescing_executions_total', 'counter', {}, coalescing['executions']
+    yield 'llm_coalescing_in_flight', 'gauge', {}, coalescing['in_flight']
+    
+    if getattr(app.state, 'ready', False):
+        workers = app.state.services.workers.stats()
+        for outcome in ('submitted', 'completed', 'failed', 'timed_out', 'cancelled'):
+            yield 'worker_jobs_total', 'counter', {'outcome': outcome}, workers[outcome]
+        yield 'worker_jobs_running', 'gauge', {}, workers['running']
+        last_sweep = app.state.services.lifecycle.last_result
+        if last_sweep:
+            yield 'sessions_disk_bytes', 'gauge', {}, last_sweep['disk_bytes']
+    
+    relay = manager.pubsub.stats()
+    yield 'chat_relay_channels', 'gauge', {'backend': relay['backend']}, relay['channels']
+    yield 'chat_relay_dropped_total', 'counter', {'backend': relay['backend']}, relay.get('dropped', 0)
+    
+    sessions = get_session_store().stats()
+    yield 'session_store_appends_total', 'counter', {'backend': sessions['backend']}, sessions['appends']
+    yield 'session_store_compactions_total', 'counter', {'backend': sessions['backend']}, sessions['compactions']
+
+get_metrics().add_collector(runtime_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus scrape endpoint: per-stage latency histograms, token and error counters, cache and queue stats"""
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/v1/ready")
+async def readiness_check():
+    """Readiness probe: 503 until bots, index and clients are warm"""
+    if not getattr(app.state, 'ready', False):
+        return JSONResponse(status_code=503, content={"ready": False, "error": getattr(app.state, 'warmup_error', None)})
+    services = app.state.services
+    return {"ready": True, "warmupTime": app.state.warmup_time, "knowledgeBaseLoaded": services.knowledge_base_loaded, "knowledgeBaseVersion": services.retrieval.version}
 
 if __name__ == "__main__":
     import uvicorn
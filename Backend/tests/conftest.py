@@ -0,0 +1,8 @@
+"""
+Shared pytest setup: Backend modules are imported flat, as start_fastapi does
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+import time
+
+from answer_cache import AnswerCache, answer_cache_key, normalize_query
+
+EVIDENCE = [
+    {'id': 'faq-1', 'question': 'How do I block my card?', 'answer': 'Open the app and choose Block card.'},
+    {'id': 'faq-2', 'question': 'How do I unblock my card?', 'answer': 'Call customer care to unblock it.'},
+]
+
+
+def test_normalize_keeps_negations_and_word_order():
+    assert normalize_query("How do I block my card?") != normalize_query("How do I not block my card?")
+    assert normalize_query("I can't log in") == normalize_query("I cannot log in")
+    assert normalize_query("transfer from savings to checking") != normalize_query("transfer from checking to savings")
+
+
+def test_normalize_ignores_case_punctuation_and_stop_words():
+    assert normalize_query("How do I block my CARD??") == normalize_query("how do i block my card")
+
+
+def test_key_depends_on_query_and_evidence_text():
+    key = answer_cache_key("How do I block my card?", EVIDENCE)
+    assert key == answer_cache_key("how do I block my card", EVIDENCE)
+    assert key != answer_cache_key("Why can't I block my card?", EVIDENCE)
+    # Same FAQ ids, edited answer: the cached answer must not be reused
+    edited = [dict(EVIDENCE[0], answer='Blocking is done at the branch only.'), EVIDENCE[1]]
+    assert key != answer_cache_key("How do I block my card?", edited)
+    assert key != answer_cache_key("How do I block my card?", list(reversed(EVIDENCE)))
+
+
+def test_cache_expires_and_evicts_by_bytes():
+    cache = AnswerCache(max_bytes=1024, ttl=0.05)
+    cache.put('a', 'x' * 200)
+    assert cache.get('a') == 'x' * 200
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+    cache = AnswerCache(max_bytes=1024, ttl=60)
+    for key in 'abcdefgh':
+        cache.put(key, 'y' * 300)
+    assert cache.get('a') is None
+    assert cache.get('h') == 'y' * 300
+    assert cache.stats()['bytes'] <= 1024
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+import enhanced_chatbot
+from answer_cache import AnswerCache, answer_cache_key
+from enhanced_chatbot import EnhancedChatbot
+from llm_client import LLMStreamError
+from session_store import SqliteSessionStore
+
+EVIDENCE = [{'id': 'faq-1', 'question': 'How do I block my debit card?', 'answer': 'Open the mobile app, choose Cards and tap Block card.', 'score': 0.9}]
+QUESTION = "How do I block my debit card?"
+
+
+class FakeConnectivity:
+    def internet_status(self):
+        return {'available': True, 'status': 'Connected'}
+
+
+class FakeRetrieval:
+    version = 'test-v1'
+
+
+class FakeLLM:
+    """Streams the given chunks, then fails with error if one is set"""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+
+    async def astream(self, prompt, site):
+        self.calls += 1
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+    async def acomplete(self, prompt, site):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return "".join(self.chunks)
+
+
+@pytest.fixture
+def chatbot(tmp_path, monkeypatch):
+    """EnhancedChatbot over fixed evidence, a fresh answer cache and a temp session store"""
+    monkeypatch.setattr(enhanced_chatbot, '_ANSWER_CACHE', AnswerCache(max_bytes=1 << 20, ttl=60))
+    bot = EnhancedChatbot.__new__(EnhancedChatbot)
+    bot.session_data = {}
+    bot.retrieval = FakeRetrieval()
+    bot.connectivity = FakeConnectivity()
+    bot.sessions = SqliteSessionStore(str(tmp_path / 'sessions.db'))
+    bot.check_pdf_mode = lambda session_id: (False, {})
+    bot.get_top_10_from_rag = lambda query: EVIDENCE
+    return bot
+
+
+async def collect(stream):
+    return [event async for event in stream]
+
+
+def test_interrupted_stream_ends_with_error_and_is_not_kept(chatbot):
+    chatbot.llm = FakeLLM(["To block your card, ", "open the app and "], LLMStreamError('ReadError', 2))
+
+    events = asyncio.run(collect(chatbot.astream_query(QUESTION, 's1')))
+
+    kinds = [kind for kind, _ in events]
+    assert kinds[-1] == 'error' and 'done' not in kinds
+    assert events[-1][1]['status'] == 502
+    assert "".join(data for kind, data in events if kind == 'token') == "To block your card, open the app and "
+    assert chatbot.sessions.load('s1') == []
+    assert enhanced_chatbot._ANSWER_CACHE.get(answer_cache_key(QUESTION, EVIDENCE)) is None
+
+
+def test_complete_stream_is_cached_and_saved(chatbot):
+    answer = "To block your card, open the app, choose Cards and tap Block card."
+    chatbot.llm = FakeLLM([answer[:20], answer[20:]])
+
+    events = asyncio.run(collect(chatbot.astream_query(QUESTION, 's1')))
+
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['response'] == answer and events[-1][1]['llm_used']
+    assert [m['content'] for m in chatbot.sessions.load('s1')] == [QUESTION, answer]
+    assert enhanced_chatbot._ANSWER_CACHE.get(answer_cache_key(QUESTION, EVIDENCE)) == answer
+
+
+def test_identical_concurrent_questions_share_one_llm_call(chatbot):
+    chatbot.llm = FakeLLM(["Open the app, choose Cards and tap Block card."])
+
+    async def ask_twice():
+        return await asyncio.gather(chatbot.aprocess_query(QUESTION, 's1'), chatbot.aprocess_query(QUESTION, 's2'))
+
+    first, second = asyncio.run(ask_twice())
+    assert chatbot.llm.calls == 1
+    assert sorted([first['coalesced'], second['coalesced']]) == [False, True]
+    assert first['response'] == second['response']
+    assert first['llm_used'] and second['llm_used']
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import LLMOverloaded, LLMScheduler
+
+
+def test_free_slots_are_taken_without_waiting():
+    scheduler = LLMScheduler(max_concurrency=2, max_queue=0)
+    scheduler.acquire(0.1)
+    scheduler.acquire(0.1)
+    with pytest.raises(LLMOverloaded):
+        scheduler.acquire(0.1)
+    assert scheduler.stats()['shed_queue_full'] == 1
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=4)
+    scheduler.acquire(1)
+    order = []
+
+    def waiter(name):
+        scheduler.acquire(2)
+        order.append(name)
+        scheduler.release()
+
+    threads = []
+    for name in ('first', 'second'):
+        threads.append(threading.Thread(target=waiter, args=(name,)))
+        threads[-1].start()
+        time.sleep(0.05)
+    scheduler.release()
+    for thread in threads:
+        thread.join(2)
+    assert order == ['first', 'second']
+    assert scheduler.stats()['active'] == 0
+
+
+def test_waiters_past_their_deadline_are_shed():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=4)
+    scheduler.acquire(1)
+    started = time.time()
+    with pytest.raises(LLMOverloaded):
+        scheduler.acquire(0.05)
+    assert time.time() - started < 1
+    assert scheduler.stats()['shed_deadline'] == 1
+    # The slot is not handed to the abandoned waiter
+    scheduler.release()
+    scheduler.acquire(0.05)
+
+
+def test_async_callers_share_slots_and_cancellation_frees_them():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=4)
+
+    async def run():
+        await scheduler.aacquire(1)
+        waiting = asyncio.ensure_future(scheduler.aacquire(1))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        handed = asyncio.ensure_future(scheduler.aacquire(1))
+        await asyncio.sleep(0.01)
+        scheduler.release()
+        await asyncio.wait_for(handed, 1)
+        scheduler.release()
+
+    asyncio.run(run())
+    stats = scheduler.stats()
+    assert stats['active'] == 0 and stats['queued'] == 0
@@ -0,0 +1,38 @@
+import pytest
+
+from prompt_builder import build_prompt, count_tokens, truncate_answer, _terms
+
+DOCS = [
+    {'id': f'faq-{i}', 'question': f'How do I block card type {i}?', 'answer': 'Open the app and tap Block card. ' * 40, 'score': 1 - i / 20}
+    for i in range(10)
+]
+
+
+@pytest.mark.parametrize('question', ["How do I block my card?", "block my card " * 600])
+@pytest.mark.parametrize('budget', [400, 1800])
+def test_prompt_stays_within_budget(question, budget):
+    prompt = build_prompt(question, DOCS, budget=budget)
+    assert prompt.tokens <= budget
+    assert prompt.evidence_used, "at least one FAQ fits when the question is cut"
+    assert prompt.question_truncated == (count_tokens(question) > 100)
+    assert prompt.tokens == count_tokens(prompt.text)
+
+
+def test_near_duplicate_faqs_are_dropped():
+    docs = [
+        {'id': 'a', 'question': 'How do I block my debit card?', 'answer': 'Tap Block card in the app.', 'score': 0.9},
+        {'id': 'b', 'question': 'How do I block my debit card?', 'answer': 'Tap Block card in the app.', 'score': 0.8},
+        {'id': 'c', 'question': 'What is the ATM limit?', 'answer': 'The daily ATM limit is 50,000.', 'score': 0.7},
+    ]
+    prompt = build_prompt("block debit card", docs)
+    assert prompt.evidence_used == ['a', 'c']
+    assert prompt.dropped_duplicates == 1
+
+
+def test_truncated_answers_keep_the_most_relevant_sentences_in_order():
+    answer = "Cards can be used abroad. Fees apply to foreign transactions. To block a card, open the app. Blocking is instant."
+    text, truncated = truncate_answer(answer, _terms("how to block a card"), 20)
+    assert truncated
+    assert "To block a card, open the app." in text
+    assert count_tokens(text) <= 20
+    assert truncate_answer("Short answer.", _terms("x"), 20) == ("Short answer.", False)
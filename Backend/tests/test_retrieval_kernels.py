@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from bm25_retriever import BM25Retriever, tokenize
+from text_normalizer import IncrementalNormalizer, normalize_entities
+
+WORDS = "account balance card debit credit loan interest branch atm transfer payment statement cheque deposit savings limit pin otp mobile netbanking".split()
+
+
+def exhaustive_scores(retriever: BM25Retriever, query: str) -> np.ndarray:
+    """BM25 of every document, without MaxScore pruning"""
+    scores = np.zeros(retriever.num_documents)
+    for term in tokenize(query):
+        if term in retriever.vocabulary:
+            docs, impacts = retriever._postings(retriever.vocabulary[term])
+            scores[docs] += impacts
+    return scores
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_bm25_maxscore_matches_exhaustive_top_k(seed):
+    rng = random.Random(seed)
+    texts = [" ".join(rng.choices(WORDS, k=rng.randint(3, 12))) for _ in range(300)]
+    retriever = BM25Retriever.from_texts(texts)
+    for _ in range(20):
+        query = " ".join(rng.choices(WORDS, k=rng.randint(1, 6)))
+        scores, indices = retriever.search([query], 10)
+        expected = exhaustive_scores(retriever, query)
+        found = indices[0][indices[0] >= 0]
+        # Ties may be broken either way; the k-th best score must match exactly
+        best = np.sort(expected[expected > 0])[::-1][:10]
+        assert np.allclose(np.sort(expected[found])[::-1], best, rtol=1e-5)
+        assert np.all(np.diff(scores[0][:len(found)]) <= 1e-9)
+
+
+def test_bm25_unknown_terms_give_padded_empty_rows():
+    retriever = BM25Retriever.from_texts(["block my debit card", "reset net banking password"])
+    scores, indices = retriever.search(["mortgage", "debit card"], 3)
+    assert indices[0].tolist() == [-1, -1, -1]
+    assert indices[1][0] == 0 and scores[1][0] == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Tom &amp; Jerry", "Tom & Jerry"),
+    ("&amp;amp;quot;quoted&amp;amp;quot;", '"quoted"'),
+    ("&amp;#38;lt;b&amp;#38;gt;", "<b>"),
+    ("no entities here", "no entities here"),
+    ("AT&T &copy; 2024", "AT&T © 2024"),
+])
+def test_normalize_entities(text, expected):
+    assert normalize_entities(text) == expected
+
+
+@pytest.mark.parametrize('text', ["Fees &amp;amp; charges &lt;apply&gt; to all cards", "AT&T &#38;amp; R&D &quot;x&quot;", "plain text"])
+def test_incremental_normalizer_matches_whole_text_at_any_split(text):
+    expected = normalize_entities(text)
+    for size in range(1, len(text) + 1):
+        normalizer = IncrementalNormalizer()
+        pieces = [normalizer.feed(text[i:i + size]) for i in range(0, len(text), size)]
+        assert "".join(pieces) + normalizer.flush() == expected
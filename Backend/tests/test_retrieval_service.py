@@ -0,0 +1,160 @@
+import os
+import pickle
+
+import pytest
+
+import retrieval_index
+import retrieval_service
+from retrieval_service import RetrievalService
+
+FAQS = [
+    {'question': 'How do I block my debit card?', 'answer': 'Open the mobile app, choose Cards and tap Block card.'},
+    {'question': 'How can I reset my net banking password?', 'answer': 'Use Forgot password on the login page and follow the OTP steps.'},
+    {'question': 'What is the daily ATM withdrawal limit?', 'answer': 'The daily ATM withdrawal limit is 50,000 for classic debit cards.'},
+    {'question': 'How do I update my registered mobile number?', 'answer': 'Visit any branch with your ID proof to update your mobile number.'},
+]
+
+
+@pytest.fixture
+def kb(tmp_path, monkeypatch):
+    """metadata.pkl, index artifacts and journal in a temp dir; returns a factory of services sharing them"""
+    monkeypatch.setattr(retrieval_index, 'INDEX_DIR', str(tmp_path / 'index_cache'))
+    monkeypatch.setattr(retrieval_service, 'KB_SYNC_INTERVAL', 0)
+    monkeypatch.setattr(retrieval_service, 'MERGE_THRESHOLD', 10 ** 6)
+    metadata_path = tmp_path / 'metadata.pkl'
+    with open(metadata_path, 'wb') as f:
+        pickle.dump(FAQS, f)
+
+    def make() -> RetrievalService:
+        service = RetrievalService(str(metadata_path), 'tfidf', str(tmp_path / 'kb_journal.jsonl'))
+        assert service.load()
+        return service
+    return make
+
+
+def top_question(service: RetrievalService, query: str) -> str:
+    snapshot = service.snapshot()
+    _, indices = snapshot.search([query], 1)
+    return snapshot.metadata[indices[0][0]]['question']
+
+
+def questions(service: RetrievalService) -> set:
+    snapshot = service.snapshot()
+    return {e['question'] for i, e in enumerate(snapshot.metadata) if i >= snapshot.base_size or i not in snapshot.tombstones}
+
+
+def test_edits_publish_new_snapshots_and_leave_old_ones_alone(kb):
+    service = kb()
+    before = service.snapshot()
+    card_id = before.index.metadata[0]['id']
+
+    new_id = service.add_entry('How do I open a fixed deposit?', 'Fixed deposits can be opened in the app under Deposits.')
+    service.update_entry(card_id, 'How do I block or freeze my debit card?', 'Tap Freeze card in the app, or call the helpline to block it.')
+    service.delete_entry(before.index.metadata[2]['id'])
+
+    after = service.snapshot()
+    assert after.version != before.version
+    assert top_question(service, 'open fixed deposit') == 'How do I open a fixed deposit?'
+    assert top_question(service, 'freeze debit card') == 'How do I block or freeze my debit card?'
+    assert 'What is the daily ATM withdrawal limit?' not in questions(service)
+    # A request holding the old snapshot still sees the knowledge base it started with
+    assert before.delta_entries == [] and not before.tombstones
+    assert new_id in {e['id'] for e in after.delta_entries}
+
+
+def test_edit_validation_and_unknown_ids(kb):
+    service = kb()
+    with pytest.raises(ValueError):
+        service.add_entry('Short?', 'Too short.')
+    with pytest.raises(KeyError):
+        service.delete_entry('faq-missing')
+
+
+def test_journal_is_replayed_and_shared_between_workers(kb):
+    first, second = kb(), kb()
+    first.add_entry('How do I open a fixed deposit?', 'Fixed deposits can be opened in the app under Deposits.')
+    second.add_entry('How do I apply for a credit card?', 'Apply online under Cards, Apply now, with your PAN and income proof.')
+
+    expected = {'How do I open a fixed deposit?', 'How do I apply for a credit card?'}
+    assert expected <= questions(first)
+    assert expected <= questions(second)
+    assert expected <= questions(kb())  # a restart replays the journal
+
+
+def test_merge_keeps_every_workers_edits(kb):
+    first, second = kb(), kb()
+    first.add_entry('How do I open a fixed deposit?', 'Fixed deposits can be opened in the app under Deposits.')
+    second.add_entry('How do I apply for a credit card?', 'Apply online under Cards, Apply now, with your PAN and income proof.')
+    second.delete_entry(first.snapshot().index.metadata[3]['id'])
+
+    first._merge()
+
+    merged = first.snapshot()
+    assert merged.delta_entries == [] and not merged.tombstones
+    expected = {'How do I open a fixed deposit?', 'How do I apply for a credit card?'}
+    for service in (first, second, kb()):
+        assert expected <= questions(service)
+        assert 'How do I update my registered mobile number?' not in questions(service)
+        assert service.snapshot().index.version == merged.index.version
+
+
+def test_edits_made_during_a_merge_survive_it(kb, monkeypatch):
+    service = kb()
+    service.add_entry('How do I open a fixed deposit?', 'Fixed deposits can be opened in the app under Deposits.')
+    original_build = retrieval_service.load_or_build_index
+    other = kb()
+
+    def build_with_concurrent_edit(path):
+        index = original_build(path)
+        if path.endswith('.tmp'):
+            # Another worker takes an edit while the merged index is being built
+            other.add_entry('How do I apply for a credit card?', 'Apply online under Cards, Apply now, with your PAN and income proof.')
+        return index
+
+    monkeypatch.setattr(retrieval_service, 'load_or_build_index', build_with_concurrent_edit)
+    service._merge()
+
+    for instance in (service, kb()):
+        assert {'How do I open a fixed deposit?', 'How do I apply for a credit card?'} <= questions(instance)
+
+
+def artifact_versions() -> set:
+    return {name.split('-', 1)[1] for name in os.listdir(retrieval_index.INDEX_DIR) if not name.startswith('.')}
+
+
+def test_merges_prune_only_their_own_old_versions(kb, tmp_path):
+    service = kb()
+    other_path = str(tmp_path / 'other.pkl')
+    with open(other_path, 'wb') as f:
+        pickle.dump(FAQS[:2], f)
+    other_version = retrieval_index.build_index(other_path)
+    versions = [service.snapshot().index.version]
+    for i in range(3):
+        service.add_entry(f'How do I open deposit number {i}?', 'Fixed deposits can be opened in the app under Deposits.')
+        service._merge()
+        versions.append(service.snapshot().index.version)
+    # The serving version and the previous one survive; never-served builds of other paths too
+    assert artifact_versions() == {versions[-1], versions[-2], other_version}
+
+
+def test_a_merge_that_lost_the_race_keeps_the_winners_artifacts(kb, monkeypatch):
+    loser, winner = kb(), kb()
+    loser.add_entry('How do I open a fixed deposit?', 'Fixed deposits can be opened in the app under Deposits.')
+    original_build = retrieval_service.load_or_build_index
+
+    def build_while_another_worker_merges(path):
+        index = original_build(path)
+        if path.endswith('.tmp') and not winner_done:
+            winner_done.append(True)
+            winner.add_entry('How do I apply for a credit card?', 'Apply online under Cards, Apply now, with your PAN and income proof.')
+            winner._merge()
+        return index
+
+    winner_done = []
+    monkeypatch.setattr(retrieval_service, 'load_or_build_index', build_while_another_worker_merges)
+    loser._merge()
+
+    live = winner.snapshot().index.version
+    assert live in artifact_versions()
+    assert kb().snapshot().index.version == live
+    assert {'How do I open a fixed deposit?', 'How do I apply for a credit card?'} <= questions(kb())
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'answer'
+
+    async def run():
+        return await asyncio.gather(*(flight.do('k', work) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == [1]
+    assert [r for r, _ in results] == ['answer'] * 5
+    assert sum(joined for _, joined in results) == 4
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_different_keys_and_later_calls_run_again():
+    flight = SingleFlight()
+
+    async def run():
+        first = await asyncio.gather(flight.do('a', lambda: asyncio.sleep(0.01, 'a')), flight.do('b', lambda: asyncio.sleep(0.01, 'b')))
+        later = await flight.do('a', lambda: asyncio.sleep(0, 'again'))
+        return first, later
+
+    first, later = asyncio.run(run())
+    assert first == [('a', False), ('b', False)]
+    assert later == ('again', False)
+
+
+def test_errors_reach_every_waiter_and_cancelled_waiters_do_not_cancel_the_work():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.02)
+        raise RuntimeError('upstream down')
+
+    async def run_failing():
+        return await asyncio.gather(flight.do('k', failing), flight.do('k', failing), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run_failing()))
+
+    async def run_cancelled():
+        first = asyncio.ensure_future(flight.do('k', lambda: asyncio.sleep(0.05, 'done')))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do('k', lambda: asyncio.sleep(0.05, 'other')))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run_cancelled()) == ('done', True)
+
+
+def test_tasks_of_another_loop_are_not_joined():
+    flight = SingleFlight()
+
+    async def start_and_leave_running():
+        asyncio.ensure_future(flight.do('k', lambda: asyncio.sleep(10, 'stale')))
+        await asyncio.sleep(0)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(start_and_leave_running())
+        assert asyncio.run(flight.do('k', lambda: asyncio.sleep(0, 'fresh'))) == ('fresh', False)
+    finally:
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        loop.run_until_complete(asyncio.sleep(0))
+        loop.close()
+
+
+@pytest.mark.parametrize('joined_calls', [0, 3])
+def test_stats_report_coalesced_rate(joined_calls):
+    flight = SingleFlight()
+
+    async def run():
+        await asyncio.gather(*(flight.do('k', lambda: asyncio.sleep(0.01, 1)) for _ in range(joined_calls + 1)))
+
+    asyncio.run(run())
+    stats = flight.stats()
+    assert stats['executions'] == 1 and stats['coalesced'] == joined_calls
+    assert stats['coalesced_rate'] == joined_calls / (joined_calls + 1)
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+import session_store
+from archive_catalog import ArchiveCatalog
+from service_request_store import ServiceRequestStore
+from session_store import LogSessionStore, SqliteSessionStore
+
+MESSAGES = [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'message {i}'} for i in range(5)]
+
+
+@pytest.fixture(params=['log', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'log':
+        if session_store.fcntl is None:
+            pytest.skip("the log backend needs fcntl")
+        return LogSessionStore(str(tmp_path))
+    return SqliteSessionStore(str(tmp_path / 'sessions.db'))
+
+
+@pytest.mark.parametrize('last_n, expected', [(None, 5), (0, 0), (2, 2), (10, 5)])
+def test_session_load_last_n(store, last_n, expected):
+    store.append('s1', MESSAGES[:3])
+    store.append('s1', MESSAGES[3:])
+    loaded = store.load('s1', last_n)
+    assert loaded == MESSAGES[len(MESSAGES) - expected:]
+
+
+def test_session_replace_trim_and_delete(store):
+    store.append('s1', MESSAGES)
+    store.replace('s1', MESSAGES[:2])
+    assert store.load('s1') == MESSAGES[:2]
+    store.append('s1', MESSAGES[2:])
+    assert store.trim('s1', 3)[0] == 2
+    assert store.load('s1') == MESSAGES[2:]
+    assert store.delete('s1')
+    assert store.load('s1') == []
+
+
+def test_log_store_skips_a_torn_last_line(tmp_path):
+    if session_store.fcntl is None:
+        pytest.skip("the log backend needs fcntl")
+    store = LogSessionStore(str(tmp_path))
+    store.append('s1', MESSAGES[:2])
+    with open(store.log_path('s1'), 'a', encoding='utf-8') as f:
+        f.write('{"role": "user", "cont')
+    assert store.load('s1') == MESSAGES[:2]
+
+
+def test_sqlite_store_switches_existing_database_to_incremental_vacuum(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    SqliteSessionStore(path).close()
+    store = SqliteSessionStore(path)
+    assert store._connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    store.append('s1', [{'content': 'x' * 1000}] * 500)
+    store.delete('s1')
+    store.compact()
+    assert store._connection().execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def make_ticket(i: int, status: str) -> dict:
+    return {'id': f'SR{i:03d}', 'customerId': f'c{i}', 'customerName': f'Customer {i}', 'status': status,
+            'priority': 'high' if i % 3 == 0 else 'low', 'timestamp': 1000 + i, 'chatHistory': [{'content': 'hi'}] * i}
+
+
+def test_service_request_pages_cover_every_ticket_once(tmp_path):
+    store = ServiceRequestStore(str(tmp_path / 'service_requests.db'), legacy_path=None)
+    for i in range(25):
+        store.create(make_ticket(i, 'new' if i % 2 else 'resolved'))
+
+    seen, cursor = [], None
+    while True:
+        page = store.list_summaries(limit=7, cursor=cursor)
+        seen += [item['id'] for item in page['items']]
+        cursor = page['nextCursor']
+        if cursor is None:
+            break
+    assert seen == [f'SR{i:03d}' for i in reversed(range(25))]
+    assert 'chatHistory' not in store.list_summaries(limit=1)['items'][0]
+    assert store.list_summaries(limit=1)['items'][0]['messageCount'] == 24
+
+    new_high = store.list_summaries(status='new', priority='high', limit=50)['items']
+    assert [item['id'] for item in new_high] == [f'SR{i:03d}' for i in reversed(range(25)) if i % 2 and i % 3 == 0]
+    assert store.count_by_status() == {'new': 12, 'resolved': 13}
+    with pytest.raises(ValueError):
+        store.list_summaries(cursor='not-a-cursor')
+
+
+def test_archive_catalog_pages_without_reading_archives(tmp_path):
+    catalog = ArchiveCatalog(str(tmp_path / 'archive_catalog.db'), str(tmp_path))
+    for i in range(12):
+        catalog.upsert({'session_id': f'sess{i:02d}', 'user_id': 'u1' if i < 8 else 'u2', 'archived_at': 2000 + i,
+                        'message_count': i, 'reason': 'logout', 'start_time': 1000, 'end_time': 1500,
+                        'messages': [{'content': 'not stored in the catalog'}]})
+
+    first = catalog.list(user_id='u1', limit=5)
+    second = catalog.list(user_id='u1', limit=5, cursor=first['nextCursor'])
+    ids = [item['session_id'] for item in first['items'] + second['items']]
+    assert ids == [f'sess{i:02d}' for i in reversed(range(8))]
+    assert second['nextCursor'] is None
+    assert 'messages' not in json.dumps(first)
+    assert catalog.count() == 12
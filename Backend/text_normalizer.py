@@ -0,0 +1,46 @@
+"""
+HTML entity normalization shared by the whole backend
+Text without '&' is returned untouched. Otherwise one compiled pass collapses
+nested ampersand encodings (&amp;amp;quot;, &amp;#38;lt; ...) down to a single '&'
+and html.unescape resolves the remaining entity, so any nesting depth is decoded
+in two linear passes instead of repeated unescape loops.
+IncrementalNormalizer applies the same decoding to streamed text chunk by chunk.
+"""
+
+import html
+import re
+
+# A run of encoded ampersands directly in front of something entity-like
+_AMP_CHAIN = re.compile(r'&(?:amp;|#0*38;|#x0*26;)+(?=#?[0-9a-z])', re.IGNORECASE)
+# Trailing text that a later chunk could still turn into (part of) an entity
+_PENDING_ENTITY = re.compile(r'&(?:amp;|#0*38;|#x0*26;)*[#0-9a-z]*;?$', re.IGNORECASE)
+MAX_PENDING = 64  # longer tails cannot be an entity and are released
+
+
+def normalize_entities(text: str) -> str:
+    """Decode all (possibly nested) HTML entities in text"""
+    if not text or '&' not in text:
+        return text
+    return html.unescape(_AMP_CHAIN.sub('&', text))
+
+
+class IncrementalNormalizer:
+    """normalize_entities for streamed text: holds back a possibly incomplete trailing entity"""
+
+    def __init__(self):
+        self._pending = ''
+
+    def feed(self, chunk: str) -> str:
+        """Normalized text that is safe to emit now"""
+        text = self._pending + chunk
+        match = _PENDING_ENTITY.search(text) if '&' in text else None
+        if match is None or len(text) - match.start() > MAX_PENDING:
+            self._pending = ''
+            return normalize_entities(text)
+        self._pending = text[match.start():]
+        return normalize_entities(text[:match.start()])
+
+    def flush(self) -> str:
+        """Whatever is still held back, normalized"""
+        text, self._pending = self._pending, ''
+        return normalize_entities(text)
@@ -0,0 +1,241 @@
+"""
+In-process worker pool
+Flow: Typed job -> Persistent thread pool -> Typed result (or JobTimeout / JobCancelled)
+
+Replaces the subprocess fallbacks of the API (RAG answer, PDF upload, session
+archiving). Workers live for the whole process and share the already-loaded
+retrieval service, so a job costs no interpreter start-up or re-imports.
+Every job runs with a timeout; on timeout or cancellation its cancel token is
+set and the job stops at its next checkpoint.
+"""
+
+import asyncio
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from retrieval_service import get_retrieval_service
+from session_store import get_session_store
+from archive_catalog import get_archive_catalog
+from text_normalizer import normalize_entities
+
+# Configuration
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSIONS_DIR = os.path.join(BASE_DIR, "sessions")
+WORKER_POOL_SIZE = int(os.getenv('WORKER_POOL_SIZE', '4'))
+PDF_CHUNK_SIZE = 1000  # characters per chunk reported for an uploaded PDF
+PDF_PREVIEW_SIZE = 500
+
+
+class JobTimeout(Exception):
+    """The job did not finish within its timeout"""
+
+
+class JobCancelled(Exception):
+    """The job saw its cancel token at a checkpoint"""
+
+
+# Jobs and results
+
+@dataclass
+class RagAnswerJob:
+    """Extractive knowledge base answer without the LLM (chat fallback)"""
+    query: str
+    timeout: float = 10.0
+
+
+@dataclass
+class RagAnswerResult:
+    response: str
+    confidence_level: str
+    confidence_score: float
+    escalated: bool
+
+
+@dataclass
+class PdfUploadJob:
+    session_id: str
+    filename: str
+    content: bytes = field(repr=False)
+    timeout: float = 60.0
+
+
+@dataclass
+class PdfUploadResult:
+    filename: str
+    chunks_created: int
+    extracted_preview: str
+    full_text: str
+
+
+@dataclass
+class ArchiveSessionJob:
+    session_id: str
+    user_id: str
+    reason: str = "logout"
+    timeout: float = 10.0
+
+
+@dataclass
+class ArchiveSessionResult:
+    session_id: str
+    archive_path: str
+    message_count: int
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+# Job handlers (run on a worker thread)
+
+def run_rag_answer(job: RagAnswerJob, token: CancelToken) -> RagAnswerResult:
+    snapshot = get_retrieval_service().snapshot()
+    token.check()
+    if snapshot is None or not job.query.strip():
+        return RagAnswerResult("I'm experiencing technical difficulties. Please try again or contact support.", "NONE", 0.0, True)
+    scores, indices = snapshot.search([job.query.lower()], 1)
+    if indices[0][0] < 0 or scores[0][0] < 0.15:
+        return RagAnswerResult("I'm sorry, I couldn't find relevant information for your query.", "LOW", float(scores[0][0]), False)
+    answer = normalize_entities(snapshot.metadata[indices[0][0]]['answer'])
+    return RagAnswerResult(f"Based on our knowledge base: {answer}", "MEDIUM", float(scores[0][0]), False)
+
+
+def extract_pdf_text(content: bytes, token: CancelToken) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        try:
+            from PyPDF2 import PdfReader
+        except ImportError:
+            raise RuntimeError("PDF support requires pypdf (pip install pypdf)")
+    pages = []
+    for page in PdfReader(io.BytesIO(content)).pages:
+        token.check()
+        pages.append(page.extract_text() or "")
+    return "\n".join(pages).strip()
+
+
+def run_pdf_upload(job: PdfUploadJob, token: CancelToken) -> PdfUploadResult:
+    text = extract_pdf_text(job.content, token)
+    token.check()
+    state_file = os.path.join(SESSIONS_DIR, f"{job.session_id}_pdf_state.json")
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump({'filename': job.filename, 'extracted_text': text, 'uploaded_at': time.time()}, f, ensure_ascii=False, indent=2)
+    chunks = (len(text) + PDF_CHUNK_SIZE - 1) // PDF_CHUNK_SIZE
+    preview = text[:PDF_PREVIEW_SIZE] + ("..." if len(text) > PDF_PREVIEW_SIZE else "")
+    return PdfUploadResult(job.filename, chunks, preview, text)
+
+
+def run_archive_session(job: ArchiveSessionJob, token: CancelToken) -> ArchiveSessionResult:
+    messages: List[Dict] = get_session_store().load(job.session_id)
+    if not messages:
+        raise FileNotFoundError(f"No chat history for session {job.session_id}")
+    token.check()
+
+    messages = [dict(m, message_id=m.get('message_id', f"{job.session_id}-{i}")) for i, m in enumerate(messages)]
+    timestamps = [m['timestamp'] for m in messages if 'timestamp' in m]
+    now = time.time()
+    archive = {
+        'session_id': job.session_id,
+        'user_id': job.user_id,
+        'messages': messages,
+        'start_time': min(timestamps) if timestamps else now,
+        'end_time': max(timestamps) if timestamps else now,
+        'archived_at': now,
+        'message_count': len(messages),
+        'reason': job.reason
+    }
+    archive_path = os.path.join(SESSIONS_DIR, f"{job.session_id}_archive.json")
+    staging = f"{archive_path}.tmp"
+    with open(staging, 'w', encoding='utf-8') as f:
+        json.dump(archive, f, ensure_ascii=False, indent=2)
+    os.replace(staging, archive_path)
+    get_archive_catalog().upsert(archive)
+    return ArchiveSessionResult(job.session_id, archive_path, len(messages))
+
+
+JOB_HANDLERS: Dict[type, Callable[[Any, CancelToken], Any]] = {
+    RagAnswerJob: run_rag_answer,
+    PdfUploadJob: run_pdf_upload,
+    ArchiveSessionJob: run_archive_session
+}
+
+
+class WorkerPool:
+    """Persistent thread pool running typed jobs with timeouts and cooperative cancellation"""
+
+    def __init__(self, max_workers: int = WORKER_POOL_SIZE):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._lock = threading.Lock()
+        self._counts = {'submitted': 0, 'completed': 0, 'failed': 0, 'timed_out': 0, 'cancelled': 0}
+        self._running = 0
+
+    def warm_up(self):
+        """Start every worker thread now rather than on the first jobs"""
+        for future in [self._executor.submit(time.sleep, 0) for _ in range(self.max_workers)]:
+            future.result()
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counts[key] += 1
+
+    def _execute(self, handler, job, token: CancelToken):
+        with self._lock:
+            self._running += 1
+        try:
+            token.check()
+            return handler(job, token)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, job, timeout: Optional[float] = None):
+        """Run job on the pool; raises JobTimeout, JobCancelled or the handler's own exception"""
+        handler = JOB_HANDLERS[type(job)]
+        token = CancelToken()
+        self._count('submitted')
+        future = asyncio.get_running_loop().run_in_executor(self._executor, self._execute, handler, job, token)
+        try:
+            result = await asyncio.wait_for(future, timeout if timeout is not None else job.timeout)
+        except asyncio.TimeoutError:
+            token.cancel()
+            self._count('timed_out')
+            raise JobTimeout(f"{type(job).__name__} exceeded {timeout if timeout is not None else job.timeout}s")
+        except asyncio.CancelledError:
+            token.cancel()
+            self._count('cancelled')
+            raise
+        except JobCancelled:
+            self._count('cancelled')
+            raise
+        except Exception:
+            self._count('failed')
+            raise
+        self._count('completed')
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counts, running=self._running, workers=self.max_workers)
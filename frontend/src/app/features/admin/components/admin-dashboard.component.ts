@@ -184,6 +184,12 @@ import { ConfirmationModalComponent } from '../../../shared/ui/confirmation-moda
                 </div>
               </div>
             </div>
+
+            <div class="load-more" *ngIf="hasMoreRequests()">
+              <button (click)="loadMoreRequests()" class="us-btn us-btn-secondary us-btn-sm">
+                <i class="bi bi-arrow-down-circle"></i> Load more
+              </button>
+            </div>
           </div>
         </div>
 
@@ -412,6 +418,12 @@ import { ConfirmationModalComponent } from '../../../shared/ui/confirmation-moda
     }
     
     /* Empty State */
+    .load-more {
+      display: flex;
+      justify-content: center;
+      padding: 1rem 0;
+    }
+
     .empty-state {
       text-align: center;
       padding: 4rem 2rem;
@@ -623,6 +635,8 @@ export class AdminDashboardComponent {
   showDeleteModal = signal(false);
   requestToDelete = signal<string | null>(null);
   archivedSessions = signal<ArchivedSession[]>([]);
+  archivedCursor = signal<string | null>(null);
+  archivedTotal = signal(0);
   liveChatRequest = signal<ServiceRequest | null>(null);
   serviceRequests$ = this.serviceRequestService.serviceRequests$;
   
@@ -658,18 +672,54 @@ export class AdminDashboardComponent {
   }
 
   private loadArchivedSessions() {
+    // Catalog entries only; a transcript is fetched when its session is opened
     this.sessionArchiveService.getArchivedSessions().subscribe({
-      next: (sessions) => {
-        this.archivedSessions.set(sessions);
-        console.log(`📁 Loaded ${sessions.length} archived sessions for admin review`);
+      next: (page) => {
+        this.archivedSessions.set(page.items);
+        this.archivedCursor.set(page.nextCursor);
+        this.archivedTotal.set(page.total ?? page.items.length);
+        console.log(`📁 Loaded ${page.items.length} of ${this.archivedTotal()} archived sessions for admin review`);
       },
       error: (err) => {
         console.error('Failed to load archived sessions:', err);
         this.archivedSessions.set([]);
+        this.archivedCursor.set(null);
+        this.archivedTotal.set(0);
       }
     });
   }
 
+  private loadMoreArchivedSessions() {
+    this.sessionArchiveService.getArchivedSessions(this.archivedCursor()).subscribe({
+      next: (page) => {
+        this.archivedSessions.update(sessions => [...sessions, ...page.items]);
+        this.archivedCursor.set(page.nextCursor);
+      },
+      error: (err) => console.error('Failed to load more archived sessions:', err)
+    });
+  }
+
+  private archiveToRequest(session: ArchivedSession): ServiceRequest {
+    return {
+      id: session.session_id,
+      customerId: session.user_id,
+      customerName: `User ${session.user_id.slice(-8)}`,
+      customerEmail: session.user_id,
+      timestamp: new Date(session.archived_at),
+      status: 'archived' as any,
+      escalationReason: 'Session completed',
+      priority: 'low' as any,
+      chatHistory: (session.messages || []).map(msg => ({
+        id: msg.message_id || `${msg.role}_${msg.timestamp}`,
+        content: msg.content,
+        isUser: msg.role === 'user',
+        timestamp: new Date(msg.timestamp)
+      })),
+      createdAt: session.archived_at,
+      lastUpdated: new Date(session.archived_at)
+    } as ServiceRequest;
+  }
+
   get currentUser() {
     return this.authService.currentAuth;
   }
@@ -683,36 +733,38 @@ export class AdminDashboardComponent {
   }
 
   stats() {
-    const requests = this.serviceRequestService.getServiceRequests();
+    // Counts come from the server, since only the loaded pages are held here
+    const counts = this.serviceRequestService.getStatusCounts();
+    const newCount = counts['new'] || 0;
+    const inProgress = counts['in-progress'] || 0;
+    const resolved = counts['resolved'] || 0;
     return {
-      total: requests.length,
-      new: requests.filter(req => req.status === 'new').length,
-      inProgress: requests.filter(req => req.status === 'in-progress').length,
-      resolved: requests.filter(req => req.status === 'resolved').length
+      total: newCount + inProgress + resolved,
+      new: newCount,
+      inProgress,
+      resolved
     };
   }
 
+  hasMoreRequests(): boolean {
+    if (this.currentTab() === 'archived') {
+      return this.archivedCursor() !== null || this.serviceRequestService.hasMoreServiceRequests();
+    }
+    return this.serviceRequestService.hasMoreServiceRequests();
+  }
+
+  loadMoreRequests() {
+    if (this.currentTab() === 'archived' && this.archivedCursor() !== null) {
+      this.loadMoreArchivedSessions();
+      return;
+    }
+    this.serviceRequestService.loadMoreServiceRequests();
+  }
+
   filteredRequests(): ServiceRequest[] {
     if (this.currentTab() === 'archived') {
       const resolvedRequests = this.serviceRequestService.getServiceRequests().filter(req => req.status === 'resolved');
-      const archivedSessions = this.archivedSessions().map(session => ({
-        id: session.session_id,
-        customerId: session.user_id,
-        customerName: `User ${session.user_id.slice(-8)}`,
-        customerEmail: session.user_id,
-        timestamp: new Date(session.archived_at),
-        status: 'archived' as any,
-        escalationReason: 'Session completed',
-        priority: 'low' as any,
-        chatHistory: session.messages.map(msg => ({
-          id: msg.message_id || `${msg.role}_${msg.timestamp}`,
-          content: msg.content,
-          isUser: msg.role === 'user',
-          timestamp: new Date(msg.timestamp)
-        })),
-        createdAt: session.archived_at,
-        lastUpdated: new Date(session.archived_at)
-      } as ServiceRequest));
+      const archivedSessions = this.archivedSessions().map(session => this.archiveToRequest(session));
       return [...resolvedRequests, ...archivedSessions];
     }
     
@@ -737,12 +789,12 @@ export class AdminDashboardComponent {
   }
 
   getActiveRequestsCount() {
-    return this.serviceRequestService.getServiceRequests().filter(req => req.status !== 'resolved').length;
+    const stats = this.stats();
+    return stats.new + stats.inProgress;
   }
 
   getArchivedRequestsCount() {
-    const resolvedCount = this.serviceRequestService.getServiceRequests().filter(req => req.status === 'resolved').length;
-    return resolvedCount + this.archivedSessions().length;
+    return this.stats().resolved + this.archivedTotal();
   }
 
   acknowledgeRequest(requestId: string) {
@@ -772,7 +824,20 @@ export class AdminDashboardComponent {
   }
 
   selectRequest(request: ServiceRequest) {
-    this.serviceRequestService.selectRequest(request);
+    if ((request.status as string) !== 'archived') {
+      this.serviceRequestService.selectRequest(request);
+      return;
+    }
+    // Archived sessions are listed from the catalog; load the transcript on demand
+    this.serviceRequestService.selectRequest(request, false);
+    this.sessionArchiveService.getSessionById(request.id).subscribe({
+      next: (session) => {
+        if (this.serviceRequestService.getSelectedRequest()?.id === request.id) {
+          this.serviceRequestService.selectRequest(this.archiveToRequest(session), false);
+        }
+      },
+      error: (err) => console.error('Failed to load archived session:', err)
+    });
   }
 
   clearSelection() {
@@ -863,8 +928,16 @@ export class AdminDashboardComponent {
   startLiveChat(request: ServiceRequest) {
     // Update request status to in-progress
     this.serviceRequestService.acknowledgeRequest(request.id);
-    // Open live chat modal
+    // Open live chat modal with the full ticket (the list only holds summaries)
     this.liveChatRequest.set(request);
+    this.serviceRequestService.getServiceRequest(request.id).subscribe({
+      next: (full) => {
+        if (this.liveChatRequest()?.id === request.id) {
+          this.liveChatRequest.set({ ...full, status: 'in-progress' } as ServiceRequest);
+        }
+      },
+      error: (err) => console.error('Failed to load service request for live chat:', err)
+    });
   }
 
   closeLiveChat() {
@@ -1,12 +1,12 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
 import { environment } from '../../../../environments/environment';
 
 export interface ArchivedSession {
   session_id: string;
   user_id: string;
-  messages: Array<{
+  messages?: Array<{
     role: string;
     content: string;
     timestamp: number;
@@ -19,14 +19,25 @@ export interface ArchivedSession {
   reason?: string;
 }
 
+// One page of catalog entries (no transcripts); total only on the first page
+export interface ArchivedSessionPage {
+  items: ArchivedSession[];
+  nextCursor: string | null;
+  total?: number;
+}
+
 @Injectable({
   providedIn: 'root'
 })
 export class SessionArchiveService {
   constructor(private http: HttpClient) {}
 
-  getArchivedSessions(): Observable<ArchivedSession[]> {
-    return this.http.get<ArchivedSession[]>(`${environment.apiUrl}/api/v1/archived-sessions`);
+  getArchivedSessions(cursor?: string | null, limit: number = 100): Observable<ArchivedSessionPage> {
+    let params = new HttpParams().set('limit', limit);
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    return this.http.get<ArchivedSessionPage>(`${environment.apiUrl}/api/v1/archived-sessions`, { params });
   }
 
   getSessionById(sessionId: string): Observable<ArchivedSession> {
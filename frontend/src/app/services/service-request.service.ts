@@ -1,5 +1,5 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpParams } from '@angular/common/http';
 import { BehaviorSubject, Observable } from 'rxjs';
 import { environment } from '../../environments/environment';
 
@@ -23,8 +23,19 @@ export interface ServiceRequest {
   pdfExtractedText?: string;
   pdfFilename?: string;
   createdAt?: number;
+  messageCount?: number;
 }
 
+// One page of ticket summaries (no chat history or PDF text); counts only on the first page
+export interface ServiceRequestPage {
+  items: ServiceRequest[];
+  nextCursor: string | null;
+  counts?: { [status: string]: number };
+}
+
+const PAGE_SIZE = 100;
+const MAX_REFRESH_SIZE = 500;
+
 export interface CreateServiceRequestRequest {
   customerId: string;
   customerName: string;
@@ -42,6 +53,9 @@ export class ServiceRequestService {
   public serviceRequests$ = this.serviceRequests.asObservable();
   private selectedRequestSubject = new BehaviorSubject<ServiceRequest | null>(null);
   public selectedRequest = this.selectedRequestSubject.asObservable();
+  private statusCounts = new BehaviorSubject<{ [status: string]: number }>({});
+  public statusCounts$ = this.statusCounts.asObservable();
+  private nextCursor: string | null = null;
 
   constructor(private http: HttpClient) {}
 
@@ -49,14 +63,26 @@ export class ServiceRequestService {
     return this.http.post<{success: boolean, serviceRequestId: string}>(`${environment.apiUrl}/api/service-requests`, request);
   }
 
-  loadServiceRequests(): Observable<ServiceRequest[]> {
-    return this.http.get<ServiceRequest[]>(`${environment.apiUrl}/api/service-requests`);
+  loadServiceRequests(cursor?: string | null, limit: number = PAGE_SIZE): Observable<ServiceRequestPage> {
+    let params = new HttpParams().set('limit', limit);
+    if (cursor) {
+      params = params.set('cursor', cursor);
+    }
+    return this.http.get<ServiceRequestPage>(`${environment.apiUrl}/api/service-requests`, { params });
+  }
+
+  getServiceRequest(requestId: string): Observable<ServiceRequest> {
+    return this.http.get<ServiceRequest>(`${environment.apiUrl}/api/service-requests/${requestId}`);
   }
 
   refreshServiceRequests() {
-    this.loadServiceRequests().subscribe({
-      next: (requests) => {
-        this.serviceRequests.next(requests);
+    // Re-read as many tickets as are already shown, so a refresh does not drop loaded pages
+    const limit = Math.min(MAX_REFRESH_SIZE, Math.max(PAGE_SIZE, this.serviceRequests.getValue().length));
+    this.loadServiceRequests(null, limit).subscribe({
+      next: (page) => {
+        this.serviceRequests.next(page.items.map(item => this.asSummary(item)));
+        this.nextCursor = page.nextCursor;
+        this.statusCounts.next(page.counts || {});
       },
       error: (err) => {
         console.error('Failed to load service requests:', err);
@@ -64,6 +90,36 @@ export class ServiceRequestService {
     });
   }
 
+  loadMoreServiceRequests() {
+    if (!this.nextCursor) {
+      return;
+    }
+    this.loadServiceRequests(this.nextCursor).subscribe({
+      next: (page) => {
+        const loaded = new Set(this.serviceRequests.getValue().map(req => req.id));
+        const items = page.items.filter(item => !loaded.has(item.id)).map(item => this.asSummary(item));
+        this.serviceRequests.next([...this.serviceRequests.getValue(), ...items]);
+        this.nextCursor = page.nextCursor;
+      },
+      error: (err) => {
+        console.error('Failed to load more service requests:', err);
+      }
+    });
+  }
+
+  hasMoreServiceRequests(): boolean {
+    return this.nextCursor !== null;
+  }
+
+  getStatusCounts(): { [status: string]: number } {
+    return this.statusCounts.getValue();
+  }
+
+  private asSummary(item: ServiceRequest): ServiceRequest {
+    // Chat history is fetched with the full ticket when one is opened
+    return { ...item, chatHistory: item.chatHistory || [] };
+  }
+
   addServiceRequest(request: ServiceRequest) {
     const current = this.serviceRequests.getValue();
     this.serviceRequests.next([request, ...current]);
@@ -73,8 +129,23 @@ export class ServiceRequestService {
     return this.serviceRequests.getValue();
   }
 
-  selectRequest(request: ServiceRequest) {
+  selectRequest(request: ServiceRequest, loadFull: boolean = true) {
     this.selectedRequestSubject.next(request);
+    if (!loadFull) {
+      return;
+    }
+    this.getServiceRequest(request.id).subscribe({
+      next: (full) => {
+        if (this.selectedRequestSubject.getValue()?.id === request.id) {
+          this.selectedRequestSubject.next(full);
+        }
+      },
+      error: (err) => console.error('Failed to load service request:', err)
+    });
+  }
+
+  getSelectedRequest(): ServiceRequest | null {
+    return this.selectedRequestSubject.getValue();
   }
 
   clearSelection() {
@@ -91,16 +162,22 @@ export class ServiceRequestService {
 
   private updateRequestStatus(requestId: string, status: 'new' | 'in-progress' | 'resolved') {
     const current = this.serviceRequests.getValue();
+    const previous = current.find(req => req.id === requestId)?.status;
     const updated = current.map(req => 
       req.id === requestId ? { ...req, status, lastUpdated: new Date() } : req
     );
     this.serviceRequests.next(updated);
+    if (previous && previous !== status) {
+      const counts = { ...this.statusCounts.getValue() };
+      counts[previous] = Math.max(0, (counts[previous] || 0) - 1);
+      counts[status] = (counts[status] || 0) + 1;
+      this.statusCounts.next(counts);
+    }
     
-    if (this.selectedRequestSubject.getValue()?.id === requestId) {
-      const updatedRequest = updated.find(req => req.id === requestId);
-      if (updatedRequest) {
-        this.selectedRequestSubject.next(updatedRequest);
-      }
+    const selected = this.selectedRequestSubject.getValue();
+    if (selected?.id === requestId) {
+      // Keep the full ticket (with chat history) rather than the list summary
+      this.selectedRequestSubject.next({ ...selected, status, lastUpdated: new Date() });
     }
     
     this.http.patch(`${environment.apiUrl}/api/service-requests/${requestId}`, { status }).subscribe({